@@ -1,147 +1,107 @@
-from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify
+from flask import Flask, Config, render_template, request, redirect, url_for, session, flash, jsonify, has_app_context, send_from_directory, send_file, Response, stream_with_context
 import sqlite3
 from datetime import datetime, date
+import json
 import os
-import pandas as pd
 from werkzeug.utils import secure_filename
+import database
+import migrations
+import marking
+import jobs
+import stats
+import users
+import search
+import rollups
+import reports
+import exports
+import cache
+import catalog
+import routing
+import approvals
+import proofs
+import passwords
+import profiles
+import instrumentation
+import enrollment
+import timetable
+import registrations
+import notifications
 
 app = Flask(__name__)
 app.secret_key = 'your_secret_key_here'
-DATABASE = 'college_portal.db'
-UPLOAD_FOLDER = 'uploads'
-ALLOWED_EXTENSIONS = {'xlsx', 'xls'}
+# Paths default to the application directory, not the working directory
+DATABASE = os.path.join(app.root_path, 'college_portal.db')
+UPLOAD_FOLDER = os.path.join(app.root_path, 'uploads')
+ALLOWED_EXTENSIONS = {'xlsx', 'xls', 'csv'}
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+app.config['IMPORT_REPORT_FOLDER'] = os.path.join(UPLOAD_FOLDER, 'import_reports')
+app.config['DATABASE'] = DATABASE
+database.init_app(app)
+jobs.init_app(app)
+cache.init_app(app)
+proofs.init_app(app)
+passwords.init_app(app)
+profiles.init_app(app)
+instrumentation.init_app(app)
+notifications.init_app(app)
+
+def create_app(config=None):
+    # Configure the portal for serving: the file named by PORTAL_SETTINGS,
+    # then PORTAL_* environment variables (PORTAL_DATABASE,
+    # PORTAL_UPLOAD_FOLDER, PORTAL_SECRET_KEY, ...), then config. Routes are
+    # registered on the module-level app, so this configures and returns
+    # that instance. It never touches the schema - see init_db() and serve.py.
+    loaded = Config(app.root_path)
+    loaded.from_envvar('PORTAL_SETTINGS', silent=True)
+    loaded.from_prefixed_env('PORTAL')
+    loaded.update(config or {})
+    for key in ('DATABASE', 'UPLOAD_FOLDER', 'IMPORT_REPORT_FOLDER', 'PROOF_FOLDER', 'FRAGMENT_CACHE_DATABASE'):
+        if key in loaded:
+            loaded[key] = os.path.join(app.root_path, loaded[key])
+    app.config.update(loaded)
+    if 'UPLOAD_FOLDER' in loaded:
+        # Folders under the upload folder follow it unless set explicitly
+        upload_folder = loaded['UPLOAD_FOLDER']
+        app.config['IMPORT_REPORT_FOLDER'] = loaded.get('IMPORT_REPORT_FOLDER', os.path.join(upload_folder, 'import_reports'))
+        app.config['PROOF_FOLDER'] = loaded.get('PROOF_FOLDER', os.path.join(upload_folder, 'proofs'))
+    if app.config['INSTRUMENTATION_ENABLED']:
+        instrumentation.enable(app)
+    return app
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 # Initialize database with proper schema
 def init_db():
-    conn = sqlite3.connect(DATABASE)
+    conn = database.connect(app.config)
     c = conn.cursor()
     
-    # Create tables with updated schema
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            password TEXT NOT NULL,
-            role TEXT NOT NULL,
-            name TEXT NOT NULL,
-            email TEXT,
-            rollno TEXT,
-            section TEXT,
-            department TEXT,
-            class TEXT
-        )
-    ''')
-    
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS permissions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            student_id INTEGER,
-            faculty_id INTEGER,
-            date DATE NOT NULL,
-            reason TEXT NOT NULL,
-            proof TEXT,
-            status TEXT DEFAULT 'pending',
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (student_id) REFERENCES users (id),
-            FOREIGN KEY (faculty_id) REFERENCES users (id)
-        )
-    ''')
-    
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS attendance (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            student_id INTEGER,
-            class_id INTEGER,
-            date DATE NOT NULL,
-            status TEXT NOT NULL,
-            marked_by INTEGER,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (student_id) REFERENCES users (id),
-            FOREIGN KEY (marked_by) REFERENCES users (id)
-        )
-    ''')
-    
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS classes (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            faculty_id INTEGER,
-            schedule TEXT,
-            room TEXT,
-            FOREIGN KEY (faculty_id) REFERENCES users (id)
-        )
-    ''')
-    
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS events (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            date DATE NOT NULL,
-            time TEXT,
-            venue TEXT,
-            description TEXT
-        )
-    ''')
-    
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS student_events (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            student_id INTEGER,
-            event_id INTEGER,
-            FOREIGN KEY (student_id) REFERENCES users (id),
-            FOREIGN KEY (event_id) REFERENCES events (id)
-        )
-    ''')
-    
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS clubs_events (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            type TEXT NOT NULL,
-            is_active BOOLEAN DEFAULT 1,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # Check if columns exist and add them if they don't
-    c.execute("PRAGMA table_info(users)")
-    columns = [column[1] for column in c.fetchall()]
-    
-    # Add missing columns
-    if 'rollno' not in columns:
-        c.execute("ALTER TABLE users ADD COLUMN rollno TEXT")
-    if 'section' not in columns:
-        c.execute("ALTER TABLE users ADD COLUMN section TEXT")
-    if 'department' not in columns:
-        c.execute("ALTER TABLE users ADD COLUMN department TEXT")
-    if 'class' not in columns:
-        c.execute("ALTER TABLE users ADD COLUMN class TEXT")
+    # Bring the schema up to date (see migrations.py)
+    migrations.migrate(conn)
     
     # Insert default data only if tables are empty
     c.execute("SELECT COUNT(*) FROM users")
     user_count = c.fetchone()[0]
     
     if user_count == 0:
+        hasher = passwords.get_hasher(app)
+        
         # Insert default admin
         c.execute("INSERT INTO users (username, password, role, name, email) VALUES (?, ?, ?, ?, ?)",
-                 ('admin', 'admin123', 'admin', 'System Administrator', 'admin@college.edu'))
+                 ('admin', hasher.hash('admin123'), 'admin', 'System Administrator', 'admin@college.edu'))
         
         # Add sample faculty
         c.execute("INSERT INTO users (username, password, role, name, email, department) VALUES (?, ?, ?, ?, ?, ?)",
-                 ('faculty1', 'faculty123', 'faculty', 'Dr. Robert Brown', 'robert@college.edu', 'Computer Science'))
+                 ('faculty1', hasher.hash('faculty123'), 'faculty', 'Dr. Robert Brown', 'robert@college.edu', 'Computer Science'))
         c.execute("INSERT INTO users (username, password, role, name, email, department) VALUES (?, ?, ?, ?, ?, ?)",
-                 ('faculty2', 'faculty123', 'faculty', 'Dr. Sarah Wilson', 'sarah@college.edu', 'Electronics'))
+                 ('faculty2', hasher.hash('faculty123'), 'faculty', 'Dr. Sarah Wilson', 'sarah@college.edu', 'Electronics'))
         
         # Add sample students with roll numbers
         c.execute("INSERT INTO users (username, password, role, name, email, class, rollno, section, department) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
-                 ('student1', 'student123', 'student', 'John Doe', 'john@college.edu', 'B.Tech CSE', '001', 'A', 'Computer Science'))
+                 ('student1', hasher.hash('student123'), 'student', 'John Doe', 'john@college.edu', 'B.Tech CSE', '001', 'A', 'Computer Science'))
         c.execute("INSERT INTO users (username, password, role, name, email, class, rollno, section, department) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
-                 ('student2', 'student123', 'student', 'Jane Smith', 'jane@college.edu', 'B.Tech ECE', '002', 'B', 'Electronics'))
+                 ('student2', hasher.hash('student123'), 'student', 'Jane Smith', 'jane@college.edu', 'B.Tech ECE', '002', 'B', 'Electronics'))
         
         # Add sample classes
         c.execute("INSERT INTO classes (name, faculty_id, schedule, room) VALUES (?, ?, ?, ?)",
@@ -152,8 +112,8 @@ def init_db():
         # Add sample events
         c.execute("INSERT INTO events (name, date, time, venue, description) VALUES (?, ?, ?, ?, ?)",
                  ('Tech Fest 2023', '2023-11-15', '10:00 AM', 'Main Auditorium', 'Annual technical festival'))
-        c.execute("INSERT INTO events (name, date, time, venue, description) VALUES (?, ?, ?, ?, ?)",
-                 ('Career Guidance Workshop', '2023-11-20', '2:00 PM', 'Seminar Hall', 'Workshop on career opportunities'))
+        c.execute("INSERT INTO events (name, date, time, venue, description, capacity) VALUES (?, ?, ?, ?, ?, ?)",
+                 ('Career Guidance Workshop', '2023-11-20', '2:00 PM', 'Seminar Hall', 'Workshop on career opportunities', 60))
         
         # Add default clubs
         clubs = [
@@ -180,23 +140,49 @@ def init_db():
                  (4, 1, today, 'present', 2))
         c.execute("INSERT INTO attendance (student_id, class_id, date, status, marked_by) VALUES (?, ?, ?, ?, ?)",
                  (5, 1, today, 'present', 2))
+        c.execute("INSERT INTO attendance_sessions (class_id, date, period, faculty_id) VALUES (?, ?, ?, ?)",
+                 (1, today, 1, 2))
+        
+        # Enroll the sample students in their classes
+        c.executemany("INSERT INTO enrollments (class_id, student_id) VALUES (?, ?)",
+                     [(1, 4), (1, 5), (2, 5)])
         
         # Add sample permissions
         c.execute("INSERT INTO permissions (student_id, faculty_id, date, reason, status) VALUES (?, ?, ?, ?, ?)",
                  (4, 2, '2023-10-25', 'Medical appointment', 'pending'))
     
     # Create uploads directory if it doesn't exist
-    if not os.path.exists(UPLOAD_FOLDER):
-        os.makedirs(UPLOAD_FOLDER)
+    if not os.path.exists(app.config['UPLOAD_FOLDER']):
+        os.makedirs(app.config['UPLOAD_FOLDER'])
     
     conn.commit()
     conn.close()
 
-# Database helper function
+def warmup():
+    # Fill the per-process caches before taking traffic. serve.py calls this
+    # in the master after preloading, so forked workers start warm and share
+    # the pages. Must not start threads: they would not survive the fork.
+    conn = database.connect(app.config)
+    try:
+        with app.app_context():
+            catalog.get_catalog().get(conn)
+            routing.get_router().load(conn)
+            timetable.get_timetable().get(conn)
+            # Counter rows and their pages, for the first dashboards
+            stats.admin_counts(conn)
+        # The router may have rebuilt its table; never fork with that
+        # write transaction (and its lock) still open
+        conn.commit()
+        for name in app.jinja_env.list_templates():
+            app.jinja_env.get_template(name)
+    finally:
+        conn.close()
+
+# Database helper function - request-scoped connection from the pool
 def get_db_connection():
-    conn = sqlite3.connect(DATABASE)
-    conn.row_factory = sqlite3.Row
-    return conn
+    if has_app_context():
+        return database.get_db()
+    return database.connect(app.config)
 
 # Routes
 @app.route('/')
@@ -209,14 +195,37 @@ def login():
     password = request.form['password']
     role = request.form['role']
     
+    # Throttle before doing any hashing so guessing can't tie up the KDF pool
+    if not passwords.allow_login(username, request.remote_addr):
+        flash('Too many login attempts. Please wait a minute and try again.', 'error')
+        return render_template('index.html'), 429
+    
     conn = get_db_connection()
-    user = conn.execute(
-        'SELECT * FROM users WHERE username = ? AND password = ? AND role = ?',
-        (username, password, role)
-    ).fetchone()
+    # Usernames match case-insensitively; the profile comes from the cache and
+    # only the password hash is read, by primary key
+    user = profiles.get_profiles().by_username(conn, username)
+    if user is not None and user['role'] != role:
+        user = None
+    stored = None
+    if user is not None:
+        row = conn.execute('SELECT password FROM users WHERE id = ?', (user['id'],)).fetchone()
+        stored = row['password'] if row else None
+    
+    try:
+        ok, new_hash = passwords.get_hasher().verify(stored, password)
+    except passwords.HasherBusy as e:
+        conn.close()
+        flash(str(e), 'error')
+        return render_template('index.html'), 503
+    
+    if ok and new_hash:
+        # Legacy plaintext or an outdated cost: upgrade now that we know the password
+        conn.execute('UPDATE users SET password = ? WHERE id = ?', (new_hash, user['id']))
+        conn.commit()
     conn.close()
     
-    if user:
+    if ok:
+        passwords.get_limiter().reset(passwords.user_key(username))
         session['user_id'] = user['id']
         session['username'] = user['username']
         session['role'] = user['role']
@@ -244,25 +253,21 @@ def admin_dashboard():
     
     conn = get_db_connection()
     
-    # Get statistics
-    students_count = conn.execute('SELECT COUNT(*) FROM users WHERE role = "student"').fetchone()[0]
-    faculty_count = conn.execute('SELECT COUNT(*) FROM users WHERE role = "faculty"').fetchone()[0]
-    pending_permissions = conn.execute('SELECT COUNT(*) FROM permissions WHERE status = "pending"').fetchone()[0]
-    events_count = conn.execute('SELECT COUNT(*) FROM events').fetchone()[0]
+    # Get statistics (trigger-maintained counters, see stats.py)
+    counts = stats.admin_counts(conn)
     
-    # Get users
-    students = conn.execute('SELECT * FROM users WHERE role = "student"').fetchall()
-    faculty = conn.execute('SELECT * FROM users WHERE role = "faculty"').fetchall()
+    # Only the first page of each list; the rest is fetched from /api/users
+    students, students_cursor = users.list_users(conn, 'student')
+    faculty, faculty_cursor = users.list_users(conn, 'faculty')
     
     conn.close()
     
     return render_template('admin_dashboard.html', 
-                         students_count=students_count,
-                         faculty_count=faculty_count,
-                         pending_permissions=pending_permissions,
-                         events_count=events_count,
+                         **counts,
                          students=students,
+                         students_cursor=students_cursor,
                          faculty=faculty,
+                         faculty_cursor=faculty_cursor,
                          current_date=date.today())
 
 @app.route('/faculty/dashboard')
@@ -272,51 +277,49 @@ def faculty_dashboard():
     
     conn = get_db_connection()
     faculty_id = session['user_id']
+    # Read before anything is rendered: a change committed while the page is
+    # built then reaches it through the stream (replaying one is harmless),
+    # rather than being missed by both
+    notify_since = notifications.latest_id(conn, faculty_id)
     
     # Get statistics
     classes_count = conn.execute('SELECT COUNT(*) FROM classes WHERE faculty_id = ?', (faculty_id,)).fetchone()[0]
-    students_count = conn.execute('SELECT COUNT(*) FROM users WHERE role = "student"').fetchone()[0]
-    pending_permissions = conn.execute('SELECT COUNT(*) FROM permissions WHERE faculty_id = ? AND status = "pending"', (faculty_id,)).fetchone()[0]
+    counts = stats.faculty_counts(conn, faculty_id)
     
-    # Get permissions - FIXED QUERY
-    permissions = conn.execute('''
-        SELECT p.*, u.name as student_name, u.rollno 
-        FROM permissions p 
-        JOIN users u ON p.student_id = u.id 
-        WHERE p.faculty_id = ?
-    ''', (faculty_id,)).fetchall()
+    # First page of the pending queue; the rest is loaded through /api/permissions/queue
+    permissions, permissions_cursor = approvals.queue(conn, faculty_id, status='pending')
     
     # Get classes
     classes = conn.execute('SELECT * FROM classes WHERE faculty_id = ?', (faculty_id,)).fetchall()
     
-    # Get students for attendance
-    students = conn.execute('''
-        SELECT id, rollno, name, section, department, class 
-        FROM users 
-        WHERE role = "student" 
-        ORDER BY rollno
-    ''').fetchall()
-    
-    # Get today's attendance
-    today = date.today().isoformat()
-    today_attendance = conn.execute('''
-        SELECT student_id, status 
-        FROM attendance 
-        WHERE date = ? AND marked_by = ?
-    ''', (today, faculty_id)).fetchall()
-    
-    attendance_dict = {row['student_id']: row['status'] for row in today_attendance}
-    
+    # Session to mark: ?class_id=&date=&period=, defaulting to the class
+    # on the timetable right now (else next or last today), else the first
+    # class, today and period 1. Only its enrolled roster is loaded.
+    class_id, period = request.args.get('class_id'), request.args.get('period')
+    if class_id is None:
+        slot = timetable.get_timetable().get(conn).current_session(faculty_id, datetime.now())
+        if slot is not None:
+            class_id, period = str(slot.class_id), period or slot.period
+    try:
+        session_date, period = enrollment.parse_session(request.args.get('date'), period)
+    except ValueError:
+        session_date, period = enrollment.parse_session()
+    selected_class = next((c for c in classes if str(c['id']) == class_id), classes[0] if classes else None)
+    students = enrollment.roster(conn, selected_class['id'], session_date, period) if selected_class else []
     conn.close()
     
     return render_template('faculty_dashboard.html',
+                         notify_since=notify_since,
                          classes_count=classes_count,
-                         students_count=students_count,
-                         pending_permissions=pending_permissions,
+                         **counts,
                          permissions=permissions,
+                         permissions_cursor=permissions_cursor,
                          classes=classes,
                          students=students,
-                         today_attendance=attendance_dict,
+                         selected_class=selected_class,
+                         session_date=session_date,
+                         period=period,
+                         periods=range(1, enrollment.PERIODS + 1),
                          current_date=date.today())
 
 @app.route('/student/dashboard')
@@ -326,61 +329,76 @@ def student_dashboard():
     
     conn = get_db_connection()
     student_id = session['user_id']
-    
-    # Get clubs and events for permission form
-    clubs_events = conn.execute('SELECT * FROM clubs_events WHERE is_active = 1').fetchall()
-    clubs = [ce for ce in clubs_events if ce['type'] == 'club']
-    events = [ce for ce in clubs_events if ce['type'] == 'event']
-    
-    # Get statistics
-    attendance_percentage = conn.execute('''
-        SELECT 
-            COUNT(CASE WHEN status = 'present' THEN 1 END) * 100.0 / COUNT(*) as percentage
-        FROM attendance 
-        WHERE student_id = ?
-    ''', (student_id,)).fetchone()[0] or 0
-    
-    pending_permissions = conn.execute('SELECT COUNT(*) FROM permissions WHERE student_id = ? AND status = "pending"', (student_id,)).fetchone()[0]
-    events_count = conn.execute('SELECT COUNT(*) FROM student_events WHERE student_id = ?', (student_id,)).fetchone()[0]
-    
-    # Get attendance history - FIXED QUERY
-    attendance = conn.execute('''
-        SELECT 
-            a.date,
-            c.name as subject,
-            a.status,
-            u.name as marked_by
-        FROM attendance a
-        LEFT JOIN classes c ON a.class_id = c.id
-        LEFT JOIN users u ON a.marked_by = u.id
-        WHERE a.student_id = ?
-        ORDER BY a.date DESC
-        LIMIT 50
-    ''', (student_id,)).fetchall()
-    
-    # Get permissions
-    permissions = conn.execute('''
-        SELECT p.*, u.name as faculty_name 
-        FROM permissions p 
-        LEFT JOIN users u ON p.faculty_id = u.id 
-        WHERE p.student_id = ?
-    ''', (student_id,)).fetchall()
-    
-    # Get student details
-    student = conn.execute('SELECT * FROM users WHERE id = ?', (student_id,)).fetchone()
-    
+    # Before rendering, as on the faculty dashboard
+    notify_since = notifications.latest_id(conn, student_id)
+    fragments = cache.get_cache()
+    # Sections showing faculty names are also tagged 'faculty_names' so a
+    # faculty rename reaches them
+    tags = [cache.user_tag(student_id)]
+    named_tags = tags + ['faculty_names']
+    history = []
+    
+    def attendance_history():
+        # Shared by the stats and attendance sections, queried at most once
+        if not history:
+            history.append(conn.execute('''
+                SELECT 
+                    a.date,
+                    a.class_id,
+                    a.period,
+                    c.name as subject,
+                    a.status,
+                    u.name as marked_by
+                FROM attendance a
+                LEFT JOIN classes c ON a.class_id = c.id
+                LEFT JOIN users u ON a.marked_by = u.id
+                WHERE a.student_id = ?
+                ORDER BY a.date DESC
+                LIMIT 50
+            ''', (student_id,)).fetchall())
+        return history[0]
+    
+    def render_info():
+        student = profiles.get_profiles().get(conn, student_id)
+        return render_template('partials/student_info.html', student=student)
+    
+    def render_stats():
+        return render_template('partials/student_stats.html',
+                               attendance_percentage=rollups.student_percentage(conn, student_id),
+                               **stats.student_counts(conn, student_id),
+                               attendance=attendance_history())
+    
+    def render_attendance():
+        return render_template('partials/student_attendance.html', attendance=attendance_history())
+    
+    def render_permissions():
+        permissions = conn.execute('''
+            SELECT p.*, u.name as faculty_name 
+            FROM permissions p 
+            LEFT JOIN users u ON p.faculty_id = u.id 
+            WHERE p.student_id = ?
+        ''', (student_id,)).fetchall()
+        return render_template('partials/student_permissions.html', permissions=permissions)
+    
+    # Clubs and events for permission form; keyed by catalog version so every
+    # worker re-renders after a change
+    clubs_events = catalog.get_catalog().get(conn)
+    
+    def render_reason_options():
+        return render_template('partials/reason_options.html', clubs=clubs_events.clubs, events=clubs_events.events)
+    
+    page = {
+        'info': fragments.fragment(f'student:{student_id}:info', tags, render_info),
+        'stats': fragments.fragment(f'student:{student_id}:stats', tags, render_stats),
+        'attendance': fragments.fragment(f'student:{student_id}:attendance', named_tags, render_attendance),
+        'permissions': fragments.fragment(f'student:{student_id}:permissions', named_tags, render_permissions),
+        'reason_options': fragments.fragment(f'reason_options:{clubs_events.version}', ['clubs_events'],
+                                             render_reason_options),
+    }
     conn.close()
     
-    return render_template('student_dashboard.html',
-                         clubs=clubs,
-                         events=events,
-                         attendance_percentage=attendance_percentage,
-                         pending_permissions=pending_permissions,
-                         events_count=events_count,
-                         attendance=attendance,
-                         permissions=permissions,
-                         student=student,
-                         current_date=date.today())
+    return render_template('student_dashboard.html', fragments=page, notify_since=notify_since,
+                           current_date=date.today())
 
 # API Routes for AJAX operations
 @app.route('/api/add_user', methods=['POST'])
@@ -394,7 +412,7 @@ def add_user():
     try:
         conn.execute('''INSERT INTO users (username, password, role, name, email, class, rollno, section, department) 
                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-                    (data['username'], data['password'], 'student', data['name'], 
+                    (data['username'], passwords.get_hasher().hash(data['password']), 'student', data['name'], 
                      data.get('email'), data.get('class'), data.get('rollno'), 
                      data.get('section'), data.get('department')))
         conn.commit()
@@ -407,6 +425,27 @@ def add_user():
         conn.close()
         return jsonify({'success': False, 'message': f'Error adding student: {str(e)}'})
 
+def _publish_permissions(conn, permission_ids):
+    # 'permission' deltas (new status and pending count) for the students'
+    # dashboards, in the caller's transaction; returns the student ids
+    items = []
+    pending = {}
+    for start in range(0, len(permission_ids), approvals.LOOKUP_CHUNK):
+        chunk = permission_ids[start:start + approvals.LOOKUP_CHUNK]
+        rows = conn.execute(f'''SELECT p.id, p.student_id, p.date, p.reason, p.status, u.name AS faculty_name
+                                FROM permissions p LEFT JOIN users u ON u.id = p.faculty_id
+                                WHERE p.id IN ({', '.join('?' * len(chunk))})''', chunk).fetchall()
+        for row in rows:
+            student_id = row['student_id']
+            if student_id not in pending:
+                pending[student_id] = stats.student_counts(conn, student_id)['pending_permissions']
+            items.append((student_id, 'permission', {
+                'id': row['id'], 'date': row['date'], 'reason': row['reason'], 'status': row['status'],
+                'faculty_name': row['faculty_name'], 'pending_permissions': pending[student_id],
+            }))
+    notifications.publish_many(conn, items)
+    return list(pending)
+
 @app.route('/api/update_permission_status', methods=['POST'])
 def update_permission_status():
     if 'user_id' not in session or session['role'] != 'faculty':
@@ -415,39 +454,168 @@ def update_permission_status():
     data = request.json
     conn = get_db_connection()
     try:
-        conn.execute('UPDATE permissions SET status = ? WHERE id = ?', (data['status'], data['permission_id']))
+        # Only the faculty the request was made to may decide it
+        updated = conn.execute('UPDATE permissions SET status = ? WHERE id = ? AND faculty_id = ?',
+                               (data['status'], data['permission_id'], session['user_id'])).rowcount
+        if not updated:
+            conn.close()
+            return jsonify({'success': False, 'message': 'Permission not found'}), 404
+        student_ids = _publish_permissions(conn, [data['permission_id']])
         conn.commit()
+        notifications.wake()
+        cache.invalidate(*(cache.user_tag(student_id) for student_id in student_ids))
         conn.close()
         return jsonify({'success': True, 'message': 'Permission updated successfully'})
     except Exception as e:
         conn.close()
         return jsonify({'success': False, 'message': f'Error updating permission: {str(e)}'})
 
+@app.route('/api/permissions/batch', methods=['POST'])
+def batch_update_permissions():
+    if 'user_id' not in session or session['role'] != 'faculty':
+        return jsonify({'success': False, 'message': 'Unauthorized'})
+    
+    # Either {"updates": [{"id": 1, "status": "approved"}, ...]} or
+    # {"filter": {"status": "pending", "date": "..."}, "status": "approved"}
+    data = request.json or {}
+    faculty_id = session['user_id']
+    conn = get_db_connection()
+    try:
+        if 'filter' in data:
+            criteria = data['filter'] or {}
+            ids = approvals.matching_ids(conn, faculty_id,
+                                         status=criteria.get('status', 'pending'),
+                                         date=criteria.get('date'),
+                                         date_from=criteria.get('from'),
+                                         date_to=criteria.get('to'))
+            updates = [(permission_id, data.get('status')) for permission_id in ids]
+        else:
+            updates = [(int(item['id']), item.get('status')) for item in data.get('updates', [])]
+    except (ValueError, TypeError, KeyError) as e:
+        conn.close()
+        return jsonify({'success': False, 'message': f'Invalid request: {str(e)}'}), 400
+    
+    if len(updates) > approvals.MAX_BATCH_SIZE:
+        conn.close()
+        return jsonify({'success': False,
+                        'message': f'At most {approvals.MAX_BATCH_SIZE} permissions can be updated at once'}), 400
+    
+    try:
+        results, student_ids = approvals.apply_batch(conn, faculty_id, updates)
+        _publish_permissions(conn, [permission_id for permission_id, result in results.items() if result == 'updated'])
+        conn.commit()
+        notifications.wake()
+    except Exception as e:
+        conn.rollback()
+        conn.close()
+        return jsonify({'success': False, 'message': f'Error updating permissions: {str(e)}'})
+    conn.close()
+    cache.invalidate(*(cache.user_tag(student_id) for student_id in student_ids))
+    
+    updated = sum(1 for result in results.values() if result == 'updated')
+    return jsonify({'success': True,
+                    'message': f'{updated} permission(s) updated',
+                    'updated': updated,
+                    'results': {str(permission_id): result for permission_id, result in results.items()}})
+
 @app.route('/api/add_permission', methods=['POST'])
 def add_permission():
     if 'user_id' not in session or session['role'] != 'student':
         return jsonify({'success': False, 'message': 'Unauthorized'})
     
-    data = request.json
+    # JSON, or multipart form data when a proof file is attached
+    if request.is_json:
+        data = request.json
+        proof_file = None
+    else:
+        # Refuse oversized bodies before they are parsed and spooled to disk
+        if request.content_length and request.content_length > app.config['PROOF_MAX_BYTES'] + 64 * 1024:
+            return jsonify({'success': False, 'message': 'Proof file is too large'}), 413
+        data = request.form
+        proof_file = request.files.get('proof_file')
     conn = get_db_connection()
     
     try:
-        # Get faculty for the student's class (simplified - in real app would need proper mapping)
-        faculty = conn.execute('SELECT id FROM users WHERE role = "faculty" LIMIT 1').fetchone()
+        # Route to the faculty responsible for the student's department/section
+        faculty_id = routing.get_router().faculty_for(conn, session['user_id'])
         
-        if faculty:
-            conn.execute('INSERT INTO permissions (student_id, faculty_id, date, reason, proof) VALUES (?, ?, ?, ?, ?)',
-                        (session['user_id'], faculty['id'], data['date'], data['reason'], data.get('proof', '')))
+        if faculty_id:
+            proof_sha256 = proof_filename = None
+            if proof_file and proof_file.filename:
+                proof_filename = secure_filename(proof_file.filename)
+                proof_sha256, _, _ = proofs.store(conn, proof_file.stream, proof_filename,
+                                                  app.config['PROOF_FOLDER'], app.config['PROOF_MAX_BYTES'],
+                                                  app.config['PROOF_ALLOWED_EXTENSIONS'])
+            permission_id = conn.execute('''INSERT INTO permissions (student_id, faculty_id, date, reason, proof, proof_sha256, proof_filename)
+                            VALUES (?, ?, ?, ?, ?, ?, ?)''',
+                        (session['user_id'], faculty_id, data['date'], data['reason'], data.get('proof', ''),
+                         proof_sha256, proof_filename)).lastrowid
+            _publish_permissions(conn, [permission_id])
+            # The new request for the faculty's queue
+            student = profiles.get_profiles().get(conn, session['user_id'])
+            notifications.publish(conn, faculty_id, 'permission_request', {
+                'id': permission_id, 'student_id': session['user_id'], 'student_name': student['name'],
+                'rollno': student['rollno'], 'date': data['date'], 'reason': data['reason'],
+                'pending_permissions': stats.faculty_counts(conn, faculty_id)['pending_permissions'],
+            })
             conn.commit()
+            notifications.wake()
+            cache.invalidate(cache.user_tag(session['user_id']))
             conn.close()
             return jsonify({'success': True, 'message': 'Permission request submitted successfully'})
         
         conn.close()
         return jsonify({'success': False, 'message': 'No faculty found'})
+    except proofs.ProofError as e:
+        conn.rollback()
+        conn.close()
+        return jsonify({'success': False, 'message': str(e)}), 400
     except Exception as e:
         conn.close()
         return jsonify({'success': False, 'message': f'Error submitting permission: {str(e)}'})
 
+@app.route('/api/proofs/<int:permission_id>')
+def serve_proof(permission_id):
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Unauthorized'})
+    
+    conn = get_db_connection()
+    proof = proofs.lookup(conn, permission_id)
+    conn.close()
+    
+    # Visible to the requesting student, the assigned faculty and admins
+    allowed = proof and (session['role'] == 'admin'
+                         or (session['role'] == 'student' and proof['student_id'] == session['user_id'])
+                         or (session['role'] == 'faculty' and proof['faculty_id'] == session['user_id']))
+    if not allowed:
+        return jsonify({'success': False, 'message': 'Proof not found'}), 404
+    
+    # Blobs never change, so the hash is a strong ETag; conditional=True
+    # answers If-None-Match and Range requests from the file on disk
+    response = send_file(proofs.blob_path(app.config['PROOF_FOLDER'], proof['proof_sha256']),
+                         mimetype=proof['mime_type'], download_name=proof['proof_filename'],
+                         conditional=True, etag=proof['proof_sha256'], max_age=3600)
+    response.headers['Cache-Control'] = 'private, max-age=3600'
+    return response
+
+@app.route('/api/permissions/queue')
+def permission_queue():
+    if 'user_id' not in session or session['role'] != 'faculty':
+        return jsonify({'success': False, 'message': 'Unauthorized'})
+    
+    conn = get_db_connection()
+    try:
+        rows, next_cursor = approvals.queue(conn, session['user_id'],
+                                            status=request.args.get('status') or None,
+                                            cursor=request.args.get('cursor'),
+                                            limit=request.args.get('limit', approvals.DEFAULT_PAGE_SIZE, type=int))
+    except ValueError as e:
+        conn.close()
+        return jsonify({'success': False, 'message': str(e)}), 400
+    conn.close()
+    
+    return jsonify({'success': True, 'permissions': [dict(row) for row in rows], 'next_cursor': next_cursor})
+
 @app.route('/api/upload_students', methods=['POST'])
 def upload_students():
     if 'user_id' not in session or session['role'] != 'admin':
@@ -461,81 +629,7 @@ def upload_students():
         return jsonify({'success': False, 'message': 'No file selected'})
     
     if file and allowed_file(file.filename):
-        try:
-            # Read Excel file
-            df = pd.read_excel(file)
-            
-            # Map column names to handle different variations
-            column_mapping = {
-                'name': ['Name', 'name', 'Student Name', 'student_name'],
-                'rollno': ['RollNo', 'rollno', 'Roll Number', 'roll_number', 'ID', 'Id'],
-                'email': ['Email Id', 'Email', 'email', 'Email ID'],
-                'section': ['Section', 'section'],
-                'department': ['Dept', 'Department', 'department', 'dept'],
-                'password': ['Password', 'password']
-            }
-            
-            # Find actual column names
-            actual_columns = {}
-            for standard_col, possible_names in column_mapping.items():
-                for possible_name in possible_names:
-                    if possible_name in df.columns:
-                        actual_columns[standard_col] = possible_name
-                        break
-            
-            # Check required columns
-            required_columns = ['name', 'rollno', 'email', 'section', 'department', 'password']
-            missing_columns = [col for col in required_columns if col not in actual_columns]
-            
-            if missing_columns:
-                return jsonify({'success': False, 'message': f'Missing required columns: {", ".join(missing_columns)}'})
-            
-            conn = get_db_connection()
-            success_count = 0
-            error_count = 0
-            errors = []
-            
-            for index, row in df.iterrows():
-                try:
-                    # Generate username from roll number
-                    username = str(row[actual_columns['rollno']]).strip()
-                    
-                    # Check if user already exists
-                    existing_user = conn.execute('SELECT id FROM users WHERE username = ?', (username,)).fetchone()
-                    if existing_user:
-                        error_count += 1
-                        errors.append(f"Row {index + 2}: Username {username} already exists")
-                        continue
-                    
-                    conn.execute(
-                        'INSERT INTO users (username, password, role, name, email, rollno, section, department) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
-                        (username, 
-                         str(row[actual_columns['password']]).strip(), 
-                         'student', 
-                         str(row[actual_columns['name']]).strip(),
-                         str(row[actual_columns['email']]).strip(),
-                         str(row[actual_columns['rollno']]).strip(),
-                         str(row[actual_columns['section']]).strip(),
-                         str(row[actual_columns['department']]).strip())
-                    )
-                    success_count += 1
-                except Exception as e:
-                    error_count += 1
-                    errors.append(f"Row {index + 2}: {str(e)}")
-            
-            conn.commit()
-            conn.close()
-            
-            message = f'Successfully added {success_count} students.'
-            if error_count > 0:
-                message += f' {error_count} failed.'
-                if errors:
-                    message += ' Errors: ' + '; '.join(errors[:5])  # Show first 5 errors
-            
-            return jsonify({'success': True, 'message': message})
-            
-        except Exception as e:
-            return jsonify({'success': False, 'message': f'Error processing file: {str(e)}'})
+        return _enqueue_import(file, 'students')
     
     return jsonify({'success': False, 'message': 'Invalid file type'})
 
@@ -552,79 +646,45 @@ def upload_faculty():
         return jsonify({'success': False, 'message': 'No file selected'})
     
     if file and allowed_file(file.filename):
-        try:
-            df = pd.read_excel(file)
-            
-            # Map column names to handle different variations
-            column_mapping = {
-                'name': ['Name', 'name', 'Faculty Name', 'faculty_name'],
-                'email': ['Email Id', 'Email', 'email', 'Email ID'],
-                'department': ['Dept', 'Department', 'department', 'dept'],
-                'password': ['Password', 'password']
-            }
-            
-            # Find actual column names
-            actual_columns = {}
-            for standard_col, possible_names in column_mapping.items():
-                for possible_name in possible_names:
-                    if possible_name in df.columns:
-                        actual_columns[standard_col] = possible_name
-                        break
-            
-            required_columns = ['name', 'email', 'department', 'password']
-            missing_columns = [col for col in required_columns if col not in actual_columns]
-            
-            if missing_columns:
-                return jsonify({'success': False, 'message': f'Missing required columns: {", ".join(missing_columns)}'})
-            
-            conn = get_db_connection()
-            success_count = 0
-            error_count = 0
-            errors = []
-            
-            for index, row in df.iterrows():
-                try:
-                    # Generate username from name
-                    name = str(row[actual_columns['name']]).strip()
-                    username = name.lower().replace(' ', '.') + str(index)
-                    
-                    # Check if user already exists
-                    existing_user = conn.execute('SELECT id FROM users WHERE username = ?', (username,)).fetchone()
-                    if existing_user:
-                        error_count += 1
-                        errors.append(f"Row {index + 2}: Username {username} already exists")
-                        continue
-                    
-                    conn.execute(
-                        'INSERT INTO users (username, password, role, name, email, department) VALUES (?, ?, ?, ?, ?, ?)',
-                        (username, 
-                         str(row[actual_columns['password']]).strip(), 
-                         'faculty', 
-                         name,
-                         str(row[actual_columns['email']]).strip(),
-                         str(row[actual_columns['department']]).strip())
-                    )
-                    success_count += 1
-                except Exception as e:
-                    error_count += 1
-                    errors.append(f"Row {index + 2}: {str(e)}")
-            
-            conn.commit()
-            conn.close()
-            
-            message = f'Successfully added {success_count} faculty members.'
-            if error_count > 0:
-                message += f' {error_count} failed.'
-                if errors:
-                    message += ' Errors: ' + '; '.join(errors[:5])
-            
-            return jsonify({'success': True, 'message': message})
-            
-        except Exception as e:
-            return jsonify({'success': False, 'message': f'Error processing file: {str(e)}'})
+        return _enqueue_import(file, 'faculty')
     
     return jsonify({'success': False, 'message': 'Invalid file type'})
 
+def _enqueue_import(file, kind):
+    # Parsing and inserting happen on the job runner; the client polls /api/jobs/<id>
+    try:
+        job_id = jobs.get_runner().submit(kind, file, session['user_id'])
+    except jobs.QueueFullError as e:
+        return jsonify({'success': False, 'message': str(e)}), 503
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Error processing file: {str(e)}'})
+    
+    return jsonify({'success': True,
+                    'message': 'Upload received, import started',
+                    'job_id': job_id,
+                    'status_url': url_for('job_status', job_id=job_id)}), 202
+
+@app.route('/api/jobs/<job_id>')
+def job_status(job_id):
+    if 'user_id' not in session or session['role'] != 'admin':
+        return jsonify({'success': False, 'message': 'Unauthorized'})
+    
+    job = jobs.get_runner().status(job_id)
+    if job is None:
+        return jsonify({'success': False, 'message': 'Job not found'}), 404
+    
+    report = job.pop('report')
+    job['report_url'] = url_for('import_report', name=report) if report else None
+    return jsonify({'success': True, 'job': job})
+
+@app.route('/api/import_reports/<name>')
+def import_report(name):
+    if 'user_id' not in session or session['role'] != 'admin':
+        return jsonify({'success': False, 'message': 'Unauthorized'})
+    
+    return send_from_directory(app.config['IMPORT_REPORT_FOLDER'], secure_filename(name),
+                               mimetype='text/csv', as_attachment=True)
+
 @app.route('/api/add_faculty', methods=['POST'])
 def add_faculty():
     if 'user_id' not in session or session['role'] != 'admin':
@@ -636,7 +696,7 @@ def add_faculty():
     try:
         conn.execute(
             'INSERT INTO users (username, password, role, name, email, department) VALUES (?, ?, ?, ?, ?, ?)',
-            (data['username'], data['password'], 'faculty', data['name'], 
+            (data['username'], passwords.get_hasher().hash(data['password']), 'faculty', data['name'], 
              data.get('email'), data.get('department'))
         )
         conn.commit()
@@ -654,12 +714,23 @@ def delete_user(user_id):
     if 'user_id' not in session or session['role'] != 'admin':
         return jsonify({'success': False, 'message': 'Unauthorized'})
     
+    def remove(conn):
+        event_ids = [row[0] for row in conn.execute('SELECT event_id FROM student_events WHERE student_id = ?', (user_id,))]
+        conn.execute('DELETE FROM users WHERE id = ?', (user_id,))
+        return event_ids
+    
     conn = get_db_connection()
     try:
-        conn.execute('DELETE FROM users WHERE id = ?', (user_id,))
-        conn.commit()
+        # Seats the student held go to the head of each waitlist, in the
+        # same transaction as the delete
+        promoted = registrations.promote(conn, remove)
+        cache.invalidate(cache.user_tag(user_id), 'faculty_names', *(cache.user_tag(student_id) for student_id in promoted))
+        profiles.invalidate(user_id)
         conn.close()
         return jsonify({'success': True, 'message': 'User deleted successfully'})
+    except registrations.Busy:
+        conn.close()
+        return jsonify({'success': False, 'message': 'The database is busy, please try again'}), 503, {'Retry-After': '1'}
     except Exception as e:
         conn.close()
         return jsonify({'success': False, 'message': f'Error deleting user: {str(e)}'})
@@ -667,10 +738,15 @@ def delete_user(user_id):
 @app.route('/api/get_clubs_events')
 def get_clubs_events():
     conn = get_db_connection()
-    clubs_events = conn.execute('SELECT * FROM clubs_events WHERE is_active = 1 ORDER BY type, name').fetchall()
+    snapshot = catalog.get_catalog().get(conn)
     conn.close()
     
-    return jsonify([dict(ce) for ce in clubs_events])
+    # Pre-serialized body with a strong ETag; clients revalidate every time
+    # and get 304 Not Modified while the catalog is unchanged
+    response = Response(snapshot.body, mimetype='application/json')
+    response.set_etag(snapshot.etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
 
 @app.route('/api/add_club_event', methods=['POST'])
 def add_club_event():
@@ -686,6 +762,7 @@ def add_club_event():
             (data['name'], data['type'])
         )
         conn.commit()
+        cache.invalidate('clubs_events')
         conn.close()
         return jsonify({'success': True, 'message': f'{data["type"].title()} added successfully'})
     except Exception as e:
@@ -706,6 +783,7 @@ def update_club_event(club_event_id):
             (data['name'], data['type'], club_event_id)
         )
         conn.commit()
+        cache.invalidate('clubs_events')
         conn.close()
         return jsonify({'success': True, 'message': 'Updated successfully'})
     except Exception as e:
@@ -721,12 +799,140 @@ def delete_club_event(club_event_id):
     try:
         conn.execute('DELETE FROM clubs_events WHERE id = ?', (club_event_id,))
         conn.commit()
+        cache.invalidate('clubs_events')
         conn.close()
         return jsonify({'success': True, 'message': 'Deleted successfully'})
     except Exception as e:
         conn.close()
         return jsonify({'success': False, 'message': f'Error: {str(e)}'})
 
+def _parse_capacity(value):
+    # Blank means unlimited
+    if value in (None, ''):
+        return None
+    capacity = int(value)
+    if capacity < 0:
+        raise ValueError('capacity cannot be negative')
+    return capacity
+
+@app.route('/api/events')
+def list_events():
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Unauthorized'})
+    
+    conn = get_db_connection()
+    events = registrations.events(conn, session['user_id'] if session['role'] == 'student' else None)
+    conn.close()
+    return jsonify({'success': True, 'events': events})
+
+@app.route('/api/add_event', methods=['POST'])
+def add_event():
+    if 'user_id' not in session or session['role'] != 'admin':
+        return jsonify({'success': False, 'message': 'Unauthorized'})
+    
+    data = request.json
+    try:
+        capacity = _parse_capacity(data.get('capacity'))
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'message': f'Invalid capacity: {str(e)}'}), 400
+    
+    conn = get_db_connection()
+    try:
+        event_id = conn.execute(
+            'INSERT INTO events (name, date, time, venue, description, capacity) VALUES (?, ?, ?, ?, ?, ?)',
+            (data['name'], data['date'], data.get('time'), data.get('venue'), data.get('description'), capacity)
+        ).lastrowid
+        conn.commit()
+        conn.close()
+        return jsonify({'success': True, 'message': 'Event added successfully', 'event_id': event_id})
+    except Exception as e:
+        conn.close()
+        return jsonify({'success': False, 'message': f'Error: {str(e)}'})
+
+@app.route('/api/update_event/<int:event_id>', methods=['PUT'])
+def update_event(event_id):
+    if 'user_id' not in session or session['role'] != 'admin':
+        return jsonify({'success': False, 'message': 'Unauthorized'})
+    
+    data = request.json
+    try:
+        capacity = _parse_capacity(data.get('capacity'))
+    except (TypeError, ValueError) as e:
+        return jsonify({'success': False, 'message': f'Invalid capacity: {str(e)}'}), 400
+    
+    def update(conn):
+        conn.execute('UPDATE events SET name = ?, date = ?, time = ?, venue = ?, description = ? WHERE id = ?',
+                     (data['name'], data['date'], data.get('time'), data.get('venue'), data.get('description'), event_id))
+    
+    conn = get_db_connection()
+    try:
+        if 'capacity' in data:
+            # A larger capacity seats students from the waitlist; committed
+            # together with the rest of the update
+            promoted = registrations.set_capacity(conn, event_id, capacity, update)
+        else:
+            update(conn)
+            conn.commit()
+            promoted = []
+        cache.invalidate(*(cache.user_tag(student_id) for student_id in promoted))
+        conn.close()
+        return jsonify({'success': True, 'message': 'Event updated successfully', 'promoted': len(promoted)})
+    except registrations.Busy:
+        conn.close()
+        return jsonify({'success': False, 'message': 'Registrations are busy, please try again'}), 503, {'Retry-After': '1'}
+    except Exception as e:
+        conn.rollback()
+        conn.close()
+        return jsonify({'success': False, 'message': f'Error: {str(e)}'})
+
+@app.route('/api/events/<int:event_id>/register', methods=['POST'])
+def register_event(event_id):
+    if 'user_id' not in session or session['role'] != 'student':
+        return jsonify({'success': False, 'message': 'Unauthorized'})
+    
+    student_id = session['user_id']
+    conn = get_db_connection()
+    try:
+        result = registrations.register(conn, event_id, student_id)
+    except registrations.Busy:
+        conn.close()
+        return jsonify({'success': False, 'message': 'Registrations are busy, please try again'}), 503, {'Retry-After': '1'}
+    conn.close()
+    
+    status = result['status']
+    if status == 'not_found':
+        return jsonify({'success': False, 'message': 'Event not found'}), 404
+    if status == 'registered':
+        cache.invalidate(cache.user_tag(student_id))
+        message = 'Registered for the event'
+    elif status == 'already_registered':
+        message = 'You are already registered for this event'
+    else:
+        message = f'The event is full; you are number {result["position"]} on the waitlist'
+    return jsonify({'success': True, 'message': message, **result})
+
+@app.route('/api/events/<int:event_id>/cancel', methods=['POST'])
+def cancel_event_registration(event_id):
+    if 'user_id' not in session or session['role'] != 'student':
+        return jsonify({'success': False, 'message': 'Unauthorized'})
+    
+    student_id = session['user_id']
+    conn = get_db_connection()
+    try:
+        result = registrations.cancel(conn, event_id, student_id)
+    except registrations.Busy:
+        conn.close()
+        return jsonify({'success': False, 'message': 'Registrations are busy, please try again'}), 503, {'Retry-After': '1'}
+    conn.close()
+    
+    if result['status'] == 'not_registered':
+        return jsonify({'success': False, 'message': 'You are not registered for this event'})
+    # The student's and the promoted students' event counts changed
+    cache.invalidate(*(cache.user_tag(student) for student in [student_id] + result['promoted']))
+    message = 'Registration cancelled' if result['status'] == 'cancelled' else 'Removed from the waitlist'
+    return jsonify({'success': True, 'message': message, 'status': result['status'],
+                    'promoted': len(result['promoted'])})
+
 @app.route('/api/change_password', methods=['POST'])
 def change_password():
     if 'user_id' not in session:
@@ -736,19 +942,21 @@ def change_password():
     user_id = session['user_id']
     
     conn = get_db_connection()
-    user = conn.execute('SELECT * FROM users WHERE id = ?', (user_id,)).fetchone()
-    
-    if not user or user['password'] != data['current_password']:
-        conn.close()
-        return jsonify({'success': False, 'message': 'Current password is incorrect'})
+    user = conn.execute('SELECT password FROM users WHERE id = ?', (user_id,)).fetchone()
     
     if data['new_password'] != data['confirm_password']:
         conn.close()
         return jsonify({'success': False, 'message': 'New passwords do not match'})
     
     try:
-        conn.execute('UPDATE users SET password = ? WHERE id = ?', (data['new_password'], user_id))
+        hasher = passwords.get_hasher()
+        ok, _ = hasher.verify(user['password'] if user else None, data['current_password'])
+        if not ok:
+            conn.close()
+            return jsonify({'success': False, 'message': 'Current password is incorrect'})
+        conn.execute('UPDATE users SET password = ? WHERE id = ?', (hasher.hash(data['new_password']), user_id))
         conn.commit()
+        profiles.invalidate(user_id)
         conn.close()
         return jsonify({'success': True, 'message': 'Password changed successfully'})
     except Exception as e:
@@ -776,60 +984,418 @@ def update_user(user_id):
                 (data['name'], data.get('email'), data.get('department'), user_id)
             )
         conn.commit()
+        cache.invalidate(cache.user_tag(user_id), *([] if data.get('role') == 'student' else ['faculty_names']))
+        profiles.invalidate(user_id)
         conn.close()
         return jsonify({'success': True, 'message': 'User updated successfully'})
     except Exception as e:
         conn.close()
         return jsonify({'success': False, 'message': f'Error updating user: {str(e)}'})
 
+@app.route('/api/users')
+def list_users():
+    if 'user_id' not in session or session['role'] != 'admin':
+        return jsonify({'success': False, 'message': 'Unauthorized'})
+    
+    conn = get_db_connection()
+    try:
+        rows, next_cursor = users.list_users(
+            conn,
+            request.args.get('role', 'student'),
+            filters={column: request.args.get(column) for column in users.FILTER_COLUMNS},
+            search=request.args.get('q'),
+            cursor=request.args.get('cursor'),
+            limit=request.args.get('limit', users.DEFAULT_PAGE_SIZE, type=int)
+        )
+    except ValueError as e:
+        conn.close()
+        return jsonify({'success': False, 'message': str(e)}), 400
+    conn.close()
+    
+    return jsonify({'success': True,
+                    'users': [{key: row[key] for key in row.keys() if key != 'sort_key'} for row in rows],
+                    'next_cursor': next_cursor})
+
+@app.route('/api/search')
+def search_portal():
+    if 'user_id' not in session or session['role'] not in ('admin', 'faculty'):
+        return jsonify({'success': False, 'message': 'Unauthorized'})
+    
+    faculty_id = session['user_id'] if session['role'] == 'faculty' else None
+    conn = get_db_connection()
+    hits, has_more = search.search(conn, request.args.get('q', ''),
+                                   faculty_id=faculty_id,
+                                   limit=request.args.get('limit', search.DEFAULT_PAGE_SIZE, type=int),
+                                   offset=request.args.get('offset', 0, type=int))
+    conn.close()
+    
+    return jsonify({'success': True, 'results': hits, 'has_more': has_more})
+
 @app.route('/api/get_user/<int:user_id>')
 def get_user(user_id):
     if 'user_id' not in session or session['role'] != 'admin':
         return jsonify({'success': False, 'message': 'Unauthorized'})
     
     conn = get_db_connection()
-    user = conn.execute('SELECT * FROM users WHERE id = ?', (user_id,)).fetchone()
+    user = profiles.get_profiles().get(conn, user_id)
     conn.close()
     
     if user:
-        return jsonify({'success': True, 'user': dict(user)})
+        return jsonify({'success': True, 'user': user})
     else:
         return jsonify({'success': False, 'message': 'User not found'})
 
+@app.route('/api/attendance/summary')
+def attendance_summary():
+    if 'user_id' not in session or session['role'] != 'student':
+        return jsonify({'success': False, 'message': 'Unauthorized'})
+    
+    conn = get_db_connection()
+    summary = rollups.student_summary(conn, session['user_id'])
+    conn.close()
+    
+    return jsonify({'success': True, 'summary': summary})
+
+@app.route('/api/attendance/class/<int:class_id>')
+def class_attendance(class_id):
+    if 'user_id' not in session or session['role'] not in ('admin', 'faculty'):
+        return jsonify({'success': False, 'message': 'Unauthorized'})
+    
+    conn = get_db_connection()
+    if session['role'] == 'faculty':
+        owner = conn.execute('SELECT faculty_id FROM classes WHERE id = ?', (class_id,)).fetchone()
+        if not owner or owner['faculty_id'] != session['user_id']:
+            conn.close()
+            return jsonify({'success': False, 'message': 'Unauthorized'})
+    students = rollups.class_percentages(conn, class_id)
+    conn.close()
+    
+    return jsonify({'success': True, 'students': students})
+
+@app.route('/api/classes/<int:class_id>/enrollment', methods=['GET', 'POST', 'DELETE'])
+def class_enrollment(class_id):
+    if 'user_id' not in session or session['role'] not in ('admin', 'faculty'):
+        return jsonify({'success': False, 'message': 'Unauthorized'})
+    
+    conn = get_db_connection()
+    owner = conn.execute('SELECT faculty_id FROM classes WHERE id = ?', (class_id,)).fetchone()
+    if not owner:
+        conn.close()
+        return jsonify({'success': False, 'message': 'Class not found'})
+    # Faculty can view the roster of classes they teach; only admins change it
+    if session['role'] == 'faculty' and (request.method != 'GET' or owner['faculty_id'] != session['user_id']):
+        conn.close()
+        return jsonify({'success': False, 'message': 'Unauthorized'})
+    
+    if request.method == 'GET':
+        try:
+            session_date, period = enrollment.parse_session(request.args.get('date'), request.args.get('period'))
+        except ValueError:
+            conn.close()
+            return jsonify({'success': False, 'message': 'Invalid date or period'})
+        students = [dict(row) for row in enrollment.roster(conn, class_id, session_date, period)]
+        conn.close()
+        return jsonify({'success': True, 'date': session_date, 'period': period, 'students': students})
+    
+    # Body: {"student_ids": [...]} or, to add, {"department": ..., "section": ...}
+    data = request.json or {}
+    try:
+        if request.method == 'DELETE':
+            changed = enrollment.unenroll(conn, class_id, data.get('student_ids') or [])
+        elif data.get('department') and data.get('section'):
+            changed = enrollment.enroll_section(conn, class_id, data['department'], data['section'])
+        else:
+            changed = enrollment.enroll(conn, class_id, data.get('student_ids') or [])
+        conn.commit()
+        conn.close()
+        return jsonify({'success': True, 'changed': changed})
+    except Exception as e:
+        conn.close()
+        return jsonify({'success': False, 'message': f'Error updating enrollment: {str(e)}'})
+
+def _timetable_scope(conn, table):
+    # (per-day indexes, memo key) for the caller: students see their
+    # enrolled classes; faculty and admins see their own or, with
+    # ?faculty_id= or ?department=&section=, anyone's (admins default to all)
+    if session['role'] == 'student':
+        class_ids = [row[0] for row in conn.execute('SELECT class_id FROM enrollments WHERE student_id = ?',
+                                                    (session['user_id'],))]
+        return table.scope(class_ids=class_ids), None
+    if request.args.get('department') is not None and request.args.get('section') is not None:
+        key = (request.args['department'], request.args['section'])
+        return table.scope(section=key), ('section', key)
+    faculty_id = request.args.get('faculty_id', type=int)
+    if faculty_id is None and session['role'] == 'faculty':
+        faculty_id = session['user_id']
+    if faculty_id is not None:
+        return table.scope(faculty_id=faculty_id), ('faculty', faculty_id)
+    return table.scope(), ('all',)
+
+@app.route('/api/timetable/now')
+def timetable_now():
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Unauthorized'})
+    try:
+        when = timetable.parse_when(request.args.get('at'))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Invalid time'})
+    
+    conn = get_db_connection()
+    table = timetable.get_timetable().get(conn)
+    days, _ = _timetable_scope(conn, table)
+    conn.close()
+    
+    return jsonify({'success': True, 'at': when.isoformat(timespec='minutes'),
+                    'day': timetable.DAYS[when.weekday()], **table.now(days, when)})
+
+@app.route('/api/timetable/week')
+def timetable_week():
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Unauthorized'})
+    
+    conn = get_db_connection()
+    table = timetable.get_timetable().get(conn)
+    days, key = _timetable_scope(conn, table)
+    conn.close()
+    
+    def build():
+        result = {'success': True, 'days': table.week(days)}
+        if key == ('all',):
+            # Classes whose schedule text could not be read
+            result['unscheduled'] = [table.classes[class_id] for class_id in table.unscheduled]
+        return json.dumps(result).encode('utf-8')
+    
+    # Serialized once per scope and timetable version
+    body = table.cached(('week', key), build) if key else build()
+    return Response(body, mimetype='application/json')
+
+@app.route('/api/attendance/section')
+def section_attendance():
+    if 'user_id' not in session or session['role'] not in ('admin', 'faculty'):
+        return jsonify({'success': False, 'message': 'Unauthorized'})
+    
+    department = request.args.get('department')
+    section = request.args.get('section')
+    if not department or not section:
+        return jsonify({'success': False, 'message': 'department and section are required'}), 400
+    
+    conn = get_db_connection()
+    students = rollups.section_percentages(conn, department, section)
+    conn.close()
+    
+    return jsonify({'success': True, 'students': students})
+
+@app.route('/api/attendance/shortlist')
+def attendance_shortlist():
+    if 'user_id' not in session or session['role'] not in ('admin', 'faculty'):
+        return jsonify({'success': False, 'message': 'Unauthorized'})
+    
+    conn = get_db_connection()
+    students = rollups.shortlist(conn,
+                                 threshold=request.args.get('threshold', rollups.DEFAULT_THRESHOLD, type=float),
+                                 class_id=request.args.get('class_id', type=int),
+                                 department=request.args.get('department'),
+                                 section=request.args.get('section'))
+    conn.close()
+    
+    return jsonify({'success': True, 'students': students})
+
+@app.route('/api/reports/attendance')
+def attendance_report():
+    if 'user_id' not in session or session['role'] not in ('admin', 'faculty'):
+        return jsonify({'success': False, 'message': 'Unauthorized'})
+    
+    fmt = request.args.get('format', 'xlsx')
+    report = request.args.get('report', 'summary')
+    if fmt not in reports.FORMATS or report not in reports.REPORTS:
+        return jsonify({'success': False, 'message': 'Unsupported format or report'}), 400
+    
+    class_id = request.args.get('class_id', type=int)
+    conn = get_db_connection()
+    if session['role'] == 'faculty':
+        # Faculty can only export classes they teach
+        owner = conn.execute('SELECT faculty_id FROM classes WHERE id = ?', (class_id,)).fetchone()
+        if not owner or owner['faculty_id'] != session['user_id']:
+            conn.close()
+            return jsonify({'success': False, 'message': 'Unauthorized'})
+    
+    frames = reports.build_reports(conn,
+                                   threshold=request.args.get('threshold', reports.DEFAULT_THRESHOLD, type=float),
+                                   date_from=request.args.get('from'),
+                                   date_to=request.args.get('to'),
+                                   class_id=class_id,
+                                   department=request.args.get('department'),
+                                   section=request.args.get('section'))
+    conn.close()
+    
+    try:
+        output = reports.export(frames, fmt, report)
+    except ImportError:
+        return jsonify({'success': False, 'message': 'Parquet export needs pyarrow installed on the server'}), 501
+    
+    name = f'attendance_{report}.{fmt}' if fmt != 'xlsx' else 'attendance_report.xlsx'
+    return send_file(output, mimetype=reports.FORMATS[fmt], as_attachment=True, download_name=name)
+
+def _export_response(sql, params, columns, name):
+    fmt = request.args.get('format', 'csv')
+    if fmt not in exports.FORMATS:
+        return jsonify({'success': False, 'message': 'Unsupported format'}), 400
+    
+    # stream_with_context keeps the request (and its pooled connection) alive
+    # until the last chunk has been sent
+    body = exports.stream(get_db_connection(), fmt, sql, params, columns, title=name)
+    response = Response(stream_with_context(body), mimetype=exports.FORMATS[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename={name}.{fmt}'
+    return response
+
+@app.route('/api/export/users')
+def export_users():
+    if 'user_id' not in session or session['role'] != 'admin':
+        return jsonify({'success': False, 'message': 'Unauthorized'})
+    
+    role = request.args.get('role', 'student')
+    if role not in ('student', 'faculty'):
+        return jsonify({'success': False, 'message': 'Unknown role'}), 400
+    
+    sql, params = exports.users_query(role,
+                                      department=request.args.get('department'),
+                                      section=request.args.get('section'))
+    return _export_response(sql, params, exports.USER_COLUMNS, f'{role}_roster')
+
+@app.route('/api/export/attendance')
+def export_attendance():
+    if 'user_id' not in session or session['role'] != 'admin':
+        return jsonify({'success': False, 'message': 'Unauthorized'})
+    
+    sql, params = exports.attendance_query(date_from=request.args.get('from'),
+                                           date_to=request.args.get('to'),
+                                           department=request.args.get('department'),
+                                           section=request.args.get('section'),
+                                           class_id=request.args.get('class_id', type=int))
+    return _export_response(sql, params, exports.ATTENDANCE_COLUMNS, 'attendance_register')
+
+@app.route('/api/db_stats')
+def db_stats():
+    if 'user_id' not in session or session['role'] != 'admin':
+        return jsonify({'success': False, 'message': 'Unauthorized'})
+    
+    return jsonify({'success': True, 'stats': database.get_pool().stats()})
+
+@app.route('/api/cache_stats')
+def cache_stats():
+    if 'user_id' not in session or session['role'] != 'admin':
+        return jsonify({'success': False, 'message': 'Unauthorized'})
+    
+    return jsonify({'success': True, 'stats': cache.get_cache().stats()})
+
+@app.route('/metrics')
+def metrics():
+    # Prometheus scrape endpoint; only exists with INSTRUMENTATION_ENABLED.
+    # Route names and timings are internal, so scrape with an admin session.
+    if 'user_id' not in session or session['role'] != 'admin':
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+    
+    collected = instrumentation.get_metrics()
+    if collected is None:
+        return Response('Not Found', status=404, mimetype='text/plain')
+    return Response(collected.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/slow_queries')
+def slow_queries():
+    if 'user_id' not in session or session['role'] != 'admin':
+        return jsonify({'success': False, 'message': 'Unauthorized'})
+    
+    collected = instrumentation.get_metrics()
+    if collected is None:
+        return jsonify({'success': False, 'message': 'Instrumentation is disabled'}), 404
+    return jsonify({'success': True, 'queries': list(collected.slow_queries)})
+
+@app.route('/api/notifications/stream')
+def notification_stream():
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 401
+    
+    # Resume after Last-Event-ID when the browser reconnects, or after the id
+    # the page was rendered with; without either the stream starts live
+    resume = request.headers.get('Last-Event-ID') or request.args.get('since')
+    try:
+        after_id = int(resume) if resume else None
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Invalid event id'}), 400
+    
+    user_id = session['user_id']
+    hub = notifications.get_hub()
+    try:
+        # Subscribe before reading the backlog so nothing falls in between
+        subscriber = hub.subscribe(user_id)
+    except notifications.StreamLimitError as e:
+        return jsonify({'success': False, 'message': str(e)}), 503, {'Retry-After': '5'}
+    
+    backlog, reset = [], False
+    if after_id is not None:
+        limit = app.config['NOTIFY_REPLAY_LIMIT']
+        try:
+            conn = get_db_connection()
+            backlog = [tuple(row) for row in notifications.replay(conn, user_id, after_id, limit + 1)]
+            conn.close()
+        except Exception:
+            hub.unsubscribe(subscriber)
+            raise
+        if len(backlog) > limit:
+            backlog, reset = [], True
+            after_id = None
+    
+    # No pooled connection is held while the stream is open
+    response = Response(hub.stream(subscriber, backlog, after_id or 0, reset), mimetype='text/event-stream')
+    response.call_on_close(lambda: hub.unsubscribe(subscriber))
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 @app.route('/api/mark_attendance', methods=['POST'])
 def mark_attendance():
     if 'user_id' not in session or session['role'] != 'faculty':
         return jsonify({'success': False, 'message': 'Unauthorized'})
     
-    data = request.json
+    data = request.json or {}
     faculty_id = session['user_id']
     
+    try:
+        session_date, period = enrollment.parse_session(data.get('date'), data.get('period'))
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'message': 'Invalid date or period'})
+    if session_date > date.today().isoformat():
+        return jsonify({'success': False, 'message': 'Cannot mark attendance for a future date'})
+    
     conn = get_db_connection()
     try:
-        # Get class_id for the faculty (simplified - in real app would need proper class mapping)
-        class_info = conn.execute('SELECT id FROM classes WHERE faculty_id = ? LIMIT 1', (faculty_id,)).fetchone()
+        # The session's class must be one this faculty teaches
+        class_info = conn.execute('SELECT id, name FROM classes WHERE id = ? AND faculty_id = ?',
+                                  (data.get('class_id'), faculty_id)).fetchone()
         
         if not class_info:
             conn.close()
-            return jsonify({'success': False, 'message': 'No classes assigned to faculty'})
+            return jsonify({'success': False, 'message': 'Class not found'})
         
         class_id = class_info['id']
-        today = date.today().isoformat()
-        
-        # Delete existing attendance for today to avoid duplicates
-        conn.execute('DELETE FROM attendance WHERE date = ? AND marked_by = ?', (today, faculty_id))
         
-        # Insert new attendance records
-        for student_id, status in data['attendance'].items():
-            if status in ['present', 'absent']:
-                conn.execute(
-                    'INSERT INTO attendance (student_id, class_id, date, status, marked_by) VALUES (?, ?, ?, ?, ?)',
-                    (int(student_id), class_id, today, status, faculty_id)
-                )
+        # Upsert the whole sheet in one batch; unchanged marks are not
+        # rewritten and students not enrolled in the class are skipped
+        changed = []
+        counts = marking.mark_bulk(conn, class_id, session_date, data['attendance'], faculty_id, period,
+                                   enrolled=enrollment.student_ids(conn, class_id), changed=changed)
+        session_id = enrollment.open_session(conn, class_id, session_date, period, faculty_id)
+        # Only new or changed marks reach the students' dashboards
+        notifications.publish_many(conn, ((student_id, 'attendance', {
+            'class_id': class_id, 'subject': class_info['name'], 'date': session_date, 'period': period,
+            'status': status, 'marked_by': session.get('name'),
+        }) for student_id, status in changed))
         
         conn.commit()
+        notifications.wake()
+        cache.invalidate(*(cache.user_tag(student_id) for student_id in data['attendance']))
         conn.close()
-        return jsonify({'success': True, 'message': 'Attendance marked successfully'})
+        return jsonify({'success': True, 'message': 'Attendance marked successfully', 'session_id': session_id, **counts})
         
     except Exception as e:
         conn.close()
@@ -0,0 +1,111 @@
+# Faculty permission queue: the requests routed to one faculty member, oldest
+# first, keyset-paginated by id and optionally filtered by status - and batch
+# status changes over that queue.
+
+STATUSES = ('pending', 'approved', 'rejected')
+MAX_PAGE_SIZE = 100
+DEFAULT_PAGE_SIZE = 25
+MAX_BATCH_SIZE = 1000
+# Stays well under SQLite's bound-parameter limit for IN (...) lookups
+LOOKUP_CHUNK = 500
+
+QUEUE_COLUMNS = '''p.id, p.student_id, p.date, p.reason, p.proof, p.proof_filename, p.status, p.created_at,
+                   u.name AS student_name, u.rollno, u.department, u.section'''
+
+
+def queue(conn, faculty_id, status=None, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    # Returns (rows, next_cursor); the cursor is the last id of the page
+    if status is not None and status not in STATUSES:
+        raise ValueError(f'Unknown status: {status}')
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+
+    where = ['p.faculty_id = ?']
+    params = [faculty_id]
+    if status:
+        where.append('p.status = ?')
+        params.append(status)
+    if cursor:
+        try:
+            after_id = int(cursor)
+        except ValueError:
+            raise ValueError('Invalid cursor')
+        where.append('p.id > ?')
+        params.append(after_id)
+
+    rows = conn.execute(f'''
+        SELECT {QUEUE_COLUMNS}
+        FROM permissions p
+        JOIN users u ON u.id = p.student_id
+        WHERE {' AND '.join(where)}
+        ORDER BY p.id
+        LIMIT ?
+    ''', (*params, limit + 1)).fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = str(rows[-1]['id'])
+    return rows, next_cursor
+
+
+def matching_ids(conn, faculty_id, status='pending', date=None, date_from=None, date_to=None):
+    # Ids in a faculty's queue matching a filter, e.g. all pending for a date
+    where = ['faculty_id = ?']
+    params = [faculty_id]
+    if status:
+        if status not in STATUSES:
+            raise ValueError(f'Unknown status: {status}')
+        where.append('status = ?')
+        params.append(status)
+    if date:
+        where.append('date = ?')
+        params.append(date)
+    if date_from:
+        where.append('date >= ?')
+        params.append(date_from)
+    if date_to:
+        where.append('date <= ?')
+        params.append(date_to)
+    return [row[0] for row in conn.execute(
+        f"SELECT id FROM permissions WHERE {' AND '.join(where)} ORDER BY id", params)]
+
+
+def apply_batch(conn, faculty_id, updates):
+    # updates is a list of (permission_id, status). Every id is checked against
+    # the faculty's queue and all accepted changes go out in one executemany;
+    # the caller commits. Returns (results, student_ids) where results maps id
+    # to 'updated', 'unchanged', 'not_found', 'forbidden' or 'invalid_status'.
+    results = {}
+    wanted = {}
+    for permission_id, status in updates:
+        if status not in STATUSES:
+            results[permission_id] = 'invalid_status'
+        else:
+            wanted[permission_id] = status
+
+    ids = list(wanted)
+    current = {}
+    for start in range(0, len(ids), LOOKUP_CHUNK):
+        chunk = ids[start:start + LOOKUP_CHUNK]
+        placeholders = ', '.join('?' * len(chunk))
+        for row in conn.execute(
+                f'SELECT id, faculty_id, student_id, status FROM permissions WHERE id IN ({placeholders})', chunk):
+            current[row[0]] = row
+
+    rows = []
+    student_ids = set()
+    for permission_id, status in wanted.items():
+        row = current.get(permission_id)
+        if row is None:
+            results[permission_id] = 'not_found'
+        elif row[1] != faculty_id:
+            results[permission_id] = 'forbidden'
+        elif row[3] == status:
+            results[permission_id] = 'unchanged'
+        else:
+            results[permission_id] = 'updated'
+            rows.append((status, permission_id, faculty_id))
+            student_ids.add(row[2])
+
+    conn.executemany('UPDATE permissions SET status = ? WHERE id = ? AND faculty_id = ?', rows)
+    return results, student_ids
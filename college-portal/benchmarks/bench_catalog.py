@@ -0,0 +1,65 @@
+# /api/get_clubs_events: the old query + jsonify on every request versus the
+# versioned catalog (200 with a cached body, and 304 on revalidation).
+import argparse
+import json
+import time
+
+from flask import jsonify
+
+import catalog
+from benchmarks.common import fresh_app, login, raw_connection, summarize
+
+
+def populate(count):
+    conn = raw_connection()
+    conn.executemany('INSERT INTO clubs_events (name, type) VALUES (?, ?)',
+                     ((f'Catalog entry {i}', 'club' if i % 2 else 'event') for i in range(count)))
+    conn.commit()
+    conn.close()
+
+
+def sample(fn, requests):
+    samples = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--entries', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=2_000)
+    args = parser.parse_args()
+
+    app = fresh_app()
+    populate(args.entries)
+    client = login(app.test_client(), 4, 'student')
+    conn = raw_connection()
+
+    def legacy():
+        with app.test_request_context():
+            rows = conn.execute('SELECT * FROM clubs_events WHERE is_active = 1 ORDER BY type, name').fetchall()
+            jsonify([dict(row) for row in rows]).get_data()
+
+    def cached():
+        with app.test_request_context():
+            catalog.get_catalog(app).get(conn).body
+
+    etag = client.get('/api/get_clubs_events').headers['ETag']
+    print(json.dumps({
+        'entries': args.entries,
+        # Handler work only, without the test client round trip
+        'legacy_query_and_jsonify': sample(legacy, args.requests),
+        'catalog_lookup': sample(cached, args.requests),
+        # Full requests through the test client
+        'catalog_200': sample(lambda: client.get('/api/get_clubs_events'), args.requests),
+        'catalog_304': sample(lambda: client.get('/api/get_clubs_events', headers={'If-None-Match': etag}),
+                              args.requests),
+    }, indent=2))
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+# Dashboard statistics at scale: the old COUNT(*) scans versus the
+# trigger-maintained counters in stats.py, plus end-to-end render time of
+# the admin dashboard at the same size.
+import argparse
+import json
+import time
+
+import stats
+from benchmarks.common import fresh_app, login, raw_connection
+
+LEGACY_ADMIN_COUNTS = [
+    'SELECT COUNT(*) FROM users WHERE role = "student"',
+    'SELECT COUNT(*) FROM users WHERE role = "faculty"',
+    'SELECT COUNT(*) FROM permissions WHERE status = "pending"',
+    'SELECT COUNT(*) FROM events',
+]
+
+
+def populate(users, permissions):
+    conn = raw_connection()
+    conn.execute('''
+        WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?)
+        INSERT INTO users (username, password, role, name, rollno, section, department)
+        SELECT 'u' || i, 'x', CASE WHEN i % 50 = 0 THEN 'faculty' ELSE 'student' END,
+               'User ' || i, printf('%07d', i), char(65 + i % 6), 'Dept ' || (i % 8) FROM n
+    ''', (users,))
+    conn.execute('''
+        WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?)
+        INSERT INTO permissions (student_id, faculty_id, date, reason, status)
+        SELECT 6 + i % 1000, 2, '2024-01-01', 'Reason', CASE WHEN i % 3 = 0 THEN 'pending' ELSE 'approved' END FROM n
+    ''', (permissions,))
+    conn.commit()
+    conn.close()
+
+
+def best_of(repeat, fn):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return round(min(samples) * 1000, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=100_000)
+    parser.add_argument('--permissions', type=int, default=200_000)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    app = fresh_app()
+    populate(args.users, args.permissions)
+    conn = raw_connection()
+    client = login(app.test_client(), 1, 'admin')
+
+    print(json.dumps({
+        'users': args.users,
+        'legacy_count_queries_ms': best_of(args.repeat, lambda: [conn.execute(sql).fetchone() for sql in LEGACY_ADMIN_COUNTS]),
+        'stats_counters_ms': best_of(args.repeat, lambda: stats.admin_counts(conn)),
+        'admin_dashboard_render_ms': best_of(3, lambda: client.get('/admin/dashboard')),
+        'drift': stats.check(conn),
+    }, indent=2))
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
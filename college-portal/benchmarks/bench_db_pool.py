@@ -0,0 +1,96 @@
+# p99 latency of /student/dashboard while faculty keep posting attendance.
+# Compares the legacy setup (rollback journal, a new connection per request)
+# with the pooled WAL connection layer.
+import argparse
+import json
+import threading
+import time
+from datetime import date, timedelta
+
+from benchmarks.common import fresh_app, login, raw_connection, seed_students, summarize
+
+LEGACY = {
+    'SQLITE_POOL_SIZE': 0,
+    'SQLITE_JOURNAL_MODE': 'DELETE',
+    'SQLITE_SYNCHRONOUS': 'FULL',
+    'SQLITE_CACHE_SIZE': -2000,
+    'SQLITE_MMAP_SIZE': 0,
+}
+
+
+def seed_history(student_ids, days):
+    conn = raw_connection()
+    start = date.today() - timedelta(days=days)
+    conn.executemany(
+        'INSERT INTO attendance (student_id, class_id, date, status, marked_by) VALUES (?, ?, ?, ?, ?)',
+        ((sid, 1, (start + timedelta(days=d)).isoformat(), 'present' if (sid + d) % 5 else 'absent', 2)
+         for d in range(days) for sid in student_ids)
+    )
+    conn.commit()
+    conn.close()
+
+
+def run(config, args):
+    app = fresh_app(**config)
+    student_ids = seed_students(args.students)
+    seed_history(student_ids, args.days)
+    payload = {'attendance': {str(sid): 'present' for sid in student_ids}}
+
+    stop = threading.Event()
+    read_samples = []
+    write_samples = []
+    lock = threading.Lock()
+
+    def reader(index):
+        client = login(app.test_client(), student_ids[index % len(student_ids)], 'student')
+        while not stop.is_set():
+            started = time.perf_counter()
+            client.get('/student/dashboard')
+            elapsed = time.perf_counter() - started
+            with lock:
+                read_samples.append(elapsed)
+
+    def writer():
+        client = login(app.test_client(), 2, 'faculty')
+        while not stop.is_set():
+            started = time.perf_counter()
+            client.post('/api/mark_attendance', json=payload)
+            elapsed = time.perf_counter() - started
+            with lock:
+                write_samples.append(elapsed)
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(args.readers)]
+    threads += [threading.Thread(target=writer) for _ in range(args.writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    pool = app.extensions.get('db_pool')
+    return {
+        'dashboard': summarize(read_samples),
+        'mark_attendance': summarize(write_samples),
+        'pool': pool.stats() if pool else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--students', type=int, default=300)
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--duration', type=float, default=10.0)
+    args = parser.parse_args()
+
+    results = {
+        'legacy': run(LEGACY, args),
+        'pooled_wal': run({}, args),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
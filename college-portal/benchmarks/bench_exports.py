@@ -0,0 +1,84 @@
+# Memory and throughput of the streaming exports against building the whole
+# file from fetchall(), the way the dashboards load their tables.
+import argparse
+import csv
+import io
+import json
+import time
+import tracemalloc
+
+import exports
+from benchmarks.common import fresh_app, login, raw_connection, seed_students
+
+
+def populate(students, rows):
+    seed_students(students)
+    conn = raw_connection()
+    conn.execute('''
+        WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i < ? - 1)
+        INSERT INTO attendance (student_id, class_id, date, status, marked_by)
+        SELECT 6 + i % ?, 1 + (i / ?) % 2, date('2024-07-01', '+' || (i / (? * 2)) || ' days'),
+               CASE WHEN i % 7 = 0 THEN 'absent' ELSE 'present' END, 2
+        FROM n
+    ''', (rows, students, students, students))
+    conn.commit()
+    conn.close()
+
+
+def legacy_csv(conn, sql, params, columns):
+    rows = conn.execute(sql, params).fetchall()
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    writer.writerows(tuple(row) for row in rows)
+    return len(buffer.getvalue().encode('utf-8'))
+
+
+def streamed(client, url):
+    response = client.get(url, buffered=False)
+    size = sum(len(chunk) for chunk in response.response)
+    response.close()
+    return size
+
+
+def measure(fn):
+    # Timed and traced in separate runs: tracemalloc slows allocation-heavy
+    # code (openpyxl especially) by an order of magnitude
+    started = time.perf_counter()
+    size = fn()
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'seconds': round(elapsed, 3), 'bytes': size, 'peak_mb': round(peak / 2**20, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--students', type=int, default=5_000)
+    parser.add_argument('--xlsx', action='store_true', help='also time the XLSX export (slow)')
+    args = parser.parse_args()
+
+    app = fresh_app()
+    populate(args.students, args.rows)
+    client = login(app.test_client(), 1, 'admin')
+    conn = raw_connection()
+    sql, params = exports.attendance_query()
+
+    results = {
+        'legacy_fetchall_csv': measure(lambda: legacy_csv(conn, sql, params, exports.ATTENDANCE_COLUMNS)),
+        'streaming_csv': measure(lambda: streamed(client, '/api/export/attendance?format=csv')),
+    }
+    if args.xlsx:
+        results['streaming_xlsx'] = measure(lambda: streamed(client, '/api/export/attendance?format=xlsx'))
+    for result in results.values():
+        result['rows_per_s'] = round(args.rows / result['seconds']) if result['seconds'] else None
+    conn.close()
+
+    print(json.dumps({'rows': args.rows, **results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+# Student dashboard latency with the fragment cache cold (every section
+# rendered from SQLite) versus warm (served from cache), per backend.
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+import cache
+from benchmarks.common import fresh_app, login, raw_connection, seed_students, summarize
+
+
+def populate(student_ids, days):
+    conn = raw_connection()
+    conn.executemany(
+        'INSERT INTO attendance (student_id, class_id, date, status, marked_by) VALUES (?, 1, ?, ?, 2)',
+        ((student_id, f'2024-{1 + day // 28:02d}-{1 + day % 28:02d}', 'present' if (student_id + day) % 6 else 'absent')
+         for student_id in student_ids for day in range(days))
+    )
+    conn.executemany(
+        'INSERT INTO permissions (student_id, faculty_id, date, reason, status) VALUES (?, 2, ?, ?, ?)',
+        ((student_id, '2024-03-01', 'Club activity', 'pending') for student_id in student_ids for _ in range(5))
+    )
+    conn.commit()
+    conn.close()
+
+
+def run(app, student_ids, requests, warm):
+    fragments = cache.get_cache(app)
+    samples = []
+    for _ in range(requests):
+        student_id = random.choice(student_ids)
+        client = login(app.test_client(), student_id, 'student')
+        if warm:
+            client.get('/student/dashboard')
+        else:
+            fragments.clear()
+        started = time.perf_counter()
+        response = client.get('/student/dashboard')
+        samples.append(time.perf_counter() - started)
+        assert response.status_code == 200
+    return summarize(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--students', type=int, default=2_000)
+    parser.add_argument('--days', type=int, default=120)
+    parser.add_argument('--requests', type=int, default=300)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='portal-bench-')
+    app = fresh_app(workdir)
+    student_ids = seed_students(args.students)
+    populate(student_ids, args.days)
+
+    results = {}
+    for backend in ('memory', 'sqlite'):
+        app.extensions.pop('fragment_cache', None)
+        app.config['FRAGMENT_CACHE_BACKEND'] = backend
+        app.config['FRAGMENT_CACHE_DATABASE'] = os.path.join(workdir, 'fragment_cache.db')
+        results[backend] = {
+            'cold': run(app, student_ids, args.requests, warm=False),
+            'warm': run(app, student_ids, args.requests, warm=True),
+            'stats': cache.get_cache(app).stats(),
+        }
+
+    print(json.dumps({'students': args.students, 'attendance_per_student': args.days, **results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
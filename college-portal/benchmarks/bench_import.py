@@ -0,0 +1,94 @@
+# Student import: old pandas + iterrows + per-row SELECT path versus the
+# streaming importer, on a generated workbook. Reports wall time and peak
+# Python allocations (tracemalloc) for each path.
+import argparse
+import json
+import os
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+
+import importer
+import migrations
+
+
+def make_workbook(path, rows, duplicate_every):
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(['RollNo', 'Name', 'Email Id', 'Section', 'Dept', 'Password'])
+    for i in range(rows):
+        rollno = f'R{i - 1:07d}' if duplicate_every and i and i % duplicate_every == 0 else f'R{i:07d}'
+        sheet.append([rollno, f'Student {i}', f's{i}@college.edu', 'ABCDEF'[i % 6], 'Computer Science', 'pw'])
+    workbook.save(path)
+
+
+def new_db(workdir, name):
+    conn = sqlite3.connect(os.path.join(workdir, name))
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.execute('PRAGMA synchronous = NORMAL')
+    migrations.migrate(conn)
+    return conn
+
+
+def legacy_import(conn, path):
+    import pandas as pd
+
+    df = pd.read_excel(path)
+    actual_columns = {'rollno': 'RollNo', 'name': 'Name', 'email': 'Email Id',
+                      'section': 'Section', 'department': 'Dept', 'password': 'Password'}
+    success_count = 0
+    for index, row in df.iterrows():
+        username = str(row[actual_columns['rollno']]).strip()
+        if conn.execute('SELECT id FROM users WHERE username = ?', (username,)).fetchone():
+            continue
+        conn.execute(
+            'INSERT INTO users (username, password, role, name, email, rollno, section, department) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (username, str(row[actual_columns['password']]).strip(), 'student',
+             str(row[actual_columns['name']]).strip(), str(row[actual_columns['email']]).strip(),
+             str(row[actual_columns['rollno']]).strip(), str(row[actual_columns['section']]).strip(),
+             str(row[actual_columns['department']]).strip())
+        )
+        success_count += 1
+    conn.commit()
+    return success_count
+
+
+def streaming_import(conn, path):
+    with open(path, 'rb') as file:
+        result = importer.import_users(conn, importer.iter_rows(file, path), importer.STUDENTS)
+    conn.commit()
+    return result['success_count']
+
+
+def measure(fn, conn, path):
+    tracemalloc.start()
+    started = time.perf_counter()
+    added = fn(conn, path)
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'added': added, 'seconds': round(elapsed, 3), 'peak_mb': round(peak / 2 ** 20, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=20_000)
+    parser.add_argument('--duplicate-every', type=int, default=50)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='portal-bench-')
+    path = os.path.join(workdir, 'students.xlsx')
+    make_workbook(path, args.rows, args.duplicate_every)
+
+    print(json.dumps({
+        'rows': args.rows,
+        'legacy': measure(legacy_import, new_db(workdir, 'legacy.db'), path),
+        'streaming': measure(streaming_import, new_db(workdir, 'streaming.db'), path),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
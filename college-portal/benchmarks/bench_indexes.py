@@ -0,0 +1,120 @@
+# EXPLAIN QUERY PLAN and timings for the dashboard query shapes on a
+# synthetic attendance table, before and after the index migration.
+import argparse
+import json
+import os
+import sqlite3
+import tempfile
+import time
+
+import migrations
+
+QUERIES = {
+    'student_attendance': ('''
+        SELECT a.date, a.class_id, a.status, a.marked_by
+        FROM attendance a WHERE a.student_id = ? ORDER BY a.date DESC LIMIT 50
+    ''', lambda a: (a.students // 2 + 1,)),
+    'student_percentage': ('''
+        SELECT COUNT(CASE WHEN status = 'present' THEN 1 END) * 100.0 / COUNT(*)
+        FROM attendance WHERE student_id = ?
+    ''', lambda a: (a.students // 2 + 1,)),
+    'faculty_today': ('''
+        SELECT student_id, status FROM attendance WHERE date = ? AND marked_by = ?
+    ''', lambda a: ('2024-06-03', a.students + 1)),
+    'faculty_pending': ('''
+        SELECT COUNT(*) FROM permissions WHERE faculty_id = ? AND status = "pending"
+    ''', lambda a: (a.students + 1,)),
+    'student_roster': ('''
+        SELECT id, rollno, name, section, department, class
+        FROM users WHERE role = "student" ORDER BY rollno
+    ''', lambda a: ()),
+}
+
+
+def build(path, args):
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.execute('PRAGMA synchronous = OFF')
+    migrations.migrate(conn, target=1)
+    conn.execute('''
+        WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?)
+        INSERT INTO users (username, password, role, name, rollno, section, department)
+        SELECT 's' || i, 'x', 'student', 'Student ' || i, printf('%07d', i),
+               char(65 + i % 6), 'Dept ' || (i % 8) FROM n
+    ''', (args.students,))
+    conn.execute('''
+        WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?)
+        INSERT INTO users (username, password, role, name, department)
+        SELECT 'f' || i, 'x', 'faculty', 'Faculty ' || i, 'Dept ' || (i % 8) FROM n
+    ''', (args.faculty,))
+    conn.execute('''
+        WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i < ?1 - 1)
+        INSERT INTO attendance (student_id, class_id, date, status, marked_by)
+        SELECT i % ?2 + 1, i % 40 + 1, date('2024-01-01', '+' || (i / ?2) || ' days'),
+               CASE WHEN i % 7 = 0 THEN 'absent' ELSE 'present' END,
+               ?2 + 1 + (i % ?3)
+        FROM n
+    ''', (args.rows, args.students, args.faculty))
+    conn.execute('''
+        WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i < ?1 - 1)
+        INSERT INTO permissions (student_id, faculty_id, date, reason, status)
+        SELECT i % ?2 + 1, ?2 + 1 + (i % ?3), date('2024-01-01', '+' || (i % 300) || ' days'),
+               'Reason ' || i, CASE WHEN i % 4 = 0 THEN 'pending' ELSE 'approved' END
+        FROM n
+    ''', (args.permissions, args.students, args.faculty))
+    conn.commit()
+    conn.execute('ANALYZE')
+    return conn
+
+
+def measure(conn, args):
+    results = {}
+    for name, (sql, params) in QUERIES.items():
+        bound = params(args)
+        plan = [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, bound)]
+        samples = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            conn.execute(sql, bound).fetchall()
+            samples.append(time.perf_counter() - started)
+        results[name] = {
+            'plan': plan,
+            'full_scan': any(step.startswith('SCAN') and 'USING' not in step for step in plan),
+            'best_ms': round(min(samples) * 1000, 3),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--students', type=int, default=20_000)
+    parser.add_argument('--faculty', type=int, default=200)
+    parser.add_argument('--permissions', type=int, default=200_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix='portal-bench-'), 'college_portal.db')
+    started = time.perf_counter()
+    conn = build(path, args)
+    build_time = time.perf_counter() - started
+
+    before = measure(conn, args)
+    started = time.perf_counter()
+    migrations.migrate(conn)
+    migrate_time = time.perf_counter() - started
+    conn.execute('ANALYZE')
+    after = measure(conn, args)
+    conn.close()
+
+    print(json.dumps({
+        'rows': args.rows,
+        'build_s': round(build_time, 2),
+        'migrate_s': round(migrate_time, 2),
+        'before': before,
+        'after': after,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+# Cost of the instrumentation layer: dashboard requests with it disabled and
+# enabled, per-statement overhead of the instrumented connection, and the
+# Server-Timing split it reports for the faculty dashboard.
+import argparse
+import json
+import sqlite3
+import time
+
+import database
+import instrumentation
+from benchmarks.common import fresh_app, login, seed_students, summarize
+
+
+def requests(client, path, repeat):
+    for _ in range(min(repeat, 10)):
+        client.get(path)
+    samples = []
+    response = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.get(path)
+        samples.append(time.perf_counter() - started)
+    return summarize(samples), response
+
+
+def statements(app, factory, repeat):
+    with app.app_context():
+        conn = database.connect(app.config, factory=factory)
+        started = time.perf_counter()
+        for i in range(repeat):
+            conn.execute('SELECT name FROM users WHERE id = ?', (i % 5 + 1,)).fetchone()
+        elapsed = time.perf_counter() - started
+        conn.close()
+    return round(elapsed / repeat * 1e6, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--students', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--statements', type=int, default=50_000)
+    args = parser.parse_args()
+
+    results = {}
+    for label, enabled in (('disabled', False), ('enabled', True)):
+        app = fresh_app(INSTRUMENTATION_ENABLED=enabled)
+        seed_students(args.students)
+        student = login(app.test_client(), 4, 'student')
+        faculty = login(app.test_client(), 2, 'faculty')
+        student_stats, _ = requests(student, '/student/dashboard', args.repeat)
+        faculty_stats, response = requests(faculty, '/faculty/dashboard', max(1, args.repeat // 10))
+        results[label] = {
+            'student_dashboard': student_stats,
+            'faculty_dashboard': faculty_stats,
+            'statement_us': statements(app, instrumentation.InstrumentedConnection if enabled else sqlite3.Connection,
+                                       args.statements),
+        }
+        if enabled:
+            results['faculty_server_timing'] = response.headers.get('Server-Timing')
+            results['metrics_bytes'] = len(login(app.test_client(), 1, 'admin').get('/metrics').data)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
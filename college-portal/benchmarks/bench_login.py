@@ -0,0 +1,82 @@
+# Login throughput at several scrypt costs with concurrent clients, the cost
+# of a throttled attempt, and bulk hashing on the process pool versus one
+# thread (the import path).
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import passwords
+from benchmarks.common import fresh_app, summarize
+
+
+def run_logins(app, clients, attempts, password='student123'):
+    def worker(count):
+        client = app.test_client()
+        samples = []
+        for _ in range(count):
+            started = time.perf_counter()
+            response = client.post('/login', data={'username': 'student1', 'password': password, 'role': 'student'})
+            samples.append(time.perf_counter() - started)
+            assert response.status_code == 302, response.status_code
+        return samples
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        results = list(pool.map(worker, [attempts // clients] * clients))
+    elapsed = time.perf_counter() - started
+    samples = [sample for result in results for sample in result]
+    return {'logins_per_s': round(len(samples) / elapsed, 1), **summarize(samples)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--costs', default='12,14,15', help='comma separated log2 of scrypt N')
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--attempts', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=4, help='PASSWORD_WORKERS')
+    parser.add_argument('--bulk', type=int, default=400, help='passwords hashed in the bulk comparison')
+    args = parser.parse_args()
+
+    unlimited = {'LOGIN_USER_BURST': 10 ** 9, 'LOGIN_IP_BURST': 10 ** 9}
+    results = {'clients': args.clients, 'workers': args.workers, 'logins': {}}
+    for log_n in [int(value) for value in args.costs.split(',')]:
+        app = fresh_app(PASSWORD_SCRYPT_N=2 ** log_n, PASSWORD_WORKERS=args.workers,
+                        PASSWORD_MAX_PENDING=args.clients * 2, **unlimited)
+        results['logins'][f'n=2^{log_n}'] = run_logins(app, args.clients, args.attempts)
+
+    # Throttled attempts are refused before any KDF work
+    app = fresh_app(LOGIN_USER_BURST=1, LOGIN_USER_RATE=0.0001)
+    client = app.test_client()
+    client.post('/login', data={'username': 'student1', 'password': 'wrong', 'role': 'student'})
+    samples = []
+    for _ in range(args.attempts):
+        started = time.perf_counter()
+        response = client.post('/login', data={'username': 'student1', 'password': 'wrong', 'role': 'student'})
+        samples.append(time.perf_counter() - started)
+        assert response.status_code == 429
+    results['throttled'] = summarize(samples)
+
+    hasher = passwords.get_hasher(app)
+    values = [f'password-{i}' for i in range(args.bulk)]
+    started = time.perf_counter()
+    hasher.hash_many(values[:8])  # spawn the worker processes
+    warmup = time.perf_counter() - started
+    started = time.perf_counter()
+    hasher.hash_many(values)
+    pooled = time.perf_counter() - started
+    started = time.perf_counter()
+    passwords._hash_chunk(values, *hasher.cost)
+    serial = time.perf_counter() - started
+    results['bulk_hash'] = {
+        'passwords': args.bulk,
+        'pool_start_s': round(warmup, 2),
+        'process_pool_per_s': round(args.bulk / pooled, 1),
+        'single_thread_per_s': round(args.bulk / serial, 1),
+    }
+    hasher.shutdown()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+# Old per-row DELETE + INSERT loop versus the batched upsert in marking.py,
+# for a first save and a re-save where ~10% of the marks changed.
+import argparse
+import json
+import os
+import sqlite3
+import tempfile
+import time
+
+import marking
+import migrations
+
+CLASS_ID = 1
+FACULTY_ID = 1
+DAY = '2024-06-03'
+
+
+def legacy_mark(conn, marks):
+    conn.execute('DELETE FROM attendance WHERE date = ? AND marked_by = ?', (DAY, FACULTY_ID))
+    for student_id, status in marks.items():
+        if status in ['present', 'absent']:
+            conn.execute(
+                'INSERT INTO attendance (student_id, class_id, date, status, marked_by) VALUES (?, ?, ?, ?, ?)',
+                (int(student_id), CLASS_ID, DAY, status, FACULTY_ID)
+            )
+    conn.commit()
+
+
+def bulk_mark(conn, marks):
+    counts = marking.mark_bulk(conn, CLASS_ID, DAY, marks, FACULTY_ID)
+    conn.commit()
+    return counts
+
+
+def new_db():
+    path = os.path.join(tempfile.mkdtemp(prefix='portal-bench-'), 'college_portal.db')
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.execute('PRAGMA synchronous = NORMAL')
+    migrations.migrate(conn)
+    return conn
+
+
+def run(size, repeat):
+    first = {str(i): 'present' if i % 6 else 'absent' for i in range(1, size + 1)}
+    second = {sid: ('absent' if int(sid) % 10 == 0 else status) for sid, status in first.items()}
+    results = {}
+    for name, fn in (('legacy_loop', legacy_mark), ('bulk_upsert', bulk_mark)):
+        first_times, second_times = [], []
+        for _ in range(repeat):
+            conn = new_db()
+            started = time.perf_counter()
+            fn(conn, first)
+            first_times.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            counts = fn(conn, second)
+            second_times.append(time.perf_counter() - started)
+            conn.close()
+        results[name] = {
+            'first_save_ms': round(min(first_times) * 1000, 3),
+            'resave_ms': round(min(second_times) * 1000, 3),
+        }
+        if counts:
+            results[name]['resave_counts'] = counts
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[50, 500, 5000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps({size: run(size, args.repeat) for size in args.sizes}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+# Idle notification streams held by one serve.py worker: for growing numbers
+# of open /api/notifications/stream connections, the worker's memory and
+# threads, its CPU while the streams sit idle (heartbeats only), and how
+# long an event takes to reach every stream - published from another
+# process (picked up by the outbox poll) and from inside the worker (an
+# approval, which wakes the dispatcher at once).
+# Linux only (reads /proc).
+import argparse
+import json
+import os
+import resource
+import selectors
+import shutil
+import socket
+import tempfile
+import time
+
+from benchmarks.bench_startup import Server, environment, memory
+from benchmarks.common import fresh_app, raw_connection, seed_students, summarize
+
+
+def open_stream(server, cookie):
+    sock = socket.create_connection(server.address, timeout=30)
+    sock.sendall(f'GET /api/notifications/stream HTTP/1.1\r\nHost: bench\r\nCookie: {cookie}\r\n'
+                 'Accept: text/event-stream\r\n\r\n'.encode())
+    received = b''
+    while b': connected' not in received:
+        chunk = sock.recv(4096)
+        assert chunk, 'stream closed'
+        received += chunk
+    assert received.startswith(b'HTTP/1.1 200'), received[:200]
+    sock.setblocking(False)
+    return sock
+
+
+def wait_for(streams, marker, started, timeout=60):
+    # Seconds from started until each stream has received marker
+    selector = selectors.DefaultSelector()
+    buffers = {}
+    for sock in streams:
+        selector.register(sock, selectors.EVENT_READ)
+        buffers[sock] = b''
+    latencies = []
+    deadline = time.perf_counter() + timeout
+    while buffers and time.perf_counter() < deadline:
+        for key, _ in selector.select(timeout=1):
+            sock = key.fileobj
+            buffers[sock] += sock.recv(65536)
+            if marker in buffers[sock]:
+                latencies.append(time.perf_counter() - started)
+                selector.unregister(sock)
+                del buffers[sock]
+    selector.close()
+    return latencies, len(buffers)
+
+
+def cpu_seconds(pid):
+    with open(f'/proc/{pid}/stat') as handle:
+        fields = handle.read().rsplit(')', 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+
+def threads(pid):
+    with open(f'/proc/{pid}/status') as handle:
+        for line in handle:
+            if line.startswith('Threads:'):
+                return int(line.split()[1])
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--levels', default='100,500,1000,2000', help='open streams to measure at')
+    parser.add_argument('--idle-seconds', type=float, default=10.0)
+    parser.add_argument('--heartbeat', type=float, default=15.0)
+    parser.add_argument('--poll-interval', type=float, default=0.5)
+    args = parser.parse_args()
+
+    levels = [int(value) for value in args.levels.split(',')]
+    _, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    workdir = tempfile.mkdtemp(prefix='portal-bench-')
+    fresh_app(workdir)
+    users = max(levels)
+    seed_students(users)
+    conn = raw_connection()
+    student_ids = [row[0] for row in conn.execute("SELECT id FROM users WHERE username LIKE 'bench%' ORDER BY id")]
+    conn.close()
+
+    env = environment(workdir)
+    env.update({'PORTAL_NOTIFY_MAX_STREAMS': str(users + 100), 'PORTAL_NOTIFY_HEARTBEAT': str(args.heartbeat),
+                'PORTAL_NOTIFY_POLL_INTERVAL': str(args.poll_interval)})
+    # A single worker: serve.py then serves from its own process
+    server = Server(env, 1, '--backlog', '4096')
+    streams = []
+    results = []
+    try:
+        worker = server.process.pid
+        idle_memory = memory(worker)
+        cookies = [server.login(f'bench{index:07d}', 'student123', 'student') for index in range(users)]
+        faculty = server.login('faculty1', 'faculty123', 'faculty')
+        marker_id = 0
+        for level in levels:
+            started = time.perf_counter()
+            while len(streams) < level:
+                streams.append(open_stream(server, cookies[len(streams)]))
+            connect_seconds = time.perf_counter() - started
+
+            before = cpu_seconds(worker)
+            time.sleep(args.idle_seconds)
+            idle_cpu = (cpu_seconds(worker) - before) / args.idle_seconds
+
+            # From another process: one row per connected student
+            marker_id += 1
+            conn = raw_connection()
+            conn.executemany("INSERT INTO notifications (user_id, kind, data) VALUES (?, 'bench', ?)",
+                             ((student_id, json.dumps({'marker': marker_id})) for student_id in student_ids[:level]))
+            started = time.perf_counter()
+            conn.commit()
+            conn.close()
+            external, missed_external = wait_for(streams, f'"marker": {marker_id}}}'.encode(), started)
+
+            # From inside the worker: a permission approved for the first student
+            conn = raw_connection()
+            permission_id = conn.execute("INSERT INTO permissions (student_id, faculty_id, date, reason) VALUES (?, 2, '2030-01-01', 'bench')",
+                                         (student_ids[0],)).lastrowid
+            conn.commit()
+            conn.close()
+            started = time.perf_counter()
+            body = json.dumps({'permission_id': permission_id, 'status': 'approved'})
+            http = socket.create_connection(server.address)
+            http.sendall(f'POST /api/update_permission_status HTTP/1.1\r\nHost: bench\r\nCookie: {faculty}\r\n'
+                         f'Content-Type: application/json\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n{body}'.encode())
+            internal, missed_internal = wait_for(streams[:1], f'"id":{permission_id},'.encode(), started)
+            http.close()
+
+            results.append({
+                'streams': level,
+                'connect_per_second': round(level / connect_seconds, 1),
+                'worker_memory': memory(worker),
+                'kb_per_stream': round((memory(worker)['uss_mb'] - idle_memory['uss_mb']) * 1024 / level, 1),
+                'worker_threads': threads(worker),
+                'idle_cpu_percent': round(idle_cpu * 100, 2),
+                'broadcast_from_other_process': dict(summarize(external), missed=missed_external),
+                'event_from_worker': dict(summarize(internal), missed=missed_internal),
+            })
+    finally:
+        for sock in streams:
+            sock.close()
+        server.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(json.dumps({'heartbeat_seconds': args.heartbeat, 'poll_interval_seconds': args.poll_interval,
+                      'worker_idle_memory': idle_memory, 'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
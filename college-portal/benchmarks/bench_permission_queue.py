@@ -0,0 +1,97 @@
+# Faculty permission queue with 500k permissions: the old unpaginated
+# dashboard query versus keyset pages from approvals.queue(), plus the cost
+# of routing a new request.
+import argparse
+import json
+import random
+import time
+
+import approvals
+import routing
+from benchmarks.common import fresh_app, login, raw_connection, summarize
+
+
+def populate(students, faculty, permissions):
+    conn = raw_connection()
+    conn.execute('''
+        WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?)
+        INSERT INTO users (username, password, role, name, department)
+        SELECT 'fac' || i, 'x', 'faculty', 'Faculty ' || i, 'Dept ' || (i % 8) FROM n
+    ''', (faculty,))
+    conn.execute('''
+        WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?)
+        INSERT INTO classes (name, faculty_id)
+        SELECT 'Class ' || i, id FROM n JOIN users ON username = 'fac' || i
+    ''', (faculty,))
+    conn.execute('''
+        WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?)
+        INSERT INTO users (username, password, role, name, rollno, section, department)
+        SELECT 'stu' || i, 'x', 'student', 'Student ' || i, printf('%07d', i), char(65 + i % 6), 'Dept ' || (i % 8) FROM n
+    ''', (students,))
+    routing.rebuild(conn)
+    # Every request goes to its student's routed faculty, a third still pending
+    conn.execute('''
+        WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?)
+        INSERT INTO permissions (student_id, faculty_id, date, reason, status)
+        SELECT u.id, r.faculty_id, date('2024-07-01', '+' || (i % 200) || ' days'), 'Reason ' || i,
+               CASE WHEN i % 3 = 0 THEN 'pending' WHEN i % 3 = 1 THEN 'approved' ELSE 'rejected' END
+        FROM n
+        JOIN users u ON u.username = 'stu' || (1 + i % ?)
+        JOIN permission_routes r ON r.department = u.department AND r.section = u.section
+    ''', (permissions, students))
+    conn.commit()
+    conn.close()
+
+
+def sample(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--permissions', type=int, default=500_000)
+    parser.add_argument('--students', type=int, default=20_000)
+    parser.add_argument('--faculty', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    app = fresh_app()
+    populate(args.students, args.faculty, args.permissions)
+    conn = raw_connection()
+    faculty_id, queue_size = conn.execute(
+        'SELECT faculty_id, COUNT(*) FROM permissions GROUP BY faculty_id ORDER BY 2 DESC LIMIT 1').fetchone()
+
+    def legacy():
+        conn.execute('''
+            SELECT p.*, u.name as student_name, u.rollno
+            FROM permissions p JOIN users u ON p.student_id = u.id
+            WHERE p.faculty_id = ?
+        ''', (faculty_id,)).fetchall()
+
+    # Cursor roughly in the middle of the queue for deep pages
+    middle = conn.execute('SELECT id FROM permissions WHERE faculty_id = ? ORDER BY id LIMIT 1 OFFSET ?',
+                          (faculty_id, queue_size // 2)).fetchone()[0]
+    router = routing.get_router(app)
+    student_ids = [row[0] for row in conn.execute("SELECT id FROM users WHERE role = 'student'")]
+    client = login(app.test_client(), faculty_id, 'faculty')
+
+    print(json.dumps({
+        'permissions': args.permissions,
+        'largest_queue': queue_size,
+        'legacy_unpaginated': sample(legacy, max(1, args.repeat // 10)),
+        'first_page_pending': sample(lambda: approvals.queue(conn, faculty_id, 'pending'), args.repeat),
+        'first_page_all': sample(lambda: approvals.queue(conn, faculty_id), args.repeat),
+        'deep_page_pending': sample(lambda: approvals.queue(conn, faculty_id, 'pending', str(middle)), args.repeat),
+        'api_first_page': sample(lambda: client.get('/api/permissions/queue?status=pending'), args.repeat),
+        'route_lookup': sample(lambda: router.faculty_for(conn, random.choice(student_ids)), args.repeat * 10),
+    }, indent=2))
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+# Proof upload and download throughput through the app, with a share of
+# duplicate submissions to show content-addressed dedup.
+import argparse
+import io
+import json
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.common import fresh_app, login, raw_connection
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--uploads', type=int, default=200)
+    parser.add_argument('--size-kb', type=int, default=1024)
+    parser.add_argument('--duplicates', type=float, default=0.3, help='share of uploads repeating an earlier file')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='portal-bench-')
+    app = fresh_app(workdir, PROOF_FOLDER=os.path.join(workdir, 'proofs'))
+    client = login(app.test_client(), 4, 'student')
+
+    distinct = []
+    started = time.perf_counter()
+    for _ in range(args.uploads):
+        if distinct and random.random() < args.duplicates:
+            content = random.choice(distinct)
+        else:
+            content = b'%PDF-1.4\n' + os.urandom(args.size_kb * 1024)
+            distinct.append(content)
+        response = client.post('/api/add_permission', content_type='multipart/form-data', data={
+            'date': '2024-09-01', 'reason': 'medical', 'proof': 'certificate',
+            'proof_file': (io.BytesIO(content), 'certificate.pdf'),
+        })
+        assert response.json['success'], response.json
+    upload_s = time.perf_counter() - started
+
+    conn = raw_connection()
+    ids = [row[0] for row in conn.execute('SELECT id FROM permissions WHERE proof_sha256 IS NOT NULL')]
+    blobs = conn.execute('SELECT COUNT(*), SUM(size) FROM proof_files').fetchone()
+    conn.close()
+
+    started = time.perf_counter()
+    served = 0
+    for permission_id in ids:
+        served += len(client.get(f'/api/proofs/{permission_id}').data)
+    download_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for permission_id in ids:
+        client.get(f'/api/proofs/{permission_id}', headers={'Range': 'bytes=0-65535'})
+    range_s = time.perf_counter() - started
+
+    uploaded_mb = args.uploads * args.size_kb / 1024
+    print(json.dumps({
+        'uploads': args.uploads,
+        'size_kb': args.size_kb,
+        'blobs_stored': blobs[0],
+        'disk_mb': round((blobs[1] or 0) / 2**20, 1),
+        'upload_mb_per_s': round(uploaded_mb / upload_s, 1),
+        'upload_ms_each': round(upload_s / args.uploads * 1000, 2),
+        'download_mb_per_s': round(served / 2**20 / download_s, 1),
+        'range_64k_ms_each': round(range_s / len(ids) * 1000, 2),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
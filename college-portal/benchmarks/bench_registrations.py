@@ -0,0 +1,154 @@
+# Event registration under contention, end to end through serve.py: every
+# student (plus a share of double-submits) registers for one event at the
+# same instant, then a batch of registered students cancel at once. Checks
+# that seats never exceed capacity, nobody holds two rows, counters match,
+# waitlist positions are 1..n and freed seats went to the head of the
+# waitlist in order. Reports latency, throughput and busy (503) responses.
+import argparse
+import http.client
+import json
+import random
+import shutil
+import tempfile
+import threading
+import time
+
+import registrations
+from benchmarks.bench_startup import Server, environment
+from benchmarks.common import fresh_app, raw_connection, seed_students, summarize
+
+
+def call(server, path, cookie, retries):
+    # POST and return (HTTP status, JSON body, 503s seen); busy responses
+    # are retried like a client honouring Retry-After would
+    busy = 0
+    while True:
+        conn = http.client.HTTPConnection(*server.address, timeout=60)
+        try:
+            conn.request('POST', path, headers={'Cookie': cookie, 'Connection': 'close'})
+            response = conn.getresponse()
+            body = json.loads(response.read() or b'null')
+        finally:
+            conn.close()
+        if response.status != 503 or busy >= retries:
+            return response.status, body, busy
+        busy += 1
+        time.sleep(0.05)
+
+
+def burst(server, requests, retries):
+    # requests: (student index, path, cookie); all threads start together
+    barrier = threading.Barrier(len(requests))
+    results = [None] * len(requests)
+
+    def run(slot, student, path, cookie):
+        barrier.wait()
+        started = time.perf_counter()
+        try:
+            status, body, busy = call(server, path, cookie, retries)
+        except OSError as e:
+            status, body, busy = None, {'message': str(e)}, 0
+        results[slot] = (student, status, body, busy, time.perf_counter() - started)
+
+    threads = [threading.Thread(target=run, args=(slot, *request)) for slot, request in enumerate(requests)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return results, {
+        'requests': len(requests),
+        'seconds': round(elapsed, 3),
+        'per_second': round(len(requests) / elapsed, 1),
+        'latency': summarize([result[4] for result in results]),
+        'busy_503': sum(result[3] for result in results),
+        'errors': sum(1 for result in results if result[1] != 200),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--students', type=int, default=400)
+    parser.add_argument('--capacity', type=int, default=150)
+    parser.add_argument('--duplicates', type=float, default=0.25, help='share of students who submit twice')
+    parser.add_argument('--cancels', type=int, default=50)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--busy-timeout', type=int, default=5000, help='SQLITE_BUSY_TIMEOUT for the server, ms')
+    parser.add_argument('--retries', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    workdir = tempfile.mkdtemp(prefix='portal-bench-')
+    fresh_app(workdir)
+    student_ids = seed_students(args.students)
+    conn = raw_connection()
+    event_id = conn.execute("INSERT INTO events (name, date, capacity) VALUES ('Hackathon', '2030-01-01', ?)",
+                            (args.capacity,)).lastrowid
+    conn.commit()
+    conn.close()
+
+    env = environment(workdir)
+    env['PORTAL_SQLITE_BUSY_TIMEOUT'] = str(args.busy_timeout)
+    server = Server(env, args.workers, '--backlog', '2048')
+    try:
+        cookies = [server.login(f'bench{index:07d}', 'student123', 'student') for index in range(args.students)]
+        path = f'/api/events/{event_id}/register'
+        requests = [(index, path, cookie) for index, cookie in enumerate(cookies)]
+        requests += [(index, path, cookies[index])
+                     for index in rng.sample(range(args.students), int(args.students * args.duplicates))]
+        rng.shuffle(requests)
+        results, register_stats = burst(server, requests, args.retries)
+
+        conn = raw_connection()
+        registered = {row[0] for row in conn.execute('SELECT student_id FROM student_events WHERE event_id = ?', (event_id,))}
+        waitlist = [row[0] for row in conn.execute('SELECT student_id FROM event_waitlist WHERE event_id = ? ORDER BY id',
+                                                   (event_id,))]
+        statuses = {}
+        for student, status, body, busy, elapsed in results:
+            if status == 200:
+                statuses.setdefault(student, []).append(body['status'])
+        positions = sorted(body['position'] for _, status, body, _, _ in results
+                           if status == 200 and body['status'] == 'waitlisted')
+        checks = {
+            'seats_taken': len(registered),
+            'waitlisted': len(waitlist),
+            'overbooked': len(registered) > args.capacity,
+            'capacity_filled': len(registered) == min(args.capacity, args.students),
+            'everyone_placed': len(registered) + len(waitlist) == args.students,
+            'in_both': len(registered & set(waitlist)),
+            'duplicate_rows': conn.execute('''SELECT COUNT(*) FROM (SELECT 1 FROM student_events
+                                              GROUP BY student_id, event_id HAVING COUNT(*) > 1)''').fetchone()[0],
+            'double_submit_placed_twice': sum(1 for values in statuses.values()
+                                              if sum(value in ('registered', 'waitlisted') for value in values) > 1),
+            'positions_contiguous': positions == list(range(1, len(waitlist) + 1)),
+            'counter_mismatches': registrations.check(conn),
+        }
+        conn.close()
+
+        # Concurrent cancels: the freed seats go to the first K of the queue
+        id_to_index = {student_id: index for index, student_id in enumerate(student_ids)}
+        cancelling = rng.sample(sorted(registered), min(args.cancels, len(registered)))
+        cancel_requests = [(id_to_index[student_id], f'/api/events/{event_id}/cancel', cookies[id_to_index[student_id]])
+                           for student_id in cancelling]
+        _, cancel_stats = burst(server, cancel_requests, args.retries)
+
+        conn = raw_connection()
+        after = {row[0] for row in conn.execute('SELECT student_id FROM student_events WHERE event_id = ?', (event_id,))}
+        remaining = [row[0] for row in conn.execute('SELECT student_id FROM event_waitlist WHERE event_id = ? ORDER BY id',
+                                                    (event_id,))]
+        expected = set(waitlist[:len(cancelling)])
+        checks['promoted_fifo'] = after == (registered - set(cancelling)) | expected and remaining == waitlist[len(cancelling):]
+        checks['counter_mismatches_after_cancel'] = registrations.check(conn)
+        conn.close()
+    finally:
+        server.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(json.dumps({'students': args.students, 'capacity': args.capacity, 'workers': args.workers,
+                      'register': register_stats, 'cancel': cancel_stats, 'checks': checks}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+# Attendance reports over one academic year: a plain Python pass over the
+# fetched rows versus the chunked, typed, vectorized pipeline in reports.py.
+import argparse
+import json
+import time
+from collections import defaultdict
+
+import reports
+from benchmarks.common import fresh_app, raw_connection, seed_students
+
+
+def populate(student_ids, days, start):
+    # One mark per student per class per school day (Mon-Fri), ~85% present
+    conn = raw_connection()
+    conn.execute('DROP TABLE IF EXISTS temp.bench_students')
+    conn.execute('CREATE TEMP TABLE bench_students (id INTEGER PRIMARY KEY)')
+    conn.executemany('INSERT INTO bench_students (id) VALUES (?)', ((i,) for i in student_ids))
+    conn.execute('''
+        WITH RECURSIVE d(n) AS (SELECT 0 UNION ALL SELECT n + 1 FROM d WHERE n < ? * 7 / 5 + 7),
+        school_days AS (
+            SELECT date(?, '+' || n || ' days') AS day FROM d
+            WHERE strftime('%w', ?, '+' || n || ' days') NOT IN ('0', '6')
+            LIMIT ?
+        )
+        INSERT INTO attendance (student_id, class_id, date, status, marked_by)
+        SELECT s.id, c.id, day,
+               CASE WHEN abs(random()) % 100 < 85 THEN 'present' ELSE 'absent' END, c.faculty_id
+        FROM school_days, bench_students s, classes c
+    ''', (days, start, start, days))
+    conn.commit()
+    conn.close()
+
+
+def legacy_reports(conn, threshold):
+    # Row-at-a-time equivalent of reports.summary/streaks/defaulters
+    rows = conn.execute('SELECT student_id, class_id, date, status FROM attendance ORDER BY student_id, date').fetchall()
+    present = defaultdict(int)
+    total = defaultdict(int)
+    longest = defaultdict(int)
+    current = defaultdict(int)
+    for row in rows:
+        student = row['student_id']
+        total[student] += 1
+        if row['status'] == 'present':
+            present[student] += 1
+            current[student] = 0
+        else:
+            current[student] += 1
+            longest[student] = max(longest[student], current[student])
+    return [s for s in total if present[s] * 100.0 / total[s] < threshold]
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return round(time.perf_counter() - started, 3), result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--students', type=int, default=20_000)
+    parser.add_argument('--days', type=int, default=180)
+    parser.add_argument('--start', default='2024-07-01')
+    parser.add_argument('--threshold', type=float, default=reports.DEFAULT_THRESHOLD)
+    args = parser.parse_args()
+
+    fresh_app()
+    student_ids = seed_students(args.students)
+    populate_s, _ = timed(lambda: populate(student_ids, args.days, args.start))
+    conn = raw_connection()
+    rows = conn.execute('SELECT COUNT(*) FROM attendance').fetchone()[0]
+
+    legacy_s, _ = timed(lambda: legacy_reports(conn, args.threshold))
+    load_s, df = timed(lambda: reports.load_attendance(conn))
+    results = {}
+    for name, fn in [('summary', lambda: reports.summary(df)),
+                     ('matrix', lambda: reports.student_class_matrix(df)),
+                     ('weekly', lambda: reports.weekly_matrix(df)),
+                     ('streaks', lambda: reports.streaks(df)),
+                     ('defaulters', lambda: reports.defaulters(df, args.threshold))]:
+        results[name], _ = timed(fn)
+    build_s, frames = timed(lambda: reports.build_reports(conn, threshold=args.threshold))
+    csv_s, _ = timed(lambda: reports.export(frames, 'csv', 'weekly'))
+    conn.close()
+
+    print(json.dumps({
+        'students': args.students,
+        'attendance_rows': rows,
+        'populate_s': populate_s,
+        'legacy_python_loop_s': legacy_s,
+        'vectorized_load_s': load_s,
+        'frame_memory_mb': round(df.memory_usage(deep=True).sum() / 2**20, 1),
+        'vectorized_compute_s': results,
+        'build_reports_total_s': build_s,
+        'weekly_csv_export_s': csv_s,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+# Faculty attendance sheet as the college grows: the old query listing every
+# student (plus the faculty's marks for the day) versus the enrolled roster
+# of one session, and /faculty/dashboard time and page size for a class of
+# fixed size.
+import argparse
+import json
+from datetime import date
+
+import enrollment
+from benchmarks.common import fresh_app, login, raw_connection, seed_students, summarize, timed
+
+FACULTY_ID = 2
+CLASS_ID = 1
+
+
+def legacy_sheet(conn, day):
+    students = conn.execute('''SELECT id, rollno, name, section, department, class FROM users
+                               WHERE role = "student" ORDER BY rollno''').fetchall()
+    marks = conn.execute('SELECT student_id, status FROM attendance WHERE date = ? AND marked_by = ?',
+                         (day, FACULTY_ID)).fetchall()
+    return students, marks
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', default='1000,10000,50000', help='students in the college')
+    parser.add_argument('--class-size', type=int, default=60)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    day = date.today().isoformat()
+    results = []
+    for size in (int(value) for value in args.sizes.split(',')):
+        app = fresh_app()
+        client = login(app.test_client(), FACULTY_ID, 'faculty')
+        ids = seed_students(size)
+        conn = raw_connection()
+        enrollment.enroll(conn, CLASS_ID, ids[:args.class_size])
+        conn.commit()
+
+        legacy = [timed(legacy_sheet, conn, day)[0] for _ in range(args.repeat)]
+        roster = [timed(enrollment.roster, conn, CLASS_ID, day, 1)[0] for _ in range(args.repeat)]
+        rows = len(enrollment.roster(conn, CLASS_ID, day, 1))
+        conn.close()
+
+        dashboard = []
+        for _ in range(args.repeat):
+            elapsed, response = timed(client.get, f'/faculty/dashboard?class_id={CLASS_ID}')
+            assert response.status_code == 200, response.status_code
+            dashboard.append(elapsed)
+        results.append({'students': size, 'legacy_sheet': summarize(legacy), 'roster': summarize(roster),
+                        'roster_rows': rows, 'dashboard': summarize(dashboard),
+                        'dashboard_kb': round(len(response.data) / 1024, 1)})
+
+    conn = raw_connection()
+    plan = [row[-1] for row in conn.execute('EXPLAIN QUERY PLAN ' + enrollment.ROSTER_SQL, (day, 1, CLASS_ID))]
+    conn.close()
+    print(json.dumps({'class_size': args.class_size, 'roster_plan': plan, 'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
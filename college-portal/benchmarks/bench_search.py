@@ -0,0 +1,72 @@
+# /api/search latency on a synthetic population, compared with the LIKE
+# '%term%' scan an admin search would otherwise need.
+import argparse
+import json
+import random
+import time
+
+import search
+from benchmarks.common import fresh_app, login, raw_connection
+
+FIRST = ['Aarav', 'Diya', 'Ishaan', 'Kavya', 'Rohan', 'Sneha', 'Vikram', 'Ananya', 'Arjun', 'Meera']
+LAST = ['Reddy', 'Sharma', 'Rao', 'Patel', 'Iyer', 'Khan', 'Das', 'Nair', 'Gupta', 'Singh']
+DEPARTMENTS = ['Computer Science', 'Electronics', 'Mechanical', 'Civil', 'Electrical', 'Information Technology']
+
+
+def populate(count):
+    rng = random.Random(42)
+    conn = raw_connection()
+    conn.executemany(
+        'INSERT INTO users (username, password, role, name, email, rollno, section, department) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+        ((f'u{i}', 'x', 'student', f'{rng.choice(FIRST)} {rng.choice(LAST)} {i}', f'u{i}@college.edu',
+          f'21B{i:06d}', 'ABCDEF'[i % 6], rng.choice(DEPARTMENTS)) for i in range(count))
+    )
+    conn.commit()
+    return conn
+
+
+def best_of(repeat, fn):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return round(min(samples) * 1000, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    app = fresh_app()
+    started = time.perf_counter()
+    conn = populate(args.users)
+    insert_time = time.perf_counter() - started
+    started = time.perf_counter()
+    search.rebuild(conn)
+    search.optimize(conn)
+    conn.commit()
+    rebuild_time = time.perf_counter() - started
+
+    client = login(app.test_client(), 1, 'admin')
+    results = {'users': args.users,
+               'insert_with_triggers_s': round(insert_time, 2),
+               'rebuild_s': round(rebuild_time, 2),
+               'queries': {}}
+    for term in ['kavya', 'kav', 'reddy 123', '21B000042', 'electronics']:
+        like = f'%{term.split()[0]}%'
+        results['queries'][term] = {
+            'fts_ms': best_of(args.repeat, lambda: search.search(conn, term)),
+            'api_ms': best_of(args.repeat, lambda: client.get('/api/search', query_string={'q': term})),
+            'like_scan_ms': best_of(3, lambda: conn.execute(
+                'SELECT id, name FROM users WHERE name LIKE ? OR rollno LIKE ? OR email LIKE ? OR department LIKE ? '
+                'ORDER BY name LIMIT 21', (like, like, like, like)).fetchall()),
+        }
+    conn.close()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
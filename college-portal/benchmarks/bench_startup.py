@@ -0,0 +1,188 @@
+# Startup and serving costs of serve.py: import / migrate / warmup timings
+# in a cold process, first-request latency with and without warmup, memory
+# per worker (RSS, and PSS/USS to show what the preloaded master shares
+# copy-on-write), and errors seen by a busy client across a SIGHUP reload.
+# Linux only (reads /proc).
+import argparse
+import http.client
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COLD_START = '''
+import json, time
+started = time.perf_counter()
+import app as portal
+imported = time.perf_counter()
+portal.create_app()
+portal.init_db()
+migrated = time.perf_counter()
+portal.warmup()
+warmed = time.perf_counter()
+print(json.dumps({'import_ms': (imported - started) * 1000, 'migrate_ms': (migrated - imported) * 1000,
+                  'warmup_ms': (warmed - migrated) * 1000}))
+'''
+
+
+def environment(workdir, database=None):
+    env = dict(os.environ)
+    path = os.path.join(workdir, 'college_portal.db')
+    if database and not os.path.exists(path):
+        shutil.copyfile(database, path)
+    env.update({
+        'PORTAL_DATABASE': path,
+        'PORTAL_UPLOAD_FOLDER': os.path.join(workdir, 'uploads'),
+        'PORTAL_PASSWORD_SCRYPT_N': '16',
+        'PORTAL_LOGIN_USER_BURST': '1000000000',
+        'PORTAL_LOGIN_IP_BURST': '1000000000',
+        'PYTHONDONTWRITEBYTECODE': '1',
+    })
+    return env
+
+
+def cold_start(env):
+    output = subprocess.run([sys.executable, '-c', COLD_START], cwd=ROOT, env=env, check=True,
+                            capture_output=True, text=True).stdout
+    return {key: round(value, 1) for key, value in json.loads(output.splitlines()[-1]).items()}
+
+
+class Server:
+    def __init__(self, env, workers, *flags):
+        started = time.perf_counter()
+        self.process = subprocess.Popen([sys.executable, 'serve.py', '--bind', '127.0.0.1:0',
+                                         '--workers', str(workers), *flags],
+                                        cwd=ROOT, env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        line = self.process.stdout.readline()
+        assert line.startswith('Listening on http://'), line
+        self.ready_ms = round((time.perf_counter() - started) * 1000, 1)
+        host, port = line.strip().rsplit('/', 1)[1].split(':')
+        self.address = (host, int(port))
+
+    def workers(self):
+        path = f'/proc/{self.process.pid}/task/{self.process.pid}/children'
+        for _ in range(100):
+            with open(path) as handle:
+                pids = [int(pid) for pid in handle.read().split()]
+            if pids:
+                return pids
+            time.sleep(0.05)
+        return []
+
+    def request(self, method, path, body=None, cookie=None):
+        conn = http.client.HTTPConnection(*self.address, timeout=30)
+        headers = {'Connection': 'close'}
+        if cookie:
+            headers['Cookie'] = cookie
+        if body is not None:
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        try:
+            conn.request(method, path, body, headers)
+            response = conn.getresponse()
+            response.read()
+            return response.status, response.getheader('Set-Cookie')
+        finally:
+            conn.close()
+
+    def login(self, username, password, role):
+        status, cookie = self.request('POST', '/login', f'username={username}&password={password}&role={role}')
+        assert status == 302 and cookie, status
+        return cookie.split(';', 1)[0]
+
+    def stop(self):
+        self.process.send_signal(signal.SIGTERM)
+        self.process.wait(timeout=60)
+
+
+def first_requests(server):
+    timings = {}
+    for name, path in (('index', '/'), ('admin_dashboard', '/admin/dashboard')):
+        cookie = server.login('admin', 'admin123', 'admin') if name == 'admin_dashboard' else None
+        started = time.perf_counter()
+        status, _ = server.request('GET', path, cookie=cookie)
+        assert status == 200, (path, status)
+        timings[f'{name}_ms'] = round((time.perf_counter() - started) * 1000, 2)
+    return timings
+
+
+def memory(pid):
+    # smaps_rollup values are in kB
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as handle:
+        for line in handle:
+            parts = line.split()
+            if parts[0] in ('Rss:', 'Pss:', 'Private_Clean:', 'Private_Dirty:'):
+                values[parts[0][:-1]] = int(parts[1])
+    return {'rss_mb': round(values['Rss'] / 1024, 1), 'pss_mb': round(values['Pss'] / 1024, 1),
+            'uss_mb': round((values['Private_Clean'] + values['Private_Dirty']) / 1024, 1)}
+
+
+def reload_under_load(server, seconds):
+    results = {'requests': 0, 'errors': 0}
+    done = threading.Event()
+
+    def client():
+        while not done.is_set():
+            try:
+                status, _ = server.request('GET', '/')
+                results['errors'] += status != 200
+            except OSError:
+                results['errors'] += 1
+            results['requests'] += 1
+
+    thread = threading.Thread(target=client)
+    thread.start()
+    time.sleep(seconds / 2)
+    old = set(server.workers())
+    started = time.perf_counter()
+    server.process.send_signal(signal.SIGHUP)
+    while set(server.workers()) & old or not server.workers():
+        time.sleep(0.05)
+    results['reload_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    time.sleep(seconds / 2)
+    done.set()
+    thread.join()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--requests', type=int, default=200, help='requests per worker before measuring memory')
+    parser.add_argument('--database', help='copy of this database is served (e.g. from benchmarks.datagen)')
+    parser.add_argument('--reload-seconds', type=float, default=4.0)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='portal-bench-')
+    env = environment(workdir, args.database)
+    results = {'workers': args.workers}
+    results['cold_start'] = [cold_start(env) for _ in range(args.repeats)]
+
+    for label, flags in (('cold', ('--no-warmup',)), ('warm', ())):
+        server = Server(env, args.workers, '--no-migrate', *flags)
+        results[f'first_requests_{label}'] = dict(first_requests(server), ready_ms=server.ready_ms)
+        server.stop()
+
+    server = Server(env, args.workers)
+    cookie = server.login('admin', 'admin123', 'admin')
+    for _ in range(args.requests * args.workers):
+        server.request('GET', '/admin/dashboard', cookie=cookie)
+    workers = server.workers()
+    results['memory'] = {'master': memory(server.process.pid),
+                         'workers': [memory(pid) for pid in workers]}
+    results['reload'] = reload_under_load(server, args.reload_seconds)
+    server.stop()
+    shutil.rmtree(workdir, ignore_errors=True)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
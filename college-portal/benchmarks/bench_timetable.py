@@ -0,0 +1,130 @@
+# Timetable lookups with 5k classes: compiling classes.schedule into the
+# per-weekday indexes, "what's on now" for one faculty / one section / the
+# whole college against re-parsing the schedules on every request, and the
+# /api/timetable endpoints end to end.
+import argparse
+import json
+import random
+import time
+
+import timetable
+from benchmarks.common import fresh_app, login, raw_connection, seed_students, summarize, timed
+
+DAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri']
+STARTS = [(9, 0), (10, 0), (11, 15), (12, 15), (14, 0), (15, 0), (16, 0)]
+
+
+def random_schedule(rng):
+    days = sorted(rng.sample(range(len(DAYS)), rng.randint(1, 3)))
+    hour, minute = rng.choice(STARTS)
+    length = rng.choice([50, 60, 90])
+    end = hour * 60 + minute + length
+    text = f'{hour}:{minute:02d}-{end // 60}:{end % 60:02d}'
+    if rng.random() < 0.3:
+        # Some rows in 12-hour style
+        text = f'{hour % 12 or 12}:{minute:02d}-{(end // 60) % 12 or 12}:{end % 60:02d}{"pm" if end >= 720 else "am"}'
+    return f'{", ".join(DAYS[d] for d in days)} {text}'
+
+
+def seed(classes, faculty, sections, section_size, rng):
+    conn = raw_connection()
+    conn.executemany("INSERT INTO users (username, password, role, name) VALUES (?, 'x', 'faculty', ?)",
+                     ((f'tfac{i}', f'Faculty {i}') for i in range(faculty)))
+    faculty_ids = [row[0] for row in conn.execute("SELECT id FROM users WHERE username LIKE 'tfac%'")]
+    conn.executemany('INSERT INTO classes (name, faculty_id, schedule, room) VALUES (?, ?, ?, ?)',
+                     ((f'Class {i}', rng.choice(faculty_ids), random_schedule(rng), f'Room {i % 400}')
+                      for i in range(classes)))
+    class_ids = [row[0] for row in conn.execute("SELECT id FROM classes WHERE name LIKE 'Class %'")]
+    conn.commit()
+    conn.close()
+
+    student_ids = seed_students(sections * section_size)
+    conn = raw_connection()
+    conn.executemany('UPDATE users SET section = ? WHERE id = ?',
+                     ((f'S{index // section_size}', student_id) for index, student_id in enumerate(student_ids)))
+    # Every class is taken by one section
+    conn.executemany('''INSERT OR IGNORE INTO enrollments (class_id, student_id)
+                        SELECT ?, id FROM users WHERE role = 'student' AND section = ?''',
+                     ((class_id, f'S{rng.randrange(sections)}') for class_id in class_ids))
+    conn.commit()
+    conn.close()
+    return faculty_ids
+
+
+def naive_now(conn, when, faculty_id=None):
+    # Re-parse the schedules on every lookup
+    minute = when.hour * 60 + when.minute
+    sql, params = 'SELECT id, schedule FROM classes', ()
+    if faculty_id is not None:
+        sql, params = sql + ' WHERE faculty_id = ?', (faculty_id,)
+    return [class_id for class_id, schedule in conn.execute(sql, params)
+            for day, start, end in timetable.parse_schedule(schedule)
+            if day == when.weekday() and start <= minute < end]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--classes', type=int, default=5000)
+    parser.add_argument('--faculty', type=int, default=1000)
+    parser.add_argument('--sections', type=int, default=100)
+    parser.add_argument('--section-size', type=int, default=30)
+    parser.add_argument('--lookups', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    app = fresh_app()
+    faculty_ids = seed(args.classes, args.faculty, args.sections, args.section_size, rng)
+    times = [timetable.parse_when(f'2024-06-{3 + rng.randrange(5):02d}T{rng.randint(8, 17):02d}:{rng.randrange(60):02d}')
+             for _ in range(args.lookups)]
+
+    conn = raw_connection()
+    compile_seconds, table = timed(timetable.load, conn, timetable.current_version(conn))
+    results = {
+        'classes': args.classes,
+        'slots': sum(len(slots) for slots in table.slots_by_class.values()),
+        'unscheduled': len(table.unscheduled),
+        'compile_ms': round(compile_seconds * 1000, 1),
+    }
+
+    def lookups(fn, count=None):
+        samples = []
+        for when in times[:count]:
+            started = time.perf_counter()
+            fn(when)
+            samples.append(time.perf_counter() - started)
+        return summarize(samples)
+
+    results['faculty_now'] = {
+        'index': lookups(lambda when: table.now(table.scope(faculty_id=rng.choice(faculty_ids)), when)),
+        'reparse': lookups(lambda when: naive_now(conn, when, rng.choice(faculty_ids))),
+    }
+    results['section_now'] = {
+        'index': lookups(lambda when: table.now(table.scope(section=('Computer Science', f'S{rng.randrange(args.sections)}')), when)),
+    }
+    results['college_now'] = {
+        'index': lookups(lambda when: table.now(table.scope(), when)),
+        'reparse': lookups(lambda when: naive_now(conn, when), count=50),
+    }
+    conn.close()
+
+    # End to end through the app, including the version check per request
+    client = login(app.test_client(), faculty_ids[0], 'faculty')
+    endpoints = {}
+    for name, path in (('now_faculty', '/api/timetable/now?at=2024-06-04T10:30'),
+                       ('week_faculty', '/api/timetable/week'),
+                       ('week_section', '/api/timetable/week?department=Computer%20Science&section=S1')):
+        client.get(path)
+        samples = [timed(client.get, path)[0] for _ in range(200)]
+        endpoints[name] = summarize(samples)
+    admin = login(app.test_client(), 1, 'admin')
+    admin.get('/api/timetable/week')
+    endpoints['now_college'] = summarize([timed(admin.get, '/api/timetable/now?at=2024-06-04T10:30')[0]
+                                          for _ in range(200)])
+    endpoints['week_college'] = summarize([timed(admin.get, '/api/timetable/week')[0] for _ in range(50)])
+    results['endpoints'] = endpoints
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+# Login lookups and profile reads with 100k users: the old SELECT * queries
+# versus the profile cache, the NOCASE lookup with and without its index, and
+# end-to-end /login throughput with a cheap scrypt cost so the lookup shows.
+import argparse
+import json
+import random
+import time
+
+import profiles
+from benchmarks.common import fresh_app, raw_connection, seed_students, summarize
+
+
+def sample(fn, keys):
+    samples = []
+    for key in keys:
+        started = time.perf_counter()
+        fn(key)
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+def logins(app, usernames):
+    client = app.test_client()
+    started = time.perf_counter()
+    for username in usernames:
+        response = client.post('/login', data={'username': username, 'password': 'student123', 'role': 'student'})
+        assert response.status_code == 302 and 'dashboard' in response.location, response.status_code
+    return round(len(usernames) / (time.perf_counter() - started), 1)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=100_000)
+    parser.add_argument('--lookups', type=int, default=5000)
+    parser.add_argument('--logins', type=int, default=500)
+    parser.add_argument('--log-n', type=int, default=4, help='log2 scrypt N for the login runs')
+    args = parser.parse_args()
+
+    app = fresh_app(PASSWORD_SCRYPT_N=2 ** args.log_n, LOGIN_USER_BURST=10 ** 9, LOGIN_IP_BURST=10 ** 9)
+    ids = seed_students(args.users)
+    conn = raw_connection()
+    cache = profiles.ProfileCache(size=args.users)
+    picks = random.sample(range(args.users), min(args.lookups, args.users))
+    names = [f'BENCH{i:07d}' for i in picks]
+    exact = [name.lower() for name in names]
+    user_ids = [ids[i] for i in picks]
+
+    results = {'users': args.users}
+    results['legacy_login_query'] = sample(lambda name: conn.execute(
+        'SELECT * FROM users WHERE username = ? AND password = ? AND role = ?',
+        (name, 'student123', 'student')).fetchone(), exact)
+    results['nocase_lookup_uncached'] = sample(lambda name: conn.execute(
+        f'SELECT {profiles.PROFILE_COLUMNS} FROM users WHERE username = ? COLLATE NOCASE', (name,)).fetchone(), names)
+    for name in names:
+        cache.by_username(conn, name)
+    results['nocase_lookup_cached'] = sample(lambda name: cache.by_username(conn, name), names)
+    results['profile_select_star'] = sample(lambda user_id: conn.execute(
+        'SELECT * FROM users WHERE id = ?', (user_id,)).fetchone(), user_ids)
+    results['profile_cached'] = sample(lambda user_id: cache.get(conn, user_id), user_ids)
+    results['cache'] = cache.stats()
+
+    # The first pass also upgrades the seeded plaintext passwords to hashes
+    usernames = names[:args.logins]
+    results['login_per_s_first'] = logins(app, usernames)
+    results['login_per_s_repeat'] = logins(app, usernames)
+
+    conn.execute('DROP INDEX idx_users_username_nocase')
+    results['nocase_lookup_without_index'] = sample(lambda name: conn.execute(
+        f'SELECT {profiles.PROFILE_COLUMNS} FROM users WHERE username = ? COLLATE NOCASE', (name,)).fetchone(),
+        names[:50])
+    conn.rollback()
+    conn.close()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
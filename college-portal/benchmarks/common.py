@@ -0,0 +1,104 @@
+# Shared helpers for the benchmark scripts. Run them from college-portal/,
+# e.g. `python -m benchmarks.bench_db_pool`.
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+
+import cache
+import database
+import instrumentation
+import notifications
+import passwords
+from app import app, init_db
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples):
+    return {
+        'count': len(samples),
+        'mean_ms': round(statistics.mean(samples) * 1000, 3) if samples else 0.0,
+        'p50_ms': round(percentile(samples, 50) * 1000, 3),
+        'p95_ms': round(percentile(samples, 95) * 1000, 3),
+        'p99_ms': round(percentile(samples, 99) * 1000, 3),
+    }
+
+
+def timed(fn, *args, **kwargs):
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - started, result
+
+
+def fresh_app(workdir=None, **config):
+    # Point the app at a brand new database file and re-run init_db
+    workdir = workdir or tempfile.mkdtemp(prefix='portal-bench-')
+    pool = app.extensions.pop('db_pool', None)
+    if pool is not None:
+        pool.close_all()
+    app.extensions.pop('fragment_cache', None)
+    app.extensions.pop('clubs_catalog', None)
+    app.extensions.pop('permission_router', None)
+    app.extensions.pop('timetable', None)
+    app.extensions.pop('login_limiter', None)
+    app.extensions.pop('profile_cache', None)
+    app.extensions.pop('metrics', None)
+    app.extensions.pop('db_factories', None)
+    hub = app.extensions.pop('notification_hub', None)
+    if hub is not None:
+        hub.close()
+    runner = app.extensions.pop('job_runner', None)
+    if runner is not None:
+        runner.shutdown()
+    hasher = app.extensions.pop('password_hasher', None)
+    if hasher is not None:
+        hasher.shutdown()
+    app.config.update(database.DEFAULT_CONFIG)
+    app.config.update(cache.DEFAULT_CONFIG)
+    app.config.update(passwords.DEFAULT_CONFIG)
+    app.config.update(instrumentation.DEFAULT_CONFIG)
+    app.config.update(notifications.DEFAULT_CONFIG)
+    app.config['DATABASE'] = os.path.join(workdir, 'college_portal.db')
+    app.config['FRAGMENT_CACHE_DATABASE'] = os.path.join(workdir, 'fragment_cache.db')
+    app.config.update(config)
+    app.config['TESTING'] = True
+    if app.config['INSTRUMENTATION_ENABLED']:
+        instrumentation.enable(app)
+    init_db()
+    return app
+
+
+def raw_connection():
+    conn = sqlite3.connect(app.config['DATABASE'])
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def seed_students(count, department='Computer Science', section='A'):
+    conn = raw_connection()
+    conn.executemany(
+        'INSERT INTO users (username, password, role, name, email, rollno, section, department) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+        ((f'bench{i:07d}', 'student123', 'student', f'Student {i}', f'bench{i}@college.edu',
+          f'B{i:07d}', section, department) for i in range(count))
+    )
+    conn.commit()
+    ids = [row[0] for row in conn.execute("SELECT id FROM users WHERE username LIKE 'bench%' ORDER BY id")]
+    conn.close()
+    return ids
+
+
+def login(client, user_id, role, name='Bench User'):
+    with client.session_transaction() as sess:
+        sess['user_id'] = user_id
+        sess['username'] = f'user{user_id}'
+        sess['role'] = role
+        sess['name'] = name
+    return client
@@ -0,0 +1,194 @@
+# Synthetic college_portal.db for load tests: departments and sections of
+# students, faculty teaching a few classes each, a school year (or several)
+# of daily attendance and a realistic trickle of permission requests.
+# The same arguments and --seed always produce the same data. Bulk rows are
+# inserted with the triggers dropped; the module install() functions then
+# recreate them and rebuild every derived table in one pass.
+#
+#   python -m benchmarks.datagen bench_portal.db --students 5000 --days 365
+import argparse
+import json
+import os
+import random
+import time
+from datetime import date, timedelta
+
+import catalog
+import database
+import enrollment
+import migrations
+import notifications
+import passwords
+import registrations
+import rollups
+import routing
+import search
+import stats
+import timetable
+
+PASSWORD = 'bench123'
+
+DEPARTMENTS = ['Computer Science', 'Electronics', 'Mechanical', 'Civil', 'Electrical',
+               'Information Technology', 'Chemical', 'Biotechnology', 'Aerospace', 'Mathematics']
+SUBJECTS = ['Mathematics', 'Physics', 'Chemistry', 'Programming', 'Data Structures', 'Algorithms',
+            'Circuits', 'Signals', 'Thermodynamics', 'Mechanics', 'Databases', 'Networks',
+            'Operating Systems', 'Statistics', 'Economics', 'Communication Skills']
+DAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri']
+SLOTS = ['9:00-10:00', '10:00-11:00', '11:15-12:15', '12:15-13:15', '14:00-15:00', '15:00-16:00']
+REASONS = ['Medical appointment', 'Family function', 'Fever', 'Hackathon', 'Sports meet',
+           'Cultural fest', 'Placement interview', 'Travel']
+CLUBS = ['Coding Club', 'Robotics Club', 'Music Club', 'Drama Club', 'Photography Club', 'Debate Club']
+EVENTS = ['Tech Fest', 'Hackathon', 'Sports Meet', 'Cultural Night', 'Alumni Meet', 'Workshop']
+CHUNK = 10_000
+
+
+def _chunks(rows, size=CHUNK):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def generate(path, students=2000, faculty=60, departments=6, sections=3, classes_per_section=5,
+             days=180, start='2024-07-01', permissions=2.0, seed=1, password_log_n=14):
+    # Build a fresh database at path and return row counts. permissions is
+    # the average number of requests per student.
+    rng = random.Random(seed)
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    conn = database.connect({**database.DEFAULT_CONFIG, 'DATABASE': path})
+    migrations.migrate(conn)
+    for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'").fetchall():
+        conn.execute(f'DROP TRIGGER {name}')
+
+    # One hash shared by every account: the login cost is realistic without
+    # spending minutes hashing the same password
+    hashed = passwords.hash_password(PASSWORD, 2 ** password_log_n)
+    departments = DEPARTMENTS[:departments]
+    section_names = [chr(65 + i) for i in range(sections)]
+
+    conn.execute("INSERT INTO users (username, password, role, name, email) VALUES (?, ?, 'admin', ?, ?)",
+                 ('admin', hashed, 'System Administrator', 'admin@college.edu'))
+    conn.executemany(
+        "INSERT INTO users (username, password, role, name, email, department) VALUES (?, ?, 'faculty', ?, ?, ?)",
+        ((f'fac{i}', hashed, f'Faculty {i}', f'fac{i}@college.edu', departments[i % len(departments)])
+         for i in range(1, faculty + 1)))
+    for batch in _chunks((f'stu{i}', hashed, f'Student {i}', f'stu{i}@college.edu', f'B.Tech {department[:3].upper()}',
+                          f'{i:06d}', rng.choice(section_names), department)
+                         for i in range(1, students + 1) for department in [rng.choice(departments)]):
+        conn.executemany('''INSERT INTO users (username, password, role, name, email, class, rollno, section, department)
+                            VALUES (?, ?, 'student', ?, ?, ?, ?, ?, ?)''', batch)
+
+    # Two classes per faculty, each with a weekly schedule
+    faculty_rows = conn.execute("SELECT id, department FROM users WHERE role = 'faculty' ORDER BY id").fetchall()
+    for faculty_id, department in faculty_rows:
+        for _ in range(2):
+            days_taught = sorted(rng.sample(range(len(DAYS)), 2))
+            conn.execute('INSERT INTO classes (name, faculty_id, schedule, room) VALUES (?, ?, ?, ?)',
+                         (rng.choice(SUBJECTS), faculty_id,
+                          f'{", ".join(DAYS[d] for d in days_taught)} {rng.choice(SLOTS)}',
+                          f'Room {rng.randint(100, 499)}'))
+    conn.executemany('INSERT INTO clubs_events (name, type) VALUES (?, ?)',
+                     [(name, 'club') for name in CLUBS] + [(name, 'event') for name in EVENTS])
+
+    # Each department/section attends a fixed set of its department's classes
+    conn.execute('CREATE TEMP TABLE section_classes (department TEXT, section TEXT, class_id INTEGER)')
+    classes_by_department = {}
+    for class_id, department in conn.execute(
+            'SELECT c.id, u.department FROM classes c JOIN users u ON u.id = c.faculty_id ORDER BY c.id'):
+        classes_by_department.setdefault(department, []).append(class_id)
+    for department in departments:
+        options = classes_by_department.get(department, [])
+        for section in section_names:
+            for class_id in rng.sample(options, min(classes_per_section, len(options))):
+                conn.execute('INSERT INTO section_classes VALUES (?, ?, ?)', (department, section, class_id))
+    # ...and every student is enrolled in their section's classes
+    conn.execute('''
+        INSERT INTO enrollments (class_id, student_id)
+        SELECT sc.class_id, u.id FROM users u
+        JOIN section_classes sc ON sc.department = u.department AND sc.section = u.section
+        WHERE u.role = 'student'
+    ''')
+
+    # One mark per student per class per school day, ~85% present; the
+    # status is a hash of the key so reruns match
+    conn.execute('''
+        WITH RECURSIVE d(n) AS (SELECT 0 UNION ALL SELECT n + 1 FROM d WHERE n < ? * 7 / 5 + 7),
+        school_days AS (
+            SELECT n, date(?, '+' || n || ' days') AS day FROM d
+            WHERE strftime('%w', ?, '+' || n || ' days') NOT IN ('0', '6')
+            LIMIT ?
+        )
+        INSERT INTO attendance (student_id, class_id, date, status, marked_by)
+        SELECT u.id, sc.class_id, day,
+               CASE WHEN (u.id * 7919 + sc.class_id * 104729 + n * 1299709 + ?) % 100 < 85
+                    THEN 'present' ELSE 'absent' END,
+               c.faculty_id
+        FROM school_days
+        CROSS JOIN users u
+        JOIN section_classes sc ON sc.department = u.department AND sc.section = u.section
+        JOIN classes c ON c.id = sc.class_id
+        WHERE u.role = 'student'
+    ''', (days, start, start, days, seed))
+
+    # Recreate the triggers and rebuild the derived tables they maintain;
+    # enrollment.install also records a session for every day of marks
+    for module in (stats, search, rollups, catalog, routing, enrollment, timetable, registrations, notifications):
+        module.install(conn)
+
+    routes = {(row[0], row[1]): row[2] for row in conn.execute(
+        'SELECT department, section, faculty_id FROM permission_routes')}
+    student_rows = conn.execute("SELECT id, department, section FROM users WHERE role = 'student' ORDER BY id").fetchall()
+    first_day = date.fromisoformat(start)
+    last_day = max(days * 7 // 5, 1)
+    statuses = ['approved', 'rejected', 'pending']
+
+    def permission_rows():
+        for student_id, department, section in student_rows:
+            for _ in range(rng.randint(0, int(permissions * 2))):
+                yield (student_id, routes.get((department, section)),
+                       (first_day + timedelta(days=rng.randrange(last_day))).isoformat(),
+                       rng.choice(REASONS), 'Certificate', rng.choices(statuses, weights=[6, 1, 3])[0])
+    for batch in _chunks(permission_rows()):
+        conn.executemany('INSERT INTO permissions (student_id, faculty_id, date, reason, proof, status) VALUES (?, ?, ?, ?, ?, ?)',
+                         batch)
+
+    conn.execute('ANALYZE')
+    conn.commit()
+    counts = {table: conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+              for table in ('users', 'classes', 'enrollments', 'attendance_sessions', 'attendance',
+                            'permissions', 'clubs_events')}
+    conn.close()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('output', help='database file to create (replaced if it exists)')
+    parser.add_argument('--students', type=int, default=2000)
+    parser.add_argument('--faculty', type=int, default=60)
+    parser.add_argument('--departments', type=int, default=6)
+    parser.add_argument('--sections', type=int, default=3)
+    parser.add_argument('--classes-per-section', type=int, default=5)
+    parser.add_argument('--days', type=int, default=180, help='school days of attendance')
+    parser.add_argument('--start', default='2024-07-01')
+    parser.add_argument('--permissions', type=float, default=2.0, help='average requests per student')
+    parser.add_argument('--password-log-n', type=int, default=14, help='log2 scrypt N of the shared password hash')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    counts = generate(args.output, args.students, args.faculty, args.departments, args.sections,
+                      args.classes_per_section, args.days, args.start, args.permissions, args.seed,
+                      args.password_log_n)
+    print(json.dumps({'database': args.output, 'password': PASSWORD, 'rows': counts,
+                      'seconds': round(time.perf_counter() - started, 1)}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
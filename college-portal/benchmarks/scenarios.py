@@ -0,0 +1,348 @@
+# Load-test scenario runner. Drives a weighted mix of login, the three
+# dashboards, mark_attendance, proof uploads and student imports from
+# concurrent virtual users, either through Flask's test client or against a
+# local threaded WSGI server over real HTTP, and writes throughput and
+# p50/p95/p99 per scenario as JSON. Runs on a copy of the database, so the
+# same input and --seed give comparable numbers across commits:
+#
+#   python -m benchmarks.datagen /tmp/bench.db --students 5000
+#   python -m benchmarks.scenarios --database /tmp/bench.db --server --clients 16 --output run.json
+#   python -m benchmarks.scenarios --database /tmp/bench.db --server --clients 16 --compare run.json
+import argparse
+import http.client
+import io
+import json
+import logging
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlencode
+
+from werkzeug.datastructures import FileStorage, MultiDict
+from werkzeug.serving import make_server
+from werkzeug.test import encode_multipart
+
+from benchmarks import datagen
+from benchmarks.common import fresh_app, summarize
+
+DEFAULT_MIX = ('login=10,student_dashboard=35,faculty_dashboard=15,admin_dashboard=5,'
+               'mark_attendance=15,apply_permission=15,upload_students=1')
+
+
+class TestClientSession:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, form=None, json_body=None, files=None):
+        data = dict(form or {})
+        for name, (filename, content) in (files or {}).items():
+            data[name] = (io.BytesIO(content), filename)
+        response = self.client.open(path, method=method, data=data or None, json=json_body)
+        return response.status_code, response.get_data()
+
+
+class HttpSession:
+    # Keep-alive connection with a cookie jar of one: enough for Flask sessions
+    def __init__(self, host, port):
+        self.connection = http.client.HTTPConnection(host, port, timeout=60)
+        self.cookie = None
+
+    def request(self, method, path, form=None, json_body=None, files=None):
+        headers = {}
+        body = None
+        if files:
+            values = MultiDict(form or {})
+            for name, (filename, content) in files.items():
+                values[name] = FileStorage(io.BytesIO(content), filename=filename)
+            boundary, body = encode_multipart(values)
+            headers['Content-Type'] = f'multipart/form-data; boundary={boundary}'
+        elif json_body is not None:
+            body = json.dumps(json_body).encode()
+            headers['Content-Type'] = 'application/json'
+        elif form is not None:
+            body = urlencode(form).encode()
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        if self.cookie:
+            headers['Cookie'] = self.cookie
+        self.connection.request(method, path, body=body, headers=headers)
+        response = self.connection.getresponse()
+        body = response.read()
+        cookie = response.getheader('Set-Cookie')
+        if cookie:
+            self.cookie = cookie.split(';', 1)[0]
+        return response.status, body
+
+
+class Context:
+    # Users and rosters read once from the database under test
+    def __init__(self, path):
+        conn = sqlite3.connect(path)
+        self.students = [row[0] for row in conn.execute("SELECT username FROM users WHERE role = 'student'")]
+        # Faculty username -> [(class_id, enrolled student ids)]
+        self.faculty = {}
+        for faculty_id, username in conn.execute("SELECT id, username FROM users WHERE role = 'faculty'"):
+            self.faculty[username] = [
+                (class_id, [row[0] for row in conn.execute(
+                    'SELECT student_id FROM enrollments WHERE class_id = ?', (class_id,))])
+                for (class_id,) in conn.execute('SELECT id FROM classes WHERE faculty_id = ?', (faculty_id,))]
+        self.faculty_names = list(self.faculty)
+        self.rows = {table: conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+                     for table in ('users', 'classes', 'attendance', 'permissions')}
+        conn.close()
+        self.import_counter = 0
+        self.lock = threading.Lock()
+        self.proofs = [b'%PDF-1.4\n' + os.urandom(64 * 1024) for _ in range(8)]
+
+
+def succeeded(status, body, api=False):
+    # API routes answer 200 with success: false on failure
+    if status >= 400:
+        return False
+    if api:
+        try:
+            return bool(json.loads(body).get('success'))
+        except ValueError:
+            return False
+    return True
+
+
+class VirtualUser:
+    # Each scenario method performs one request and returns whether it worked
+    def __init__(self, context, new_session, rng):
+        self.context = context
+        self.new_session = new_session
+        self.rng = rng
+        self.sessions = {}
+
+    def session(self, role):
+        # One logged-in session per role, created on first use
+        if role not in self.sessions:
+            if role == 'admin':
+                username = 'admin'
+            elif role == 'faculty':
+                username = self.rng.choice(self.context.faculty_names)
+            else:
+                username = self.rng.choice(self.context.students)
+            session = self.new_session()
+            status, _ = session.request('POST', '/login', form={'username': username, 'password': datagen.PASSWORD,
+                                                                 'role': role})
+            if status != 302:
+                raise RuntimeError(f'login as {username} failed with {status}')
+            self.sessions[role] = (session, username)
+        return self.sessions[role]
+
+    def login(self):
+        username = self.rng.choice(self.context.students)
+        status, _ = self.new_session().request('POST', '/login', form={'username': username,
+                                                                        'password': datagen.PASSWORD, 'role': 'student'})
+        return status == 302
+
+    def student_dashboard(self):
+        return succeeded(*self.session('student')[0].request('GET', '/student/dashboard'))
+
+    def faculty_dashboard(self):
+        session, username = self.session('faculty')
+        classes = self.context.faculty[username]
+        path = f'/faculty/dashboard?class_id={self.rng.choice(classes)[0]}' if classes else '/faculty/dashboard'
+        return succeeded(*session.request('GET', path))
+
+    def admin_dashboard(self):
+        return succeeded(*self.session('admin')[0].request('GET', '/admin/dashboard'))
+
+    def mark_attendance(self):
+        session, username = self.session('faculty')
+        if not self.context.faculty[username]:
+            return False
+        class_id, roster = self.rng.choice(self.context.faculty[username])
+        marks = {str(student_id): self.rng.choice(['present', 'present', 'present', 'absent'])
+                 for student_id in roster}
+        return succeeded(*session.request('POST', '/api/mark_attendance', json_body={
+            'class_id': class_id, 'period': self.rng.randint(1, 6), 'attendance': marks}), api=True)
+
+    def apply_permission(self):
+        # Proofs repeat across users, as shared certificates do
+        return succeeded(*self.session('student')[0].request(
+            'POST', '/api/add_permission',
+            form={'date': f'2025-{self.rng.randint(1, 12):02d}-{self.rng.randint(1, 28):02d}',
+                  'reason': self.rng.choice(datagen.REASONS), 'proof': 'certificate'},
+            files={'proof_file': ('certificate.pdf', self.rng.choice(self.context.proofs))}), api=True)
+
+    def upload_students(self):
+        with self.context.lock:
+            self.context.import_counter += 1
+            batch = self.context.import_counter
+        lines = ['Name,RollNo,Email,Section,Dept,Password']
+        lines += [f'Imported {batch}-{i},IMP{batch:05d}{i:03d},imp{batch}.{i}@college.edu,A,Computer Science,pw{i}'
+                  for i in range(50)]
+        return succeeded(*self.session('admin')[0].request(
+            'POST', '/api/upload_students', files={'file': ('students.csv', '\n'.join(lines).encode())}), api=True)
+
+
+def parse_mix(text):
+    mix = {}
+    for item in text.split(','):
+        name, _, weight = item.partition('=')
+        if not hasattr(VirtualUser, name.strip()):
+            raise SystemExit(f'unknown scenario: {name}')
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def run(context, new_session, mix, clients, duration, seed):
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    samples = {name: [] for name in names}
+    errors = {name: 0 for name in names}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(index):
+        rng = random.Random(seed * 1000 + index)
+        user = VirtualUser(context, new_session, rng)
+        local = {name: [] for name in names}
+        failed = {name: 0 for name in names}
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            started = time.perf_counter()
+            try:
+                ok = getattr(user, name)()
+            except Exception:
+                ok = False
+            local[name].append(time.perf_counter() - started)
+            if not ok:
+                failed[name] += 1
+        with lock:
+            for name in names:
+                samples[name].extend(local[name])
+                errors[name] += failed[name]
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    scenarios = {name: {'errors': errors[name], 'throughput_rps': round(len(samples[name]) / elapsed, 2),
+                        **summarize(samples[name])}
+                 for name in names}
+    everything = [sample for name in names for sample in samples[name]]
+    overall = {'errors': sum(errors.values()), 'throughput_rps': round(len(everything) / elapsed, 2),
+               **summarize(everything)}
+    return {'elapsed_s': round(elapsed, 2), 'overall': overall, 'scenarios': scenarios}
+
+
+def compare(current, baseline):
+    # Relative change of the headline numbers; negative latency is better
+    def delta(new, old):
+        return round((new - old) * 100.0 / old, 1) if old else None
+
+    result = {}
+    for name, stats in current['scenarios'].items():
+        old = baseline.get('scenarios', {}).get(name)
+        if old:
+            result[name] = {key: delta(stats[key], old[key])
+                            for key in ('throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms')}
+    return result
+
+
+def git_revision():
+    try:
+        revision = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                  check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                                    capture_output=True, text=True).stdout.strip())
+        return revision + ('-dirty' if dirty else '')
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--database', help='generated database to run against (copied first); '
+                                           'default: generate a small one')
+    parser.add_argument('--students', type=int, default=2000, help='size of the generated default database')
+    parser.add_argument('--server', action='store_true', help='use a local threaded WSGI server over HTTP')
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=20.0, help='seconds')
+    parser.add_argument('--warmup', type=float, default=2.0, help='seconds run first and discarded')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='scenario=weight,...')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='write the JSON report here')
+    parser.add_argument('--compare', help='earlier JSON report to compare against')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='portal-load-')
+    target = os.path.join(workdir, 'college_portal.db')
+    if args.database:
+        source = sqlite3.connect(args.database)
+        copy = sqlite3.connect(target)
+        source.backup(copy)
+        copy.close()
+        source.close()
+    else:
+        datagen.generate(target, students=args.students, seed=args.seed)
+
+    # Match the scrypt cost of the stored hashes so logins don't re-hash
+    conn = sqlite3.connect(target)
+    n, r, p = (int(value) for value in conn.execute(
+        "SELECT password FROM users WHERE username = 'admin'").fetchone()[0].split('$')[1:4])
+    conn.close()
+    uploads = os.path.join(workdir, 'uploads')
+    app = fresh_app(workdir, PASSWORD_SCRYPT_N=n, PASSWORD_SCRYPT_R=r, PASSWORD_SCRYPT_P=p,
+                    LOGIN_USER_BURST=10 ** 9, LOGIN_IP_BURST=10 ** 9, PASSWORD_MAX_PENDING=args.clients * 4,
+                    UPLOAD_FOLDER=uploads, IMPORT_REPORT_FOLDER=os.path.join(uploads, 'import_reports'),
+                    PROOF_FOLDER=os.path.join(uploads, 'proofs'), JOBS_MAX_PENDING=10 ** 6)
+    context = Context(target)
+    mix = parse_mix(args.mix)
+
+    server = None
+    if args.server:
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)  # no per-request access log
+        server = make_server('127.0.0.1', 0, app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        new_session = lambda: HttpSession('127.0.0.1', server.server_port)
+    else:
+        new_session = lambda: TestClientSession(app)
+
+    if args.warmup:
+        run(context, new_session, mix, args.clients, args.warmup, args.seed + 1)
+    results = run(context, new_session, mix, args.clients, args.duration, args.seed)
+    if server is not None:
+        server.shutdown()
+
+    report = {
+        'meta': {
+            'revision': git_revision(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'cpus': os.cpu_count(),
+            'mode': 'wsgi-server' if args.server else 'test-client',
+            'clients': args.clients,
+            'duration_s': args.duration,
+            'seed': args.seed,
+            'mix': mix,
+            'rows': context.rows,
+            'scrypt_n': n,
+        },
+        **results,
+    }
+    if args.compare:
+        with open(args.compare) as baseline:
+            report['compare_pct'] = compare(report, json.load(baseline))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as output:
+            output.write(text + '\n')
+    print(text)
+
+
+if __name__ == '__main__':
+    main()
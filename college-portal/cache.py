@@ -0,0 +1,244 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from markupsafe import Markup
+
+# Render cache for dashboard fragments. Entries are keyed strings of HTML
+# tagged with the records they were built from (e.g. 'user:42'); endpoints
+# that write those records invalidate the tag. The TTL bounds staleness for
+# writes that bypass the routes.
+#
+# The memory backend is per process. With several worker processes use the
+# sqlite backend so an invalidation in one worker reaches all of them.
+
+DEFAULT_CONFIG = {
+    'FRAGMENT_CACHE_BACKEND': 'memory',   # 'memory', 'sqlite' or 'none'
+    'FRAGMENT_CACHE_SIZE': 4096,          # entries kept before LRU eviction
+    'FRAGMENT_CACHE_TTL': 300,            # seconds
+    'FRAGMENT_CACHE_DATABASE': os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fragment_cache.db'),
+}
+
+
+class MemoryBackend:
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()   # key -> (value, expires_at, tags)
+        self._tags = {}                 # tag -> set of keys
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] < time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value, ttl, tags):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, time.monotonic() + ttl, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, tags):
+        removed = 0
+        with self._lock:
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._remove(key)
+                    removed += 1
+        return removed
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def size(self):
+        return len(self._entries)
+
+    def _remove(self, key):
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+class SQLiteBackend:
+    # Shared by every process pointing at the same file. One connection per
+    # thread; writes are small and WAL keeps readers from blocking.
+    PRUNE_EVERY = 200
+
+    def __init__(self, path, max_entries):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._writes = 0
+        self.evictions = 0
+        conn = self._conn()
+        conn.execute('''CREATE TABLE IF NOT EXISTS fragments (
+                            key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL
+                        ) WITHOUT ROWID''')
+        conn.execute('''CREATE TABLE IF NOT EXISTS fragment_tags (
+                            tag TEXT NOT NULL, key TEXT NOT NULL, PRIMARY KEY (tag, key)
+                        ) WITHOUT ROWID''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_fragment_tags_key ON fragment_tags (key)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_fragments_expires ON fragments (expires_at)')
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute('PRAGMA synchronous = OFF')
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._conn().execute('SELECT value FROM fragments WHERE key = ? AND expires_at >= ?',
+                                   (key, time.time())).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, value, ttl, tags):
+        conn = self._conn()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('INSERT OR REPLACE INTO fragments (key, value, expires_at) VALUES (?, ?, ?)',
+                         (key, value, time.time() + ttl))
+            conn.execute('DELETE FROM fragment_tags WHERE key = ?', (key,))
+            conn.executemany('INSERT OR IGNORE INTO fragment_tags (tag, key) VALUES (?, ?)',
+                             [(tag, key) for tag in tags])
+        self._writes += 1
+        if self._writes % self.PRUNE_EVERY == 0:
+            self.prune()
+
+    def invalidate(self, tags):
+        conn = self._conn()
+        removed = 0
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            for tag in tags:
+                removed += conn.execute('DELETE FROM fragments WHERE key IN (SELECT key FROM fragment_tags WHERE tag = ?)',
+                                        (tag,)).rowcount
+                conn.execute('DELETE FROM fragment_tags WHERE key IN (SELECT key FROM fragment_tags WHERE tag = ?)',
+                             (tag,))
+        return removed
+
+    def prune(self):
+        # Drop expired entries, then the soonest-to-expire ones over the limit
+        conn = self._conn()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('DELETE FROM fragments WHERE expires_at < ?', (time.time(),))
+            excess = conn.execute('SELECT COUNT(*) FROM fragments').fetchone()[0] - self.max_entries
+            if excess > 0:
+                conn.execute('DELETE FROM fragments WHERE key IN (SELECT key FROM fragments ORDER BY expires_at LIMIT ?)',
+                             (excess,))
+                self.evictions += excess
+            conn.execute('DELETE FROM fragment_tags WHERE key NOT IN (SELECT key FROM fragments)')
+
+    def clear(self):
+        conn = self._conn()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('DELETE FROM fragments')
+            conn.execute('DELETE FROM fragment_tags')
+
+    def size(self):
+        return self._conn().execute('SELECT COUNT(*) FROM fragments').fetchone()[0]
+
+
+class FragmentCache:
+    def __init__(self, backend, ttl):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def fragment(self, key, tags, render):
+        # Cached HTML for key, calling render() to build it on a miss
+        if self.backend is None:
+            return Markup(render())
+        value = self.backend.get(key)
+        if value is not None:
+            self.hits += 1
+            return Markup(value)
+        self.misses += 1
+        value = str(render())
+        self.backend.set(key, value, self.ttl, tuple(tags))
+        return Markup(value)
+
+    def invalidate(self, *tags):
+        if self.backend is None or not tags:
+            return 0
+        removed = self.backend.invalidate(tags)
+        self.invalidations += removed
+        return removed
+
+    def clear(self):
+        if self.backend is not None:
+            self.backend.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'backend': type(self.backend).__name__ if self.backend else None,
+            'entries': self.backend.size() if self.backend else 0,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+            'invalidations': self.invalidations,
+            'evictions': self.backend.evictions if self.backend else 0,
+        }
+
+
+def create(config):
+    backend = config['FRAGMENT_CACHE_BACKEND']
+    if backend == 'memory':
+        store = MemoryBackend(config['FRAGMENT_CACHE_SIZE'])
+    elif backend == 'sqlite':
+        store = SQLiteBackend(config['FRAGMENT_CACHE_DATABASE'], config['FRAGMENT_CACHE_SIZE'])
+    elif backend == 'none':
+        store = None
+    else:
+        raise ValueError(f'Unknown fragment cache backend: {backend}')
+    return FragmentCache(store, config['FRAGMENT_CACHE_TTL'])
+
+
+def get_cache(app=None):
+    from flask import current_app
+
+    app = app or current_app._get_current_object()
+    fragments = app.extensions.get('fragment_cache')
+    if fragments is None:
+        fragments = app.extensions['fragment_cache'] = create(app.config)
+    return fragments
+
+
+def invalidate(*tags):
+    return get_cache().invalidate(*tags)
+
+
+def user_tag(user_id):
+    return f'user:{user_id}'
+
+
+def init_app(app):
+    for key, value in DEFAULT_CONFIG.items():
+        app.config.setdefault(key, value)
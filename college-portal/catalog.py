@@ -0,0 +1,75 @@
+import hashlib
+import json
+import threading
+
+# In-process copy of the active clubs/events catalog. Triggers on
+# clubs_events (installed by migration 9) bump a version number on every
+# write; readers compare that single row against the cached version and only
+# reload - and re-serialize - the catalog when it moved, whichever process
+# made the change.
+
+TRIGGERS = [
+    f'''CREATE TRIGGER IF NOT EXISTS catalog_clubs_events_{event.lower()} AFTER {event} ON clubs_events BEGIN
+            UPDATE catalog_versions SET version = version + 1 WHERE name = 'clubs_events';
+        END'''
+    for event in ('INSERT', 'UPDATE', 'DELETE')
+]
+
+
+def install(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS catalog_versions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    ''')
+    conn.execute("INSERT OR IGNORE INTO catalog_versions (name, version) VALUES ('clubs_events', 1)")
+    for trigger in TRIGGERS:
+        conn.execute(trigger)
+
+
+def current_version(conn):
+    row = conn.execute("SELECT version FROM catalog_versions WHERE name = 'clubs_events'").fetchone()
+    return row[0] if row else None
+
+
+class Snapshot:
+    def __init__(self, version, rows):
+        self.version = version
+        self.rows = rows
+        self.clubs = [row for row in rows if row['type'] == 'club']
+        self.events = [row for row in rows if row['type'] == 'event']
+        # Serialized once per version; the ETag is a hash of the exact body
+        self.body = json.dumps(rows).encode('utf-8')
+        self.etag = hashlib.sha256(self.body).hexdigest()
+
+
+class ClubsCatalog:
+    def __init__(self):
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self.reloads = 0
+
+    def get(self, conn):
+        version = current_version(conn)
+        snapshot = self._snapshot
+        if snapshot is not None and version is not None and snapshot.version == version:
+            return snapshot
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or version is None or snapshot.version != version:
+                rows = conn.execute('SELECT * FROM clubs_events WHERE is_active = 1 ORDER BY type, name').fetchall()
+                snapshot = Snapshot(version, [dict(row) for row in rows])
+                self._snapshot = snapshot
+                self.reloads += 1
+        return snapshot
+
+
+def get_catalog(app=None):
+    from flask import current_app
+
+    app = app or current_app._get_current_object()
+    catalog = app.extensions.get('clubs_catalog')
+    if catalog is None:
+        catalog = app.extensions['clubs_catalog'] = ClubsCatalog()
+    return catalog
@@ -1,15 +1,212 @@
+import os
+import queue
 import sqlite3
+import threading
+import time
+
+from flask import current_app, g, has_app_context
+
+# Defaults for the connection layer; every key can be overridden in app.config
+DEFAULT_CONFIG = {
+    # Next to the code rather than in the working directory
+    'DATABASE': os.path.join(os.path.dirname(os.path.abspath(__file__)), 'college_portal.db'),
+    'SQLITE_POOL_SIZE': 8,           # 0 disables pooling (one connection per request)
+    'SQLITE_POOL_TIMEOUT': 30.0,     # seconds to wait for a free pooled connection
+    'SQLITE_JOURNAL_MODE': 'WAL',
+    'SQLITE_SYNCHRONOUS': 'NORMAL',
+    'SQLITE_CACHE_SIZE': -16000,     # negative = KiB, so ~16 MB page cache
+    'SQLITE_MMAP_SIZE': 134217728,   # 128 MB
+    'SQLITE_BUSY_TIMEOUT': 5000,     # milliseconds
+}
+
+
+class PooledConnection(sqlite3.Connection):
+    # Connections handed out by the pool ignore close(); the pool (or the
+    # request teardown) decides when they are returned or really closed.
+    _pool = None
+
+    def close(self):
+        if self._pool is None:
+            super().close()
+
+    def _really_close(self):
+        sqlite3.Connection.close(self)
+
+
+def apply_pragmas(conn, config):
+    conn.execute(f"PRAGMA journal_mode = {config['SQLITE_JOURNAL_MODE']}")
+    conn.execute(f"PRAGMA synchronous = {config['SQLITE_SYNCHRONOUS']}")
+    conn.execute(f"PRAGMA cache_size = {int(config['SQLITE_CACHE_SIZE'])}")
+    conn.execute(f"PRAGMA mmap_size = {int(config['SQLITE_MMAP_SIZE'])}")
+    conn.execute(f"PRAGMA busy_timeout = {int(config['SQLITE_BUSY_TIMEOUT'])}")
+
+
+def connect(config=None, factory=sqlite3.Connection, check_same_thread=True):
+    # Open a single tuned connection outside of any pool
+    if config is None:
+        config = current_app.config if has_app_context() else DEFAULT_CONFIG
+    conn = sqlite3.connect(config['DATABASE'],
+                           timeout=config['SQLITE_BUSY_TIMEOUT'] / 1000.0,
+                           factory=factory,
+                           check_same_thread=check_same_thread)
+    conn.row_factory = sqlite3.Row
+    apply_pragmas(conn, config)
+    return conn
+
+
+class ConnectionPool:
+    def __init__(self, config, factory=PooledConnection):
+        self.config = dict(config)
+        self.factory = factory
+        self.size = int(self.config['SQLITE_POOL_SIZE'])
+        self.timeout = float(self.config['SQLITE_POOL_TIMEOUT'])
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._pid = os.getpid()
+        self._stats = {'opens': 0, 'reuses': 0, 'waits': 0, 'wait_time': 0.0,
+                       'timeouts': 0, 'in_use': 0}
+
+    def _open(self):
+        conn = connect(self.config, factory=self.factory, check_same_thread=False)
+        conn._pool = self
+        with self._lock:
+            self._stats['opens'] += 1
+        return conn
+
+    def _check_fork(self):
+        # A forked worker must never share file handles with its parent
+        if self._pid != os.getpid():
+            with self._lock:
+                self._idle = queue.LifoQueue()
+                self._created = 0
+                self._stats['in_use'] = 0
+                self._pid = os.getpid()
+
+    def acquire(self):
+        self._check_fork()
+        try:
+            conn = self._idle.get_nowait()
+            with self._lock:
+                self._stats['reuses'] += 1
+                self._stats['in_use'] += 1
+            return conn
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            can_open = self._created < self.size
+            if can_open:
+                self._created += 1
+        if can_open:
+            try:
+                conn = self._open()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+            with self._lock:
+                self._stats['in_use'] += 1
+            return conn
+
+        # Pool exhausted - wait for another request to hand one back
+        started = time.perf_counter()
+        try:
+            conn = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            with self._lock:
+                self._stats['timeouts'] += 1
+            raise RuntimeError('Timed out waiting for a database connection')
+        waited = time.perf_counter() - started
+        with self._lock:
+            self._stats['waits'] += 1
+            self._stats['wait_time'] += waited
+            self._stats['reuses'] += 1
+            self._stats['in_use'] += 1
+        return conn
+
+    def release(self, conn):
+        if self._pid != os.getpid():
+            return
+        with self._lock:
+            self._stats['in_use'] -= 1
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            # Broken connection - drop it and let the pool open a fresh one
+            with self._lock:
+                self._created -= 1
+            conn._really_close()
+            return
+        self._idle.put(conn)
+
+    def close_all(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn._really_close()
+            with self._lock:
+                self._created -= 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = self.size
+            stats['open'] = self._created
+        stats['idle'] = self._idle.qsize()
+        stats['wait_time'] = round(stats['wait_time'], 6)
+        return stats
+
+
+def _factories(app):
+    # (pooled, unpooled) connection classes; instrumentation.enable() swaps in
+    # subclasses that time every statement
+    return app.extensions.get('db_factories', (PooledConnection, sqlite3.Connection))
+
+
+def get_pool(app=None):
+    app = app or current_app._get_current_object()
+    pool = app.extensions.get('db_pool')
+    if pool is None:
+        pool = app.extensions['db_pool'] = ConnectionPool(app.config, factory=_factories(app)[0])
+    return pool
+
+
+def get_db():
+    # One connection per request, reused from the pool and released on teardown
+    if 'db' not in g:
+        if current_app.config['SQLITE_POOL_SIZE'] > 0:
+            g.db = get_pool().acquire()
+        else:
+            g.db = connect(current_app.config, factory=_factories(current_app)[1])
+    return g.db
+
+
+def close_db(exception=None):
+    conn = g.pop('db', None)
+    if conn is None:
+        return
+    if isinstance(conn, PooledConnection):
+        get_pool().release(conn)
+    else:
+        conn.close()
+
+
+def init_app(app):
+    for key, value in DEFAULT_CONFIG.items():
+        app.config.setdefault(key, value)
+    app.teardown_appcontext(close_db)
 
-def init_db():
-    conn = sqlite3.connect('college_portal.db')
-    c = conn.cursor()
-    
-    # Create tables (same as in app.py)
-    # This is a backup initialization script
-    
-    conn.commit()
-    conn.close()
 
 if __name__ == '__main__':
-    init_db()
+    import migrations
+
+    conn = connect(DEFAULT_CONFIG)
+    migrations.migrate(conn)
+    print('journal_mode =', conn.execute('PRAGMA journal_mode').fetchone()[0])
+    print('schema version =', migrations.current_version(conn))
+    conn.close()
     print("Database initialized successfully!")
\ No newline at end of file
@@ -0,0 +1,133 @@
+from datetime import date
+
+# Class enrollment and attendance sessions. A session is one meeting of a
+# class, keyed by (class_id, date, period); attendance rows carry the period
+# and are unique per session and student. The marking roster is the class's
+# enrollment read by primary key, so it stays the size of the class however
+# many students the college has.
+
+PERIODS = 8
+
+ROSTER_SQL = '''
+    SELECT u.id, u.rollno, u.name, u.section, u.department, u.class, a.status
+    FROM enrollments e
+    JOIN users u ON u.id = e.student_id
+    LEFT JOIN attendance a
+        ON a.class_id = e.class_id AND a.date = ? AND a.period = ? AND a.student_id = e.student_id
+    WHERE e.class_id = ?
+    ORDER BY u.rollno, u.id
+'''
+
+TRIGGERS = [
+    # Enrollments and sessions never outlive their student or class
+    '''CREATE TRIGGER IF NOT EXISTS enrollment_user_delete AFTER DELETE ON users BEGIN
+           DELETE FROM enrollments WHERE student_id = OLD.id;
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS enrollment_class_delete AFTER DELETE ON classes BEGIN
+           DELETE FROM enrollments WHERE class_id = OLD.id;
+           DELETE FROM attendance_sessions WHERE class_id = OLD.id;
+       END''',
+]
+
+
+def install(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS enrollments (
+            class_id INTEGER NOT NULL,
+            student_id INTEGER NOT NULL,
+            enrolled_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (class_id, student_id)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_enrollments_student ON enrollments (student_id)')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS attendance_sessions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            class_id INTEGER NOT NULL,
+            date DATE NOT NULL,
+            period INTEGER NOT NULL DEFAULT 1,
+            faculty_id INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (class_id, date, period),
+            FOREIGN KEY (class_id) REFERENCES classes (id),
+            FOREIGN KEY (faculty_id) REFERENCES users (id)
+        )
+    ''')
+
+    # Existing marks become period 1 of their day; adding a column with a
+    # constant default does not rewrite the table
+    columns = [column[1] for column in conn.execute('PRAGMA table_info(attendance)').fetchall()]
+    if 'period' not in columns:
+        conn.execute('ALTER TABLE attendance ADD COLUMN period INTEGER NOT NULL DEFAULT 1')
+    conn.execute('DROP INDEX IF EXISTS uq_attendance_student_class_date')
+    conn.execute('''CREATE UNIQUE INDEX IF NOT EXISTS uq_attendance_session_student
+                    ON attendance (class_id, date, period, student_id)''')
+    for trigger in TRIGGERS:
+        conn.execute(trigger)
+
+    # Whoever has been marked in a class is enrolled in it, and every day
+    # with marks is a session
+    conn.execute('''
+        INSERT OR IGNORE INTO enrollments (class_id, student_id)
+        SELECT DISTINCT class_id, student_id FROM attendance
+        WHERE class_id IS NOT NULL AND student_id IS NOT NULL
+    ''')
+    conn.execute('''
+        INSERT OR IGNORE INTO attendance_sessions (class_id, date, period, faculty_id)
+        SELECT class_id, date, period, MAX(marked_by) FROM attendance
+        WHERE class_id IS NOT NULL
+        GROUP BY class_id, date, period
+    ''')
+
+
+def parse_session(day=None, period=None):
+    # (date string, period) from request values, defaulting to today and
+    # period 1; raises ValueError when either is malformed
+    day = date.fromisoformat(day).isoformat() if day else date.today().isoformat()
+    period = int(period) if period not in (None, '') else 1
+    if not 1 <= period <= PERIODS:
+        raise ValueError(f'period must be between 1 and {PERIODS}')
+    return day, period
+
+
+def open_session(conn, class_id, day, period, faculty_id):
+    # Record that the session took place; returns its id. The caller commits.
+    conn.execute('''
+        INSERT INTO attendance_sessions (class_id, date, period, faculty_id) VALUES (?, ?, ?, ?)
+        ON CONFLICT (class_id, date, period) DO UPDATE SET faculty_id = excluded.faculty_id
+        WHERE attendance_sessions.faculty_id IS NOT excluded.faculty_id
+    ''', (class_id, day, period, faculty_id))
+    return conn.execute('SELECT id FROM attendance_sessions WHERE class_id = ? AND date = ? AND period = ?',
+                        (class_id, day, period)).fetchone()[0]
+
+
+def roster(conn, class_id, day, period):
+    # Enrolled students with their mark for the session (status is None
+    # until marked), in roll number order
+    return conn.execute(ROSTER_SQL, (day, period, class_id)).fetchall()
+
+
+def student_ids(conn, class_id):
+    return {row[0] for row in conn.execute('SELECT student_id FROM enrollments WHERE class_id = ?', (class_id,))}
+
+
+def enroll(conn, class_id, ids):
+    # Enroll existing students by id; returns how many were newly enrolled.
+    # rowcount, unlike total_changes, leaves out rows written by triggers
+    # (the timetable version bump on every enrollment).
+    return conn.executemany('''
+        INSERT OR IGNORE INTO enrollments (class_id, student_id)
+        SELECT ?, id FROM users WHERE id = ? AND role = 'student'
+    ''', ((class_id, int(student_id)) for student_id in ids)).rowcount
+
+
+def enroll_section(conn, class_id, department, section):
+    return conn.execute('''
+        INSERT OR IGNORE INTO enrollments (class_id, student_id)
+        SELECT ?, id FROM users WHERE role = 'student' AND department = ? AND section = ?
+    ''', (class_id, department, section)).rowcount
+
+
+def unenroll(conn, class_id, ids):
+    return conn.executemany('DELETE FROM enrollments WHERE class_id = ? AND student_id = ?',
+                            ((class_id, int(student_id)) for student_id in ids)).rowcount
@@ -0,0 +1,123 @@
+import csv
+import io
+import tempfile
+
+# Streaming exports of the user roster and the attendance register. Rows are
+# pulled from the cursor in fetchmany() batches and written out as they
+# arrive, so memory stays flat however many rows match.
+
+BATCH_SIZE = 2000
+FILE_CHUNK_SIZE = 64 * 1024
+FORMATS = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+USER_COLUMNS = ['id', 'username', 'name', 'email', 'rollno', 'section', 'department', 'class']
+ATTENDANCE_COLUMNS = ['date', 'rollno', 'name', 'department', 'section', 'class', 'status', 'marked_by']
+
+
+def users_query(role, department=None, section=None):
+    # Returns (sql, params) for the roster of one role
+    where = ['role = ?']
+    params = [role]
+    if department:
+        where.append('department = ?')
+        params.append(department)
+    if section:
+        where.append('section = ?')
+        params.append(section)
+    sql = f'''
+        SELECT {', '.join(USER_COLUMNS)} FROM users
+        WHERE {' AND '.join(where)}
+        ORDER BY IFNULL(rollno, ''), name, id
+    '''
+    return sql, params
+
+
+def attendance_query(date_from=None, date_to=None, department=None, section=None, class_id=None):
+    where = ['1 = 1']
+    params = []
+    if date_from:
+        where.append('a.date >= ?')
+        params.append(date_from)
+    if date_to:
+        where.append('a.date <= ?')
+        params.append(date_to)
+    if class_id is not None:
+        where.append('a.class_id = ?')
+        params.append(class_id)
+    if department:
+        where.append('u.department = ?')
+        params.append(department)
+    if section:
+        where.append('u.section = ?')
+        params.append(section)
+    sql = f'''
+        SELECT a.date, u.rollno, u.name, u.department, u.section, c.name AS class,
+               a.status, f.name AS marked_by
+        FROM attendance a
+        JOIN users u ON u.id = a.student_id
+        LEFT JOIN classes c ON c.id = a.class_id
+        LEFT JOIN users f ON f.id = a.marked_by
+        WHERE {' AND '.join(where)}
+        ORDER BY a.date, u.rollno
+    '''
+    return sql, params
+
+
+def iter_batches(conn, sql, params, batch_size=BATCH_SIZE):
+    cursor = conn.execute(sql, params)
+    try:
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        cursor.close()
+
+
+def stream_csv(conn, sql, params, columns, batch_size=BATCH_SIZE):
+    # Yields one encoded CSV chunk per batch
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in iter_batches(conn, sql, params, batch_size):
+        writer.writerows(tuple(row) for row in rows)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def stream_xlsx(conn, sql, params, columns, title='Export', batch_size=BATCH_SIZE):
+    # openpyxl's write-only workbook keeps rows in a temporary file rather
+    # than in memory; the finished file is then sent back in chunks. XLSX is
+    # a zip, so nothing can be sent before the last row is written.
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title)
+    sheet.append(columns)
+    for rows in iter_batches(conn, sql, params, batch_size):
+        for row in rows:
+            sheet.append(tuple(row))
+
+    with tempfile.TemporaryFile() as output:
+        workbook.save(output)
+        output.seek(0)
+        while True:
+            chunk = output.read(FILE_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+def stream(conn, fmt, sql, params, columns, title='Export'):
+    if fmt == 'csv':
+        return stream_csv(conn, sql, params, columns)
+    if fmt == 'xlsx':
+        return stream_xlsx(conn, sql, params, columns, title)
+    raise ValueError(f'Unsupported format: {fmt}')
@@ -0,0 +1,232 @@
+import csv
+import io
+import os
+import uuid
+
+import profiles
+
+# Streaming spreadsheet import for students and faculty. Rows are read one at
+# a time (read-only openpyxl or csv), checked against a set of usernames that
+# is fetched once, and inserted in executemany chunks. Passwords are the
+# second value of every insert tuple so a chunk can be hashed in one call
+# before it is written, while no transaction is open.
+
+CHUNK_SIZE = 1000
+
+
+class SheetFormatError(ValueError):
+    pass
+
+
+STUDENTS = {
+    'label': 'students',
+    'role': 'student',
+    'column_mapping': {
+        'name': ['Name', 'name', 'Student Name', 'student_name'],
+        'rollno': ['RollNo', 'rollno', 'Roll Number', 'roll_number', 'ID', 'Id'],
+        'email': ['Email Id', 'Email', 'email', 'Email ID'],
+        'section': ['Section', 'section'],
+        'department': ['Dept', 'Department', 'department', 'dept'],
+        'password': ['Password', 'password']
+    },
+    'required': ['name', 'rollno', 'email', 'section', 'department', 'password'],
+    'insert_sql': 'INSERT INTO users (username, password, role, name, email, rollno, section, department) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+}
+
+FACULTY = {
+    'label': 'faculty members',
+    'role': 'faculty',
+    'column_mapping': {
+        'name': ['Name', 'name', 'Faculty Name', 'faculty_name'],
+        'email': ['Email Id', 'Email', 'email', 'Email ID'],
+        'department': ['Dept', 'Department', 'department', 'dept'],
+        'password': ['Password', 'password']
+    },
+    'required': ['name', 'email', 'department', 'password'],
+    'insert_sql': 'INSERT INTO users (username, password, role, name, email, department) VALUES (?, ?, ?, ?, ?, ?)',
+}
+
+
+def _cell_text(value):
+    if value is None:
+        return ''
+    if isinstance(value, float):
+        if value != value:  # NaN from the pandas fallback
+            return ''
+        if value.is_integer():
+            value = int(value)
+    return str(value).strip()
+
+
+def iter_rows(file, filename):
+    # Yield the header row and then every data row as a tuple of cell texts
+    extension = filename.rsplit('.', 1)[1].lower()
+    if extension == 'csv':
+        stream = file.stream if hasattr(file, 'stream') else file
+        text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+        for row in csv.reader(text):
+            yield tuple(cell.strip() for cell in row)
+    elif extension == 'xlsx':
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(file, read_only=True, data_only=True)
+        try:
+            for row in workbook.active.iter_rows(values_only=True):
+                yield tuple(_cell_text(value) for value in row)
+        finally:
+            workbook.close()
+    else:
+        # Legacy .xls has no streaming reader; fall back to pandas
+        import pandas as pd
+
+        df = pd.read_excel(file, dtype=object)
+        yield tuple(str(column).strip() for column in df.columns)
+        for values in df.itertuples(index=False, name=None):
+            yield tuple(_cell_text(value) for value in values)
+
+
+def count_rows(path):
+    # Cheap data-row estimate used for progress/ETA; None when unknown
+    extension = path.rsplit('.', 1)[1].lower()
+    if extension == 'csv':
+        with open(path, 'rb') as file:
+            return max(sum(1 for _ in file) - 1, 0)
+    if extension == 'xlsx':
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(path, read_only=True)
+        try:
+            max_row = workbook.active.max_row
+        finally:
+            workbook.close()
+        return max(max_row - 1, 0) if max_row else None
+    return None
+
+
+def resolve_columns(header, spec):
+    # Map each standard column to its position in the sheet, once per file
+    positions = {name: index for index, name in enumerate(header)}
+    actual_columns = {}
+    for standard_col, possible_names in spec['column_mapping'].items():
+        for possible_name in possible_names:
+            if possible_name in positions:
+                actual_columns[standard_col] = positions[possible_name]
+                break
+
+    missing_columns = [col for col in spec['required'] if col not in actual_columns]
+    if missing_columns:
+        raise SheetFormatError(f'Missing required columns: {", ".join(missing_columns)}')
+    return actual_columns
+
+
+def _build_student(values, index):
+    username = values['rollno']
+    return username, (username, values['password'], 'student', values['name'],
+                      values['email'], values['rollno'], values['section'], values['department'])
+
+
+def _build_faculty(values, index):
+    username = values['name'].lower().replace(' ', '.') + str(index)
+    return username, (username, values['password'], 'faculty', values['name'],
+                      values['email'], values['department'])
+
+
+STUDENTS['build'] = _build_student
+FACULTY['build'] = _build_faculty
+
+
+def import_users(conn, rows, spec, chunk_size=CHUNK_SIZE, progress=None, hash_passwords=None,
+                 checkpoint=None, resume=None):
+    # rows is the iterator from iter_rows(). Returns a result dict with
+    # success_count, error_count and errors as (row, username, message).
+    # hash_passwords, if given, maps a list of passwords to their hashes.
+    # checkpoint(processed, result), if given, is called after each chunk is
+    # written and should commit it, so the write lock is only held for the
+    # inserts and never while the next chunk is hashed. resume is the
+    # rows_processed/success_count/error_count of an earlier checkpoint;
+    # rows up to it are skipped (their errors are not reported again).
+    # Without checkpoint the caller owns the transaction and commits.
+    rows = iter(rows)
+    header = next(rows, None)
+    if header is None:
+        raise SheetFormatError('The uploaded file is empty')
+    actual_columns = resolve_columns(header, spec)
+
+    # Usernames are unique case-insensitively (migration 12)
+    existing = {profiles.normalize_username(row[0]) for row in conn.execute('SELECT username FROM users')}
+    build = spec['build']
+    resume = resume or {}
+    skip = resume.get('rows_processed', 0)
+    result = {'success_count': resume.get('success_count', 0), 'error_count': resume.get('error_count', 0),
+              'errors': []}
+    batch = []
+    processed = 0
+
+    def flush():
+        if hash_passwords:
+            hashed = hash_passwords([params[1] for params in batch])
+            batch[:] = [(params[0], password) + params[2:] for params, password in zip(batch, hashed)]
+        conn.executemany(spec['insert_sql'], batch)
+        result['success_count'] += len(batch)
+        batch.clear()
+        if checkpoint:
+            checkpoint(processed, result)
+
+    for index, row in enumerate(rows):
+        row_number = index + 2
+        processed += 1
+        if processed <= skip or not any(row):
+            continue
+        values = {col: row[pos] if pos < len(row) else '' for col, pos in actual_columns.items()}
+        username = None
+        try:
+            username, params = build(values, index)
+            # Rows with a blank required cell are reported, not imported
+            # (the pandas import stored them with the text 'nan')
+            empty = [col for col in spec['required'] if not values[col]]
+            if empty:
+                raise ValueError(f'Empty value for {", ".join(empty)}; fill in every required column '
+                                 'and upload the row again')
+            if profiles.normalize_username(username) in existing:
+                raise ValueError(f'Username {username} already exists')
+        except ValueError as e:
+            result['error_count'] += 1
+            result['errors'].append((row_number, username or '', str(e)))
+            continue
+
+        existing.add(profiles.normalize_username(username))
+        batch.append(params)
+        if len(batch) >= chunk_size:
+            flush()
+            if progress:
+                progress(processed, result['error_count'])
+
+    if batch:
+        flush()
+    if progress:
+        progress(processed, result['error_count'])
+    result['rows_processed'] = processed
+    return result
+
+
+def write_error_report(errors, folder):
+    # Save per-row errors as CSV and return the file name for download
+    if not errors:
+        return None
+    os.makedirs(folder, exist_ok=True)
+    name = f'import-errors-{uuid.uuid4().hex}.csv'
+    with open(os.path.join(folder, name), 'w', newline='', encoding='utf-8') as report:
+        writer = csv.writer(report)
+        writer.writerow(['Row', 'Username', 'Error'])
+        writer.writerows(errors)
+    return name
+
+
+def summary_message(result, spec):
+    message = f'Successfully added {result["success_count"]} {spec["label"]}.'
+    if result['error_count'] > 0:
+        message += f' {result["error_count"]} failed.'
+        message += ' Errors: ' + '; '.join(
+            f'Row {row}: {error}' for row, _, error in result['errors'][:5]
+        )
+    return message
@@ -0,0 +1,317 @@
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+
+from flask import current_app, g, has_app_context, has_request_context, request, request_finished, request_started
+from flask import before_render_template, template_rendered
+
+import database
+
+# Opt-in request profiling. When INSTRUMENTATION_ENABLED is set, connections
+# from database.get_db() record every statement (count, time, normalized
+# SQL), template rendering is timed separately, and each response carries a
+# Server-Timing header splitting db / template / total time. Per-route
+# latency histograms and per-statement totals are exposed in Prometheus text
+# format by /metrics (admin only). Statements slower than SLOW_QUERY_MS are logged to
+# 'portal.slow_queries' with their EXPLAIN QUERY PLAN. When disabled nothing
+# is registered and connections are plain sqlite3 connections.
+
+DEFAULT_CONFIG = {
+    'INSTRUMENTATION_ENABLED': False,
+    'SLOW_QUERY_MS': 100,
+    'SLOW_QUERY_KEEP': 50,                 # recent slow queries kept for /api/slow_queries
+    'INSTRUMENTATION_MAX_STATEMENTS': 200,  # distinct normalized statements tracked
+    'METRICS_BUCKETS': (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+}
+
+OTHER_STATEMENT = '<other>'
+
+logger = logging.getLogger('portal.slow_queries')
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_SPACE = re.compile(r'\s+')
+_normalized = {}
+
+
+def normalize_sql(sql):
+    # Collapse whitespace, replace literals with ? and IN lists with (...),
+    # so statements differing only in values share one metric
+    result = _normalized.get(sql)
+    if result is None:
+        result = _SPACE.sub(' ', sql).strip()
+        result = _LITERALS.sub('?', result)
+        result = _IN_LIST.sub('(...)', result)
+        if len(_normalized) < 10_000:
+            _normalized[sql] = result
+    return result
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.series = {}  # labels -> [bucket counts..., sum, count]
+
+    def observe(self, labels, value):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [0] * len(self.buckets) + [0.0, 0]
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[index] += 1
+        series[-2] += value
+        series[-1] += 1
+
+
+def _label_text(names, values):
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return ','.join(f'{name}="{escape(value)}"' for name, value in zip(names, values))
+
+
+class Metrics:
+    def __init__(self, config):
+        self.slow_seconds = config['SLOW_QUERY_MS'] / 1000.0
+        self.max_statements = config['INSTRUMENTATION_MAX_STATEMENTS']
+        self.requests = Histogram(config['METRICS_BUCKETS'])   # (route, method, status)
+        self.templates = Histogram(config['METRICS_BUCKETS'])  # (template,)
+        self.route_db = {}      # (route,) -> [queries, seconds]
+        self.statements = {}    # normalized sql -> [count, seconds, max seconds]
+        self.slow_queries = deque(maxlen=config['SLOW_QUERY_KEEP'])
+        self._lock = threading.Lock()
+
+    def record_statement(self, sql, elapsed, executed):
+        key = normalize_sql(sql)
+        with self._lock:
+            stats = self.statements.get(key)
+            if stats is None:
+                if len(self.statements) >= self.max_statements:
+                    key = OTHER_STATEMENT
+                stats = self.statements.setdefault(key, [0, 0.0, 0.0])
+            stats[0] += executed
+            stats[1] += elapsed
+            stats[2] = max(stats[2], elapsed)
+
+    def record_slow(self, entry):
+        with self._lock:
+            self.slow_queries.append(entry)
+
+    def record_template(self, name, elapsed):
+        with self._lock:
+            self.templates.observe((name,), elapsed)
+
+    def record_request(self, route, method, status, elapsed, queries, db_seconds):
+        with self._lock:
+            self.requests.observe((route, method, status), elapsed)
+            totals = self.route_db.setdefault((route,), [0, 0.0])
+            totals[0] += queries
+            totals[1] += db_seconds
+
+    def render(self):
+        # Prometheus text exposition format
+        lines = []
+
+        def histogram(name, help_text, hist, label_names):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} histogram')
+            for labels, series in sorted(hist.series.items()):
+                base = _label_text(label_names, labels)
+                for bound, count in zip(hist.buckets, series):
+                    lines.append(f'{name}_bucket{{{base},le="{bound}"}} {count}')
+                lines.append(f'{name}_bucket{{{base},le="+Inf"}} {series[-1]}')
+                lines.append(f'{name}_sum{{{base}}} {series[-2]:.6f}')
+                lines.append(f'{name}_count{{{base}}} {series[-1]}')
+
+        def counter(name, help_text, label_names, items):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} counter')
+            for labels, value in items:
+                lines.append(f'{name}{{{_label_text(label_names, labels)}}} {value}')
+
+        with self._lock:
+            histogram('portal_request_duration_seconds', 'Request latency by route.',
+                      self.requests, ('route', 'method', 'status'))
+            histogram('portal_template_render_seconds', 'Template render time.',
+                      self.templates, ('template',))
+            routes = sorted(self.route_db.items())
+            counter('portal_request_db_queries_total', 'SQL statements executed by route.', ('route',),
+                    [(labels, totals[0]) for labels, totals in routes])
+            counter('portal_request_db_seconds_total', 'Time spent in SQL by route.', ('route',),
+                    [(labels, f'{totals[1]:.6f}') for labels, totals in routes])
+            statements = sorted(self.statements.items())
+            counter('portal_sql_statements_total', 'Executions per normalized statement.', ('statement',),
+                    [((sql,), stats[0]) for sql, stats in statements])
+            counter('portal_sql_seconds_total', 'Time per normalized statement.', ('statement',),
+                    [((sql,), f'{stats[1]:.6f}') for sql, stats in statements])
+        return '\n'.join(lines) + '\n'
+
+
+def _metrics():
+    if has_app_context():
+        return current_app.extensions.get('metrics')
+    return None
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    # Times execute and every fetch; time spent iterating a result set is
+    # charged to the statement that produced it
+    _sql = None
+    _params = ()
+    _elapsed = 0.0
+    _logged = False
+
+    def _record(self, elapsed, executed):
+        metrics = _metrics()
+        if metrics is None or self._sql is None:
+            return
+        self._elapsed += elapsed
+        metrics.record_statement(self._sql, elapsed, executed)
+        if 'instrumentation' in g:
+            g.instrumentation['queries'] += executed
+            g.instrumentation['db_seconds'] += elapsed
+        if self._elapsed >= metrics.slow_seconds and not self._logged:
+            self._logged = True
+            _log_slow(metrics, self.connection, self._sql, self._params, self._elapsed)
+
+    def _timed(self, method, executed, *args):
+        started = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            self._record(time.perf_counter() - started, executed)
+
+    def execute(self, sql, parameters=()):
+        self._sql, self._params, self._elapsed, self._logged = sql, parameters, 0.0, False
+        return self._timed(super().execute, 1, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        self._sql, self._params, self._elapsed, self._logged = sql, None, 0.0, False
+        return self._timed(super().executemany, 1, sql, seq_of_parameters)
+
+    def executescript(self, script):
+        self._sql, self._params, self._elapsed, self._logged = script, None, 0.0, False
+        return self._timed(super().executescript, 1, script)
+
+    def fetchone(self):
+        return self._timed(super().fetchone, 0)
+
+    def fetchmany(self, size=None):
+        return self._timed(super().fetchmany, 0, size if size is not None else self.arraysize)
+
+    def fetchall(self):
+        return self._timed(super().fetchall, 0)
+
+    def __next__(self):
+        return self._timed(super().__next__, 0)
+
+
+def _log_slow(metrics, conn, sql, params, elapsed):
+    plan = None
+    if params is not None:
+        try:
+            # Plain sqlite3 execute so the EXPLAIN itself is not instrumented
+            rows = sqlite3.Connection.execute(conn, 'EXPLAIN QUERY PLAN ' + sql, params).fetchall()
+            plan = [row[-1] for row in rows] or None
+        except sqlite3.Error:
+            plan = None
+    entry = {
+        'sql': normalize_sql(sql),
+        'ms': round(elapsed * 1000, 3),
+        'route': request.path if has_request_context() else None,
+        'plan': plan,
+    }
+    metrics.record_slow(entry)
+    logger.warning('slow query %.1f ms on %s: %s\n  plan: %s', entry['ms'], entry['route'], entry['sql'],
+                   '; '.join(plan) if plan else 'n/a')
+
+
+class _InstrumentedMixin:
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, script):
+        return self.cursor().executescript(script)
+
+
+class InstrumentedConnection(_InstrumentedMixin, sqlite3.Connection):
+    pass
+
+
+class InstrumentedPooledConnection(_InstrumentedMixin, database.PooledConnection):
+    pass
+
+
+def _request_started(app, **extra):
+    if 'metrics' not in app.extensions:
+        return
+    g.instrumentation = {'started': time.perf_counter(), 'queries': 0, 'db_seconds': 0.0,
+                         'template_seconds': 0.0, 'templates': []}
+
+
+def _before_render(app, template, context, **extra):
+    if 'instrumentation' in g:
+        g.instrumentation['templates'].append(time.perf_counter())
+
+
+def _rendered(app, template, context, **extra):
+    state = g.get('instrumentation')
+    if not state or not state['templates'] or 'metrics' not in app.extensions:
+        return
+    elapsed = time.perf_counter() - state['templates'].pop()
+    if not state['templates']:
+        # Only the outermost render counts towards the request total
+        state['template_seconds'] += elapsed
+    app.extensions['metrics'].record_template(template.name or '<string>', elapsed)
+
+
+def _request_finished(app, response, **extra):
+    state = g.pop('instrumentation', None)
+    if state is None or 'metrics' not in app.extensions:
+        return
+    elapsed = time.perf_counter() - state['started']
+    route = request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+    app.extensions['metrics'].record_request(route, request.method, response.status_code, elapsed,
+                                             state['queries'], state['db_seconds'])
+    response.headers['Server-Timing'] = ', '.join([
+        f'db;dur={state["db_seconds"] * 1000:.2f};desc="{state["queries"]} queries"',
+        f'tpl;dur={state["template_seconds"] * 1000:.2f}',
+        f'total;dur={elapsed * 1000:.2f}',
+    ])
+
+
+def get_metrics(app=None):
+    app = app or current_app._get_current_object()
+    return app.extensions.get('metrics')
+
+
+def enable(app):
+    # Safe to call after the app has served requests: everything hooks in
+    # through signals and the connection factories used by new connections
+    if 'metrics' in app.extensions:
+        return app.extensions['metrics']
+    metrics = app.extensions['metrics'] = Metrics(app.config)
+    app.extensions['db_factories'] = (InstrumentedPooledConnection, InstrumentedConnection)
+    pool = app.extensions.pop('db_pool', None)
+    if pool is not None:
+        pool.close_all()
+    request_started.connect(_request_started, app)
+    request_finished.connect(_request_finished, app)
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_rendered, app)
+    return metrics
+
+
+def init_app(app):
+    for key, value in DEFAULT_CONFIG.items():
+        app.config.setdefault(key, value)
+    if app.config['INSTRUMENTATION_ENABLED']:
+        enable(app)
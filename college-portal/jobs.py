@@ -0,0 +1,251 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import database
+import importer
+import passwords
+import search
+
+# Background import jobs. Uploaded files are saved to disk, recorded in the
+# jobs table and processed on a small thread pool so request workers return
+# immediately. Live progress is kept in memory; durable state is in SQLite.
+
+DEFAULT_CONFIG = {
+    'JOBS_MAX_WORKERS': 2,    # imports processed at the same time
+    'JOBS_MAX_PENDING': 10,   # queued + running jobs before uploads are refused
+}
+
+SPECS = {
+    'students': importer.STUDENTS,
+    'faculty': importer.FACULTY,
+}
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class JobRunner:
+    def __init__(self, app):
+        self.app = app
+        self.config = app.config
+        self.folder = os.path.join(app.config['UPLOAD_FOLDER'], 'jobs')
+        self._executor = ThreadPoolExecutor(max_workers=app.config['JOBS_MAX_WORKERS'],
+                                            thread_name_prefix='import-job')
+        self._slots = threading.BoundedSemaphore(app.config['JOBS_MAX_PENDING'])
+        self._progress = {}
+        self._lock = threading.Lock()
+        self._recovered = False
+
+    def _connect(self):
+        return database.connect(self.config)
+
+    def submit(self, kind, file, user_id):
+        if kind not in SPECS:
+            raise ValueError(f'Unknown job kind: {kind}')
+        self.recover()
+        if not self._slots.acquire(blocking=False):
+            raise QueueFullError('Too many imports are running, please try again shortly')
+
+        try:
+            job_id = uuid.uuid4().hex
+            extension = file.filename.rsplit('.', 1)[1].lower()
+            os.makedirs(self.folder, exist_ok=True)
+            path = os.path.join(self.folder, f'{job_id}.{extension}')
+            file.save(path)
+
+            conn = self._connect()
+            try:
+                conn.execute(
+                    'INSERT INTO jobs (id, kind, status, path, filename, created_by, worker_pid) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (job_id, kind, 'queued', path, file.filename, user_id, os.getpid())
+                )
+                conn.commit()
+            finally:
+                conn.close()
+        except Exception:
+            self._slots.release()
+            raise
+
+        self._executor.submit(self._run, job_id)
+        return job_id
+
+    def recover(self):
+        # Re-queue jobs left behind by a worker that died. Imports commit each
+        # chunk together with the job's counts, so an interrupted job picks up
+        # after its last committed chunk.
+        with self._lock:
+            if self._recovered:
+                return
+            self._recovered = True
+
+        conn = self._connect()
+        try:
+            orphans = []
+            for row in conn.execute("SELECT id, worker_pid FROM jobs WHERE status IN ('queued', 'running')"):
+                if not _pid_alive(row['worker_pid']):
+                    orphans.append((row['id'], row['worker_pid']))
+            for job_id, dead_pid in orphans:
+                updated = conn.execute(
+                    "UPDATE jobs SET status = 'queued', worker_pid = ? WHERE id = ? AND worker_pid IS ?",
+                    (os.getpid(), job_id, dead_pid)
+                ).rowcount
+                conn.commit()
+                if updated and self._slots.acquire(blocking=False):
+                    self._executor.submit(self._run, job_id)
+        finally:
+            conn.close()
+
+    def _run(self, job_id):
+        try:
+            self._process(job_id)
+        finally:
+            with self._lock:
+                self._progress.pop(job_id, None)
+            self._slots.release()
+
+    def _process(self, job_id):
+        conn = self._connect()
+        try:
+            claimed = conn.execute(
+                "UPDATE jobs SET status = 'running', worker_pid = ?, started_at = CURRENT_TIMESTAMP "
+                "WHERE id = ? AND status = 'queued'",
+                (os.getpid(), job_id)
+            ).rowcount
+            conn.commit()
+            if not claimed:
+                return
+            job = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+            spec = SPECS[job['kind']]
+
+            total = importer.count_rows(job['path'])
+            started = time.monotonic()
+            resume = {key: job[key] for key in ('rows_processed', 'success_count', 'error_count')}
+            self._update_progress(job_id, rows_processed=resume['rows_processed'], error_count=resume['error_count'],
+                                  total_rows=total, started=started, resumed_at=resume['rows_processed'])
+
+            def progress(processed, errors):
+                self._update_progress(job_id, rows_processed=processed, error_count=errors)
+
+            def checkpoint(processed, result):
+                # Each chunk commits on its own, with the counts to resume from
+                conn.execute('UPDATE jobs SET rows_processed = ?, success_count = ?, error_count = ? WHERE id = ?',
+                             (processed, result['success_count'], result['error_count'], job_id))
+                conn.commit()
+
+            try:
+                with open(job['path'], 'rb') as file:
+                    result = importer.import_users(conn, importer.iter_rows(file, job['path']),
+                                                   spec, progress=progress,
+                                                   hash_passwords=passwords.get_hasher(self.app).hash_many,
+                                                   checkpoint=checkpoint, resume=resume)
+                report = importer.write_error_report(result['errors'],
+                                                     self.config['IMPORT_REPORT_FOLDER'])
+                conn.execute(
+                    "UPDATE jobs SET status = 'done', rows_processed = ?, total_rows = ?, "
+                    "success_count = ?, error_count = ?, message = ?, report = ?, "
+                    "finished_at = CURRENT_TIMESTAMP WHERE id = ?",
+                    (result['rows_processed'], result['rows_processed'], result['success_count'],
+                     result['error_count'], importer.summary_message(result, spec), report, job_id)
+                )
+                conn.commit()
+                if result['success_count']:
+                    # Merge the many small FTS segments the per-row triggers wrote
+                    search.optimize(conn, ['users_fts'])
+                    conn.commit()
+            except Exception as e:
+                conn.rollback()
+                message = str(e) if isinstance(e, importer.SheetFormatError) else f'Error processing file: {str(e)}'
+                added = conn.execute('SELECT success_count FROM jobs WHERE id = ?', (job_id,)).fetchone()[0]
+                if added:
+                    message += f' ({added} {spec["label"]} were added before the error)'
+                conn.execute(
+                    "UPDATE jobs SET status = 'failed', message = ?, finished_at = CURRENT_TIMESTAMP WHERE id = ?",
+                    (message, job_id)
+                )
+                conn.commit()
+            finally:
+                if os.path.exists(job['path']):
+                    os.remove(job['path'])
+        finally:
+            conn.close()
+
+    def _update_progress(self, job_id, **values):
+        with self._lock:
+            self._progress.setdefault(job_id, {}).update(values)
+
+    def status(self, job_id):
+        conn = self._connect()
+        try:
+            job = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        finally:
+            conn.close()
+        if job is None:
+            return None
+
+        info = {
+            'id': job['id'],
+            'kind': job['kind'],
+            'filename': job['filename'],
+            'status': job['status'],
+            'rows_processed': job['rows_processed'],
+            'total_rows': job['total_rows'],
+            'success_count': job['success_count'],
+            'error_count': job['error_count'],
+            'message': job['message'],
+            'report': job['report'],
+            'created_at': job['created_at'],
+            'started_at': job['started_at'],
+            'finished_at': job['finished_at'],
+            'eta_seconds': None,
+        }
+        with self._lock:
+            live = dict(self._progress.get(job_id, {}))
+        if live and job['status'] == 'running':
+            info['rows_processed'] = live['rows_processed']
+            info['error_count'] = live['error_count']
+            info['total_rows'] = live['total_rows']
+            elapsed = time.monotonic() - live['started']
+            processed = live['rows_processed']
+            # The rate counts only rows read since this run started
+            done = processed - live['resumed_at']
+            if live['total_rows'] and done > 0:
+                remaining = max(live['total_rows'] - processed, 0)
+                info['eta_seconds'] = round(elapsed / done * remaining, 1)
+        return info
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+
+def _pid_alive(pid):
+    if not pid:
+        return False
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except PermissionError:
+        # Exists, but belongs to another user
+        return True
+    except OSError:
+        return False
+    return True
+
+
+def get_runner(app=None):
+    from flask import current_app
+
+    app = app or current_app._get_current_object()
+    runner = app.extensions.get('job_runner')
+    if runner is None:
+        runner = app.extensions['job_runner'] = JobRunner(app)
+    return runner
+
+
+def init_app(app):
+    for key, value in DEFAULT_CONFIG.items():
+        app.config.setdefault(key, value)
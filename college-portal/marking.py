@@ -0,0 +1,54 @@
+# Attendance marking helpers shared by the API routes and the benchmarks
+
+VALID_STATUSES = ('present', 'absent')
+
+UPSERT_SQL = '''
+    INSERT INTO attendance (student_id, class_id, date, status, marked_by, period)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (class_id, date, period, student_id) DO UPDATE SET
+        status = excluded.status,
+        marked_by = excluded.marked_by
+    WHERE attendance.status != excluded.status
+       OR attendance.marked_by IS NOT excluded.marked_by
+'''
+
+
+def mark_bulk(conn, class_id, day, marks, marked_by, period=1, enrolled=None, changed=None):
+    # Write one session's attendance in a single executemany upsert. Only
+    # new or changed rows are sent to SQLite; students outside enrolled (a
+    # set of ids, when given) are skipped, and the (student_id, status) of
+    # each new or changed mark is appended to changed (a list, when given).
+    # The caller commits.
+    # Returns {'inserted': n, 'updated': n, 'unchanged': n, 'skipped': n}.
+    existing = {
+        row[0]: (row[1], row[2]) for row in conn.execute(
+            'SELECT student_id, status, marked_by FROM attendance WHERE class_id = ? AND date = ? AND period = ?',
+            (class_id, day, period)
+        )
+    }
+
+    counts = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'skipped': 0}
+    rows = []
+    for student_id, status in marks.items():
+        if status not in VALID_STATUSES:
+            counts['skipped'] += 1
+            continue
+        student_id = int(student_id)
+        if enrolled is not None and student_id not in enrolled:
+            counts['skipped'] += 1
+            continue
+        previous = existing.get(student_id)
+        if previous is None:
+            counts['inserted'] += 1
+        elif previous != (status, marked_by):
+            counts['updated'] += 1
+        else:
+            counts['unchanged'] += 1
+            continue
+        rows.append((student_id, class_id, day, status, marked_by, period))
+        if changed is not None:
+            changed.append((student_id, status))
+
+    if rows:
+        conn.executemany(UPSERT_SQL, rows)
+    return counts
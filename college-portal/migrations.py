@@ -0,0 +1,306 @@
+import sqlite3
+
+import catalog
+import enrollment
+import notifications
+import proofs
+import rollups
+import registrations
+import routing
+import search
+import stats
+import timetable
+
+# Numbered schema migrations tracked with PRAGMA user_version.
+# Append new migrations to the end of MIGRATIONS - never edit one that shipped.
+
+
+def _baseline_schema(c):
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL,
+            role TEXT NOT NULL,
+            name TEXT NOT NULL,
+            email TEXT,
+            rollno TEXT,
+            section TEXT,
+            department TEXT,
+            class TEXT
+        )
+    ''')
+
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS permissions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            student_id INTEGER,
+            faculty_id INTEGER,
+            date DATE NOT NULL,
+            reason TEXT NOT NULL,
+            proof TEXT,
+            status TEXT DEFAULT 'pending',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (student_id) REFERENCES users (id),
+            FOREIGN KEY (faculty_id) REFERENCES users (id)
+        )
+    ''')
+
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS attendance (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            student_id INTEGER,
+            class_id INTEGER,
+            date DATE NOT NULL,
+            status TEXT NOT NULL,
+            marked_by INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (student_id) REFERENCES users (id),
+            FOREIGN KEY (marked_by) REFERENCES users (id)
+        )
+    ''')
+
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS classes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            faculty_id INTEGER,
+            schedule TEXT,
+            room TEXT,
+            FOREIGN KEY (faculty_id) REFERENCES users (id)
+        )
+    ''')
+
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            date DATE NOT NULL,
+            time TEXT,
+            venue TEXT,
+            description TEXT
+        )
+    ''')
+
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS student_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            student_id INTEGER,
+            event_id INTEGER,
+            FOREIGN KEY (student_id) REFERENCES users (id),
+            FOREIGN KEY (event_id) REFERENCES events (id)
+        )
+    ''')
+
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS clubs_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            type TEXT NOT NULL,
+            is_active BOOLEAN DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Databases created before these columns existed get them added once
+    columns = [column[1] for column in c.execute("PRAGMA table_info(users)").fetchall()]
+    for column in ('rollno', 'section', 'department', 'class'):
+        if column not in columns:
+            c.execute(f"ALTER TABLE users ADD COLUMN {column} TEXT")
+
+
+def _query_indexes(c):
+    # student_dashboard(): attendance history and percentage by student
+    c.execute('''CREATE INDEX IF NOT EXISTS idx_attendance_student_date
+                 ON attendance (student_id, date, status, class_id, marked_by)''')
+    # faculty_dashboard() / mark_attendance(): today's marks by this faculty
+    c.execute('''CREATE INDEX IF NOT EXISTS idx_attendance_date_marked_by
+                 ON attendance (date, marked_by, student_id, status)''')
+    # Pending permission counts and queues per faculty and per student
+    c.execute('''CREATE INDEX IF NOT EXISTS idx_permissions_faculty_status
+                 ON permissions (faculty_id, status)''')
+    c.execute('''CREATE INDEX IF NOT EXISTS idx_permissions_student_status
+                 ON permissions (student_id, status)''')
+    # Student roster ordered by roll number
+    c.execute('''CREATE INDEX IF NOT EXISTS idx_users_role_rollno
+                 ON users (role, rollno, name, section, department, class)''')
+    c.execute('''CREATE INDEX IF NOT EXISTS idx_student_events_student
+                 ON student_events (student_id)''')
+    c.execute('''CREATE INDEX IF NOT EXISTS idx_classes_faculty
+                 ON classes (faculty_id)''')
+
+
+def _attendance_natural_key(c):
+    # Keep the most recent mark where the old delete/reinsert left duplicates
+    c.execute('''
+        DELETE FROM attendance WHERE id NOT IN (
+            SELECT MAX(id) FROM attendance GROUP BY student_id, class_id, date
+        )
+    ''')
+    c.execute('''CREATE UNIQUE INDEX IF NOT EXISTS uq_attendance_student_class_date
+                 ON attendance (student_id, class_id, date)''')
+
+
+def _jobs_table(c):
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            path TEXT NOT NULL,
+            filename TEXT,
+            created_by INTEGER,
+            worker_pid INTEGER,
+            rows_processed INTEGER NOT NULL DEFAULT 0,
+            total_rows INTEGER,
+            success_count INTEGER NOT NULL DEFAULT 0,
+            error_count INTEGER NOT NULL DEFAULT 0,
+            message TEXT,
+            report TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            started_at TIMESTAMP,
+            finished_at TIMESTAMP,
+            FOREIGN KEY (created_by) REFERENCES users (id)
+        )
+    ''')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status)')
+
+
+def _stats_counters(c):
+    # Trigger-maintained dashboard counters, backfilled from the current rows
+    stats.install(c)
+
+
+def _user_listing_indexes(c):
+    # Keyset pagination for /api/users: sort key per role, optionally filtered
+    c.execute('''CREATE INDEX IF NOT EXISTS idx_users_role_rollkey
+                 ON users (role, IFNULL(rollno, ''))''')
+    c.execute('''CREATE INDEX IF NOT EXISTS idx_users_role_name
+                 ON users (role, name)''')
+    c.execute('''CREATE INDEX IF NOT EXISTS idx_users_role_dept_section_rollkey
+                 ON users (role, department, section, IFNULL(rollno, ''))''')
+
+
+def _search_index(c):
+    # FTS5 tables for /api/search, populated from the existing rows
+    search.install(c)
+
+
+def _attendance_rollups(c):
+    # Trigger-maintained present/total counters per student, class and month
+    rollups.install(c)
+
+
+def _catalog_versions(c):
+    # Version counter bumped by triggers whenever clubs_events changes
+    catalog.install(c)
+
+
+def _permission_routing(c):
+    # Student department/section -> responsible faculty, and the faculty
+    # queue listing all of a faculty's requests in id order
+    routing.install(c)
+    c.execute('CREATE INDEX IF NOT EXISTS idx_permissions_faculty ON permissions (faculty_id)')
+
+
+def _proof_files(c):
+    # Content-addressed proof attachments referenced from permissions
+    proofs.install(c)
+
+
+def _username_nocase_index(c):
+    # Case-insensitive login lookups. Unique unless existing usernames already
+    # differ only by case; those must be renamed before it can be made unique.
+    duplicates = c.execute('''SELECT 1 FROM users GROUP BY username COLLATE NOCASE
+                              HAVING COUNT(*) > 1 LIMIT 1''').fetchone()
+    unique = '' if duplicates else 'UNIQUE '
+    c.execute(f'CREATE {unique}INDEX IF NOT EXISTS idx_users_username_nocase ON users (username COLLATE NOCASE)')
+
+
+def _attendance_sessions(c):
+    # Class enrollment and (class_id, date, period) sessions; the attendance
+    # key gains the period. Backfilled from the marks already recorded.
+    enrollment.install(c)
+
+
+def _timetable_version(c):
+    # Version counter that invalidates the compiled timetable
+    timetable.install(c)
+
+
+def _event_registrations(c):
+    # Event capacity, seat and waitlist counters on the event row, one
+    # registration per student and event, and the waitlist table
+    registrations.install(c)
+
+
+def _notification_outbox(c):
+    # Outbox of per-user notifications behind the SSE streams
+    notifications.install(c)
+
+
+MIGRATIONS = [
+    (1, 'baseline schema', _baseline_schema),
+    (2, 'indexes for dashboard query shapes', _query_indexes),
+    (3, 'unique attendance key (student_id, class_id, date)', _attendance_natural_key),
+    (4, 'background jobs table', _jobs_table),
+    (5, 'dashboard counters in the stats table', _stats_counters),
+    (6, 'indexes for paginated user listing', _user_listing_indexes),
+    (7, 'full-text search index', _search_index),
+    (8, 'attendance percentage rollups', _attendance_rollups),
+    (9, 'clubs/events catalog version', _catalog_versions),
+    (10, 'permission routing table', _permission_routing),
+    (11, 'proof file attachments', _proof_files),
+    (12, 'case-insensitive username index', _username_nocase_index),
+    (13, 'class enrollment and attendance sessions', _attendance_sessions),
+    (14, 'timetable version', _timetable_version),
+    (15, 'event registration capacity and waitlist', _event_registrations),
+    (16, 'notification outbox', _notification_outbox),
+]
+
+
+def current_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def latest_version():
+    return MIGRATIONS[-1][0]
+
+
+def migrate(conn, target=None):
+    # Apply every pending migration in its own transaction; returns the
+    # list of versions that were applied.
+    target = latest_version() if target is None else target
+    applied = []
+    for version, description, apply in MIGRATIONS:
+        if version > target:
+            break
+        if version <= current_version(conn):
+            continue
+        if conn.in_transaction:
+            conn.commit()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # Another process may have migrated while we waited for the lock
+            if version <= current_version(conn):
+                conn.rollback()
+                continue
+            apply(conn)
+            conn.execute(f'PRAGMA user_version = {int(version)}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(version)
+    return applied
+
+
+if __name__ == '__main__':
+    import os
+    import sys
+
+    path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(os.path.abspath(__file__)), 'college_portal.db')
+    conn = sqlite3.connect(path)
+    applied = migrate(conn)
+    print(f"Applied migrations: {applied or 'none'}; schema version {current_version(conn)}")
+    conn.close()
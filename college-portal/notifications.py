@@ -0,0 +1,269 @@
+import json
+import queue
+import sqlite3
+import threading
+import time
+
+import database
+
+# Per-user push notifications over server-sent events. Publishers write a
+# row to the notifications outbox in the same transaction as the change
+# (permission decided, attendance marked, ...), so a notification exists
+# exactly when its change was committed. Each worker process has one Hub:
+# a dispatcher thread tails the outbox by id and hands new rows to the
+# streams connected to that worker. A worker that publishes wakes its own
+# dispatcher at once; the others see the row on their next poll. Streams
+# carry the row id as the SSE event id, so a browser that reconnects (to any
+# worker, after a restart or deploy) sends Last-Event-ID and gets what it
+# missed replayed from the outbox.
+
+DEFAULT_CONFIG = {
+    'NOTIFY_POLL_INTERVAL': 0.5,     # seconds between outbox polls for other workers' rows
+    'NOTIFY_HEARTBEAT': 15,          # seconds between keep-alive comments on an idle stream
+    'NOTIFY_MAX_STREAMS': 1000,      # open streams per worker before new ones get 503
+    'NOTIFY_QUEUE_SIZE': 100,        # undelivered events per stream before it is dropped
+    'NOTIFY_REPLAY_LIMIT': 500,      # events replayed to a reconnecting stream
+    'NOTIFY_RETENTION_DAYS': 7,
+}
+
+TRIGGERS = [
+    '''CREATE TRIGGER IF NOT EXISTS notifications_user_delete AFTER DELETE ON users BEGIN
+           DELETE FROM notifications WHERE user_id = OLD.id;
+       END''',
+]
+
+# How often a dispatcher removes rows past the retention period
+PRUNE_INTERVAL = 3600
+
+_CLOSED = object()
+
+
+class StreamLimitError(Exception):
+    pass
+
+
+def install(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS notifications (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            data TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_notifications_user ON notifications (user_id, id)')
+    for trigger in TRIGGERS:
+        conn.execute(trigger)
+
+
+def publish(conn, user_id, kind, data):
+    # Queue one notification; the caller commits, then calls wake()
+    conn.execute('INSERT INTO notifications (user_id, kind, data) VALUES (?, ?, ?)',
+                 (user_id, kind, json.dumps(data, separators=(',', ':'))))
+
+
+def publish_many(conn, items):
+    # items: (user_id, kind, data) tuples
+    conn.executemany('INSERT INTO notifications (user_id, kind, data) VALUES (?, ?, ?)',
+                     ((user_id, kind, json.dumps(data, separators=(',', ':'))) for user_id, kind, data in items))
+
+
+def latest_id(conn, user_id):
+    # Rendered into a page so its stream starts exactly where the page left off
+    row = conn.execute('SELECT MAX(id) FROM notifications WHERE user_id = ?', (user_id,)).fetchone()
+    return row[0] or 0
+
+
+def replay(conn, user_id, after_id, limit):
+    return conn.execute('''SELECT id, kind, data FROM notifications
+                           WHERE user_id = ? AND id > ? ORDER BY id LIMIT ?''',
+                        (user_id, after_id, limit)).fetchall()
+
+
+def format_event(event_id, kind, data):
+    # data is the stored JSON text, sent as is
+    return f'id: {event_id}\nevent: {kind}\ndata: {data}\n\n'
+
+
+def prune(conn, days):
+    # Ids grow with created_at, so this reads only the rows being removed
+    cutoff = f'-{int(days)} days'
+    return conn.execute('''
+        DELETE FROM notifications WHERE id < COALESCE(
+            (SELECT id FROM notifications WHERE created_at >= datetime('now', ?) ORDER BY id LIMIT 1),
+            (SELECT MAX(id) + 1 FROM notifications))
+    ''', (cutoff,)).rowcount
+
+
+class Subscriber:
+    def __init__(self, user_id, size):
+        self.user_id = user_id
+        self.events = queue.Queue(size)
+        self.overflowed = False
+
+    def put(self, item):
+        try:
+            self.events.put_nowait(item)
+        except queue.Full:
+            # A stalled client; it is disconnected and replays on reconnect
+            self.overflowed = True
+            try:
+                self.events.get_nowait()
+                self.events.put_nowait(_CLOSED)
+            except (queue.Empty, queue.Full):
+                pass
+
+
+class Hub:
+    def __init__(self, config):
+        self.config = config
+        self.poll_interval = config['NOTIFY_POLL_INTERVAL']
+        self.max_streams = config['NOTIFY_MAX_STREAMS']
+        self._subscribers = {}
+        self._count = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._closed = False
+        self.delivered = 0
+        self.dropped = 0
+
+    def subscribe(self, user_id):
+        with self._lock:
+            if self._closed or self._count >= self.max_streams:
+                raise StreamLimitError('Too many open notification streams, please try again shortly')
+            if self._thread is None:
+                # Started on first use, so never in a master process before
+                # fork. It tails from the outbox head as read here, before the
+                # first stream is registered and replays, so a row committed
+                # in between is either replayed or dispatched, never neither.
+                self._thread = threading.Thread(target=self._dispatch, args=(self._head(),),
+                                                name='notify-dispatcher', daemon=True)
+                self._thread.start()
+            subscriber = Subscriber(user_id, self.config['NOTIFY_QUEUE_SIZE'])
+            self._subscribers.setdefault(user_id, set()).add(subscriber)
+            self._count += 1
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            subscribers = self._subscribers.get(subscriber.user_id)
+            if subscribers and subscriber in subscribers:
+                subscribers.discard(subscriber)
+                self._count -= 1
+                if not subscribers:
+                    del self._subscribers[subscriber.user_id]
+            if subscriber.overflowed:
+                self.dropped += 1
+
+    def stream_count(self):
+        return self._count
+
+    def wake(self):
+        self._wake.set()
+
+    def close(self):
+        # End every stream (clients reconnect elsewhere) and stop dispatching
+        with self._lock:
+            self._closed = True
+            subscribers = [subscriber for group in self._subscribers.values() for subscriber in group]
+        for subscriber in subscribers:
+            subscriber.put(_CLOSED)
+        self._wake.set()
+
+    def _head(self):
+        conn = database.connect(self.config)
+        try:
+            return conn.execute('SELECT COALESCE(MAX(id), 0) FROM notifications').fetchone()[0]
+        finally:
+            conn.close()
+
+    def _dispatch(self, last_id):
+        conn = database.connect(self.config)
+        try:
+            pruned_at = time.monotonic()
+            while not self._closed:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                try:
+                    last_id = self._deliver(conn, last_id)
+                    if time.monotonic() - pruned_at > PRUNE_INTERVAL:
+                        pruned_at = time.monotonic()
+                        prune(conn, self.config['NOTIFY_RETENTION_DAYS'])
+                        conn.commit()
+                except sqlite3.Error:
+                    # e.g. locked past the busy timeout; retried on the next poll
+                    conn.rollback()
+        finally:
+            conn.close()
+
+    def _deliver(self, conn, last_id):
+        while True:
+            rows = conn.execute('SELECT id, user_id, kind, data FROM notifications WHERE id > ? ORDER BY id LIMIT 1000',
+                                (last_id,)).fetchall()
+            if not rows:
+                return last_id
+            last_id = rows[-1][0]
+            with self._lock:
+                targets = [(tuple(self._subscribers.get(row[1], ())), row) for row in rows]
+            for subscribers, row in targets:
+                for subscriber in subscribers:
+                    subscriber.put((row[0], row[2], row[3]))
+                    self.delivered += 1
+
+    def stream(self, subscriber, backlog, after_id=0, reset=False):
+        # SSE body: the replayed backlog, then live events. The same row can
+        # reach a stream both ways around subscription time, so anything at
+        # or below the last id sent is skipped.
+        heartbeat = self.config['NOTIFY_HEARTBEAT']
+        sent = after_id
+        try:
+            yield 'retry: 3000\n: connected\n\n'
+            if reset:
+                # More was missed than is replayed; the page should reload
+                yield 'event: reset\ndata: {}\n\n'
+            for event_id, kind, data in backlog:
+                sent = event_id
+                yield format_event(event_id, kind, data)
+            while True:
+                try:
+                    item = subscriber.events.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+                    continue
+                if item is _CLOSED:
+                    return
+                event_id, kind, data = item
+                if event_id <= sent:
+                    continue
+                sent = event_id
+                yield format_event(event_id, kind, data)
+        finally:
+            self.unsubscribe(subscriber)
+
+
+def get_hub(app=None):
+    from flask import current_app
+
+    app = app or current_app._get_current_object()
+    hub = app.extensions.get('notification_hub')
+    if hub is None:
+        hub = app.extensions['notification_hub'] = Hub(app.config)
+    return hub
+
+
+def wake(app=None):
+    # After committing published rows: deliver to this worker's streams now
+    # rather than at the next poll. A no-op until a stream has connected.
+    from flask import current_app
+
+    app = app or current_app._get_current_object()
+    hub = app.extensions.get('notification_hub')
+    if hub is not None:
+        hub.wake()
+
+
+def init_app(app):
+    for key, value in DEFAULT_CONFIG.items():
+        app.config.setdefault(key, value)
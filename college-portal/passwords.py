@@ -0,0 +1,227 @@
+import base64
+import functools
+import hashlib
+import hmac
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import profiles
+
+# Password hashing with scrypt. Hashes are stored as
+# scrypt$<n>$<r>$<p>$<salt>$<hash> so the cost can be raised later: rows with
+# an older cost - or legacy plaintext - are re-hashed on the next successful
+# login. KDF work for requests runs on a small bounded thread pool (scrypt
+# releases the GIL) and bulk imports hash on a process pool.
+
+DEFAULT_CONFIG = {
+    'PASSWORD_SCRYPT_N': 2 ** 14,
+    'PASSWORD_SCRYPT_R': 8,
+    'PASSWORD_SCRYPT_P': 1,
+    'PASSWORD_WORKERS': 4,           # concurrent KDF calls for requests
+    'PASSWORD_MAX_PENDING': 64,      # queued + running before requests are refused
+    'PASSWORD_TIMEOUT': 10,          # seconds a request waits for its KDF
+    'PASSWORD_HASH_PROCESSES': None,  # bulk import processes (None = CPU count)
+    'LOGIN_USER_BURST': 5,           # attempts per username before throttling
+    'LOGIN_USER_RATE': 5 / 60,       # refill, attempts per second
+    'LOGIN_IP_BURST': 30,
+    'LOGIN_IP_RATE': 1.0,
+}
+
+PREFIX = 'scrypt'
+SALT_BYTES = 16
+KEY_BYTES = 64
+
+
+class HasherBusy(Exception):
+    pass
+
+
+def _scrypt(password, salt, n, r, p):
+    # maxmem must cover scrypt's 128 * r * (n + p + 2) byte working set
+    return hashlib.scrypt(password.encode('utf-8'), salt=salt, n=n, r=r, p=p,
+                          maxmem=128 * r * (n + p + 2) + (1 << 20), dklen=KEY_BYTES)
+
+
+def hash_password(password, n=DEFAULT_CONFIG['PASSWORD_SCRYPT_N'], r=DEFAULT_CONFIG['PASSWORD_SCRYPT_R'],
+                  p=DEFAULT_CONFIG['PASSWORD_SCRYPT_P']):
+    salt = os.urandom(SALT_BYTES)
+    key = _scrypt(password, salt, n, r, p)
+    return '$'.join([PREFIX, str(n), str(r), str(p),
+                     base64.b64encode(salt).decode(), base64.b64encode(key).decode()])
+
+
+def _parse(stored):
+    parts = (stored or '').split('$')
+    if len(parts) != 6 or parts[0] != PREFIX:
+        return None
+    try:
+        return int(parts[1]), int(parts[2]), int(parts[3]), base64.b64decode(parts[4]), base64.b64decode(parts[5])
+    except ValueError:
+        return None
+
+
+def is_hashed(stored):
+    return _parse(stored) is not None
+
+
+def verify_password(stored, password):
+    # Constant-time check against a hash, or a legacy plaintext value
+    parsed = _parse(stored)
+    if parsed is None:
+        return hmac.compare_digest((stored or '').encode('utf-8'), password.encode('utf-8'))
+    n, r, p, salt, key = parsed
+    return hmac.compare_digest(_scrypt(password, salt, n, r, p), key)
+
+
+def needs_rehash(stored, n, r, p):
+    parsed = _parse(stored)
+    return parsed is None or parsed[:3] != (n, r, p)
+
+
+def _hash_chunk(passwords, n, r, p):
+    return [hash_password(password, n, r, p) for password in passwords]
+
+
+# Compared against when the username does not exist, so a miss costs the
+# same as a wrong password and does not reveal which usernames are taken
+_DUMMY = {}
+
+
+class PasswordHasher:
+    def __init__(self, config):
+        self.cost = (config['PASSWORD_SCRYPT_N'], config['PASSWORD_SCRYPT_R'], config['PASSWORD_SCRYPT_P'])
+        self.timeout = config['PASSWORD_TIMEOUT']
+        self.processes = config['PASSWORD_HASH_PROCESSES']
+        self._executor = ThreadPoolExecutor(max_workers=config['PASSWORD_WORKERS'],
+                                            thread_name_prefix='password-kdf')
+        self._slots = threading.BoundedSemaphore(config['PASSWORD_MAX_PENDING'])
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def _run(self, fn, *args):
+        # Fail fast when the pool is saturated instead of queueing unboundedly
+        if not self._slots.acquire(blocking=False):
+            raise HasherBusy('Too many logins in progress, please try again shortly')
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result(timeout=self.timeout)
+
+    def hash(self, password):
+        return self._run(hash_password, password, *self.cost)
+
+    def verify(self, stored, password):
+        # Returns (ok, new_hash); new_hash is set when the stored value is
+        # plaintext or uses an outdated cost and should be replaced
+        return self._run(self._verify, stored, password)
+
+    def _verify(self, stored, password):
+        if stored is None:
+            if self.cost not in _DUMMY:
+                _DUMMY[self.cost] = hash_password('', *self.cost)
+            verify_password(_DUMMY[self.cost], password)
+            return False, None
+        if not verify_password(stored, password):
+            return False, None
+        if needs_rehash(stored, *self.cost):
+            return True, hash_password(password, *self.cost)
+        return True, None
+
+    def hash_many(self, passwords, chunk_size=50):
+        # Bulk hashing for imports, spread over worker processes. Spawned rather
+        # than forked: the parent is a threaded web server.
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.processes,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+        chunks = [passwords[i:i + chunk_size] for i in range(0, len(passwords), chunk_size)]
+        hashed = []
+        for result in self._pool.map(functools.partial(_hash_chunk, n=self.cost[0], r=self.cost[1], p=self.cost[2]), chunks):
+            hashed.extend(result)
+        return hashed
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+
+
+class TokenBucketLimiter:
+    # In-memory token buckets keyed by e.g. 'user:alice' or 'ip:10.0.0.1'.
+    # Per process: with N workers an attacker gets N times the rate.
+    MAX_KEYS = 100_000
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def allow(self, key, burst, rate):
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now)
+                return False
+            self._buckets[key] = (tokens - 1, now)
+            if len(self._buckets) > self.MAX_KEYS:
+                self._prune(now)
+            return True
+
+    def reset(self, key):
+        with self._lock:
+            self._buckets.pop(key, None)
+
+    def _prune(self, now):
+        # Drop the oldest half; an idle bucket refills to full anyway
+        ordered = sorted(self._buckets.items(), key=lambda item: item[1][1])
+        for key, _ in ordered[:len(ordered) // 2]:
+            del self._buckets[key]
+
+
+def get_hasher(app=None):
+    from flask import current_app
+
+    app = app or current_app._get_current_object()
+    hasher = app.extensions.get('password_hasher')
+    if hasher is None:
+        hasher = app.extensions['password_hasher'] = PasswordHasher(app.config)
+    return hasher
+
+
+def get_limiter(app=None):
+    from flask import current_app
+
+    app = app or current_app._get_current_object()
+    limiter = app.extensions.get('login_limiter')
+    if limiter is None:
+        limiter = app.extensions['login_limiter'] = TokenBucketLimiter()
+    return limiter
+
+
+def user_key(username):
+    # Same normalization as the username lookup, so ' Alice' and 'alice'
+    # share one bucket
+    return f'user:{profiles.normalize_username(username)}'
+
+
+def allow_login(username, ip, app=None):
+    # Checked before any KDF work; both the username and the client address
+    # must have a token left
+    from flask import current_app
+
+    config = (app or current_app).config
+    limiter = get_limiter(app)
+    return (limiter.allow(f'ip:{ip}', config['LOGIN_IP_BURST'], config['LOGIN_IP_RATE'])
+            and limiter.allow(user_key(username), config['LOGIN_USER_BURST'], config['LOGIN_USER_RATE']))
+
+
+def init_app(app):
+    for key, value in DEFAULT_CONFIG.items():
+        app.config.setdefault(key, value)
@@ -0,0 +1,118 @@
+import threading
+import time
+from collections import OrderedDict
+
+# In-process cache of user profiles (everything but the password), keyed by
+# id and by normalized username, with LRU eviction and a TTL. Routes that
+# change a user call invalidate() after committing; the TTL bounds how long
+# another worker process can serve a stale profile. Password hashes are never
+# cached - login reads them by primary key every time.
+
+DEFAULT_CONFIG = {
+    'PROFILE_CACHE_SIZE': 10_000,
+    'PROFILE_CACHE_TTL': 60,
+}
+
+PROFILE_COLUMNS = 'id, username, role, name, email, rollno, section, department, class'
+
+# SQLite's NOCASE collation only folds ASCII, so normalize the same way
+_ASCII_LOWER = str.maketrans('ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz')
+
+
+def normalize_username(username):
+    return (username or '').strip().translate(_ASCII_LOWER)
+
+
+class ProfileCache:
+    def __init__(self, size=DEFAULT_CONFIG['PROFILE_CACHE_SIZE'], ttl=DEFAULT_CONFIG['PROFILE_CACHE_TTL']):
+        self.size = size
+        self.ttl = ttl
+        self._profiles = OrderedDict()  # id -> (profile, expires)
+        self._names = {}                # normalized username -> id
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _cached(self, user_id):
+        with self._lock:
+            entry = self._profiles.get(user_id)
+            if entry is not None and entry[1] > time.monotonic():
+                self._profiles.move_to_end(user_id)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            return None
+
+    def _store(self, row):
+        if row is None:
+            return None
+        profile = dict(zip(row.keys(), row))
+        with self._lock:
+            self._drop(profile['id'])
+            self._profiles[profile['id']] = (profile, time.monotonic() + self.ttl)
+            self._names[normalize_username(profile['username'])] = profile['id']
+            while len(self._profiles) > self.size:
+                self._drop(next(iter(self._profiles)))
+        return profile
+
+    def _drop(self, user_id):
+        entry = self._profiles.pop(user_id, None)
+        if entry is not None:
+            name = normalize_username(entry[0]['username'])
+            if self._names.get(name) == user_id:
+                del self._names[name]
+
+    def get(self, conn, user_id):
+        # Profile dict for a user id, or None if there is no such user
+        profile = self._cached(user_id)
+        if profile is None:
+            profile = self._store(conn.execute(
+                f'SELECT {PROFILE_COLUMNS} FROM users WHERE id = ?', (user_id,)).fetchone())
+        return profile
+
+    def by_username(self, conn, username):
+        # Case-insensitive lookup served by the idx_users_username_nocase index
+        with self._lock:
+            user_id = self._names.get(normalize_username(username))
+            if user_id is None:
+                self.misses += 1
+        profile = self._cached(user_id) if user_id is not None else None
+        if profile is None:
+            profile = self._store(conn.execute(
+                f'SELECT {PROFILE_COLUMNS} FROM users WHERE username = ? COLLATE NOCASE',
+                (username.strip(),)).fetchone())
+        return profile
+
+    def invalidate(self, *user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                self._drop(user_id)
+
+    def clear(self):
+        with self._lock:
+            self._profiles.clear()
+            self._names.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._profiles), 'hits': self.hits, 'misses': self.misses}
+
+
+def get_profiles(app=None):
+    from flask import current_app
+
+    app = app or current_app._get_current_object()
+    profiles = app.extensions.get('profile_cache')
+    if profiles is None:
+        profiles = app.extensions['profile_cache'] = ProfileCache(
+            app.config['PROFILE_CACHE_SIZE'], app.config['PROFILE_CACHE_TTL'])
+    return profiles
+
+
+def invalidate(*user_ids):
+    get_profiles().invalidate(*user_ids)
+
+
+def init_app(app):
+    for key, value in DEFAULT_CONFIG.items():
+        app.config.setdefault(key, value)
@@ -0,0 +1,173 @@
+import hashlib
+import mimetypes
+import os
+import sqlite3
+import tempfile
+import time
+
+# Proof attachments for permission requests. Uploads are streamed to disk in
+# chunks while being hashed and stored content-addressed by SHA-256, so the
+# same certificate submitted twice is kept once. Blobs live under
+# PROOF_FOLDER/<first two hex chars>/<sha256>; proof_files records their size
+# and type, and permissions.proof_sha256 points at them.
+
+DEFAULT_CONFIG = {
+    'PROOF_MAX_BYTES': 5 * 1024 * 1024,
+    'PROOF_ALLOWED_EXTENSIONS': {'pdf', 'png', 'jpg', 'jpeg'},
+}
+
+CHUNK_SIZE = 64 * 1024
+# Blobs younger than this are never collected: the upload that stored them
+# may not have committed its permission row yet
+GC_GRACE_SECONDS = 3600
+
+
+class ProofError(ValueError):
+    pass
+
+
+def install(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS proof_files (
+            sha256 TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            mime_type TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        ) WITHOUT ROWID
+    ''')
+    columns = [column[1] for column in conn.execute('PRAGMA table_info(permissions)').fetchall()]
+    if 'proof_sha256' not in columns:
+        conn.execute('ALTER TABLE permissions ADD COLUMN proof_sha256 TEXT REFERENCES proof_files (sha256)')
+    if 'proof_filename' not in columns:
+        conn.execute('ALTER TABLE permissions ADD COLUMN proof_filename TEXT')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_permissions_proof ON permissions (proof_sha256)')
+
+
+def blob_path(folder, sha256):
+    return os.path.join(folder, sha256[:2], sha256)
+
+
+def check_extension(filename, allowed):
+    extension = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
+    if extension not in allowed:
+        raise ProofError(f'Proof must be one of: {", ".join(sorted(allowed))}')
+    return extension
+
+
+def store(conn, stream, filename, folder, max_bytes, allowed_extensions=DEFAULT_CONFIG['PROOF_ALLOWED_EXTENSIONS']):
+    # Copy stream to a temporary file in chunks, hashing as it goes, then move
+    # it into place - or drop it if that content is already stored. Returns
+    # (sha256, size, mime_type); the caller commits.
+    check_extension(filename, allowed_extensions)
+    os.makedirs(folder, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    handle, temp_path = tempfile.mkstemp(dir=folder, prefix='.upload-')
+    try:
+        with os.fdopen(handle, 'wb') as output:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise ProofError(f'Proof file is larger than {max_bytes // (1024 * 1024)} MB')
+                digest.update(chunk)
+                output.write(chunk)
+        if size == 0:
+            raise ProofError('Proof file is empty')
+
+        sha256 = digest.hexdigest()
+        path = blob_path(folder, sha256)
+        if os.path.exists(path):
+            os.remove(temp_path)
+            os.utime(path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    mime_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    # A re-used blob gets a fresh timestamp so garbage collection leaves it
+    # alone until this upload's permission row exists
+    conn.execute('''INSERT INTO proof_files (sha256, size, mime_type) VALUES (?, ?, ?)
+                    ON CONFLICT (sha256) DO UPDATE SET created_at = CURRENT_TIMESTAMP''',
+                 (sha256, size, mime_type))
+    return sha256, size, mime_type
+
+
+def lookup(conn, permission_id):
+    # Proof details for a permission, or None if it has no attachment
+    return conn.execute('''
+        SELECT p.student_id, p.faculty_id, p.proof_sha256, p.proof_filename, f.size, f.mime_type
+        FROM permissions p JOIN proof_files f ON f.sha256 = p.proof_sha256
+        WHERE p.id = ?
+    ''', (permission_id,)).fetchone()
+
+
+def collect_garbage(conn, folder, grace_seconds=GC_GRACE_SECONDS, dry_run=False):
+    # Delete blobs no permission refers to (and abandoned temp files) once they
+    # are older than the grace period. Returns (files_removed, bytes_freed).
+    cutoff = time.time() - grace_seconds
+    orphans = conn.execute('''
+        SELECT sha256, size FROM proof_files f
+        WHERE NOT EXISTS (SELECT 1 FROM permissions p WHERE p.proof_sha256 = f.sha256)
+          AND created_at < datetime(?, 'unixepoch')
+    ''', (cutoff,)).fetchall()
+    known = {row[0] for row in conn.execute('SELECT sha256 FROM proof_files')}
+
+    removed = 0
+    freed = 0
+    doomed = set()
+    for sha256, size in orphans:
+        path = blob_path(folder, sha256)
+        if os.path.exists(path):
+            doomed.add(path)
+            freed += size
+        known.discard(sha256)
+        if not dry_run:
+            conn.execute('DELETE FROM proof_files WHERE sha256 = ?', (sha256,))
+
+    # Files on disk with no row at all: crashed uploads and leftovers
+    if os.path.isdir(folder):
+        for root, _, files in os.walk(folder):
+            for name in files:
+                path = os.path.join(root, name)
+                if name in known or os.path.getmtime(path) >= cutoff or path in doomed:
+                    continue
+                doomed.add(path)
+                freed += os.path.getsize(path)
+
+    for path in doomed:
+        removed += 1
+        if not dry_run:
+            os.remove(path)
+    return removed, freed
+
+
+def init_app(app):
+    for key, value in DEFAULT_CONFIG.items():
+        app.config.setdefault(key, value)
+    app.config.setdefault('PROOF_FOLDER', os.path.join(app.config['UPLOAD_FOLDER'], 'proofs'))
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Delete proof files no permission refers to')
+    here = os.path.dirname(os.path.abspath(__file__))
+    parser.add_argument('database', nargs='?', default=os.path.join(here, 'college_portal.db'))
+    parser.add_argument('--folder', default=os.path.join(here, 'uploads', 'proofs'))
+    parser.add_argument('--grace', type=int, default=GC_GRACE_SECONDS, help='minimum age in seconds')
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.database)
+    removed, freed = collect_garbage(conn, args.folder, args.grace, args.dry_run)
+    conn.commit()
+    conn.close()
+    verb = 'Would remove' if args.dry_run else 'Removed'
+    print(f'{verb} {removed} file(s), {freed / (1024 * 1024):.1f} MB.')
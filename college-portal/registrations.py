@@ -0,0 +1,244 @@
+import sqlite3
+
+# Event registration with a seat limit and a first-come waitlist. Confirmed
+# seats are student_events rows (unique per student and event); students
+# past capacity queue in event_waitlist in id order. events.seats_taken and
+# events.waitlist_count are kept by triggers (installed by migration 15), so
+# a registration reads one event row instead of counting. Each register /
+# cancel runs in a single BEGIN IMMEDIATE transaction: the check of the
+# counter and the insert happen under the write lock, so two processes can
+# never both take the last seat.
+
+TRIGGERS = [
+    '''CREATE TRIGGER IF NOT EXISTS registrations_seat_insert AFTER INSERT ON student_events BEGIN
+           UPDATE events SET seats_taken = seats_taken + 1 WHERE id = NEW.event_id;
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS registrations_seat_delete AFTER DELETE ON student_events BEGIN
+           UPDATE events SET seats_taken = seats_taken - 1 WHERE id = OLD.event_id;
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS registrations_waitlist_insert AFTER INSERT ON event_waitlist BEGIN
+           UPDATE events SET waitlist_count = waitlist_count + 1 WHERE id = NEW.event_id;
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS registrations_waitlist_delete AFTER DELETE ON event_waitlist BEGIN
+           UPDATE events SET waitlist_count = waitlist_count - 1 WHERE id = OLD.event_id;
+       END''',
+    # A deleted student or event frees their seats and queue places
+    '''CREATE TRIGGER IF NOT EXISTS registrations_user_delete AFTER DELETE ON users BEGIN
+           DELETE FROM student_events WHERE student_id = OLD.id;
+           DELETE FROM event_waitlist WHERE student_id = OLD.id;
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS registrations_event_delete AFTER DELETE ON events BEGIN
+           DELETE FROM student_events WHERE event_id = OLD.id;
+           DELETE FROM event_waitlist WHERE event_id = OLD.id;
+       END''',
+]
+
+
+class Busy(Exception):
+    # The write lock could not be taken within the busy timeout
+    pass
+
+
+def install(conn):
+    columns = [column[1] for column in conn.execute('PRAGMA table_info(events)').fetchall()]
+    if 'capacity' not in columns:
+        # NULL capacity means unlimited
+        conn.execute('ALTER TABLE events ADD COLUMN capacity INTEGER')
+    if 'seats_taken' not in columns:
+        conn.execute('ALTER TABLE events ADD COLUMN seats_taken INTEGER NOT NULL DEFAULT 0')
+    if 'waitlist_count' not in columns:
+        conn.execute('ALTER TABLE events ADD COLUMN waitlist_count INTEGER NOT NULL DEFAULT 0')
+    columns = [column[1] for column in conn.execute('PRAGMA table_info(student_events)').fetchall()]
+    if 'registered_at' not in columns:
+        conn.execute('ALTER TABLE student_events ADD COLUMN registered_at TIMESTAMP')
+
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS event_waitlist (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            event_id INTEGER NOT NULL,
+            student_id INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (student_id, event_id),
+            FOREIGN KEY (event_id) REFERENCES events (id),
+            FOREIGN KEY (student_id) REFERENCES users (id)
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_event_waitlist_event ON event_waitlist (event_id, id)')
+
+    # Keep the earliest row where a student was recorded twice for an event
+    conn.execute('''
+        DELETE FROM student_events WHERE id NOT IN (
+            SELECT MIN(id) FROM student_events GROUP BY student_id, event_id
+        )
+    ''')
+    conn.execute('''CREATE UNIQUE INDEX IF NOT EXISTS uq_student_events_student_event
+                    ON student_events (student_id, event_id)''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_student_events_event ON student_events (event_id)')
+    for trigger in TRIGGERS:
+        conn.execute(trigger)
+    rebuild(conn)
+
+
+def rebuild(conn):
+    conn.execute('''
+        UPDATE events SET
+            seats_taken = (SELECT COUNT(*) FROM student_events WHERE event_id = events.id),
+            waitlist_count = (SELECT COUNT(*) FROM event_waitlist WHERE event_id = events.id)
+    ''')
+
+
+def _begin(conn):
+    # Take the write lock up front; a deferred transaction could read the
+    # counter, then fail to upgrade when another writer got there first
+    if conn.in_transaction:
+        conn.commit()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+    except sqlite3.OperationalError as e:
+        if 'locked' in str(e) or 'busy' in str(e):
+            raise Busy(str(e))
+        raise
+
+
+def _position(conn, event_id, waitlist_id):
+    return conn.execute('SELECT COUNT(*) FROM event_waitlist WHERE event_id = ? AND id <= ?',
+                        (event_id, waitlist_id)).fetchone()[0]
+
+
+def _promote(conn, event_id):
+    # Move waitlisted students into free seats, oldest first; returns their ids
+    promoted = []
+    while True:
+        row = conn.execute('''
+            SELECT w.id, w.student_id FROM events e
+            JOIN event_waitlist w ON w.event_id = e.id
+            WHERE e.id = ? AND (e.capacity IS NULL OR e.seats_taken < e.capacity)
+            ORDER BY w.id LIMIT 1
+        ''', (event_id,)).fetchone()
+        if row is None:
+            return promoted
+        conn.execute('DELETE FROM event_waitlist WHERE id = ?', (row[0],))
+        conn.execute("INSERT INTO student_events (student_id, event_id, registered_at) VALUES (?, ?, datetime('now'))",
+                     (row[1], event_id))
+        promoted.append(row[1])
+
+
+def register(conn, event_id, student_id):
+    # Returns {'status': 'registered' | 'waitlisted' | 'already_registered' |
+    # 'already_waitlisted' | 'not_found', 'position': waitlist position}
+    _begin(conn)
+    try:
+        event = conn.execute('SELECT capacity, seats_taken FROM events WHERE id = ?', (event_id,)).fetchone()
+        if event is None:
+            conn.rollback()
+            return {'status': 'not_found'}
+        if conn.execute('SELECT 1 FROM student_events WHERE student_id = ? AND event_id = ?',
+                        (student_id, event_id)).fetchone():
+            conn.rollback()
+            return {'status': 'already_registered'}
+        queued = conn.execute('SELECT id FROM event_waitlist WHERE student_id = ? AND event_id = ?',
+                              (student_id, event_id)).fetchone()
+        if queued:
+            result = {'status': 'already_waitlisted', 'position': _position(conn, event_id, queued[0])}
+            conn.rollback()
+            return result
+
+        capacity, seats_taken = event[0], event[1]
+        if capacity is None or seats_taken < capacity:
+            conn.execute("INSERT INTO student_events (student_id, event_id, registered_at) VALUES (?, ?, datetime('now'))",
+                         (student_id, event_id))
+            result = {'status': 'registered'}
+        else:
+            waitlist_id = conn.execute('INSERT INTO event_waitlist (event_id, student_id) VALUES (?, ?)',
+                                       (event_id, student_id)).lastrowid
+            result = {'status': 'waitlisted', 'position': _position(conn, event_id, waitlist_id)}
+        conn.commit()
+        return result
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def cancel(conn, event_id, student_id):
+    # Give up a seat or a waitlist place; a freed seat goes to the head of
+    # the waitlist in the same transaction. Returns {'status': 'cancelled' |
+    # 'left_waitlist' | 'not_registered', 'promoted': [student ids]}
+    _begin(conn)
+    try:
+        if conn.execute('DELETE FROM student_events WHERE student_id = ? AND event_id = ?',
+                        (student_id, event_id)).rowcount:
+            result = {'status': 'cancelled', 'promoted': _promote(conn, event_id)}
+        elif conn.execute('DELETE FROM event_waitlist WHERE student_id = ? AND event_id = ?',
+                          (student_id, event_id)).rowcount:
+            result = {'status': 'left_waitlist', 'promoted': []}
+        else:
+            result = {'status': 'not_registered', 'promoted': []}
+        conn.commit()
+        return result
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def set_capacity(conn, event_id, capacity, change=None):
+    # Change an event's capacity (None for unlimited); a larger capacity
+    # promotes from the waitlist. Lowering it below the seats already taken
+    # keeps those registrations. change(conn), if given, runs first in the
+    # same transaction (e.g. the rest of an event update), so nothing is
+    # committed without its promotions. Returns the promoted student ids.
+    _begin(conn)
+    try:
+        if change:
+            change(conn)
+        conn.execute('UPDATE events SET capacity = ? WHERE id = ?', (capacity, event_id))
+        promoted = _promote(conn, event_id)
+        conn.commit()
+        return promoted
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def promote(conn, free_seats):
+    # Fill seats freed outside register/cancel, e.g. by a deleted student.
+    # free_seats(conn) makes that change and returns the ids of the events
+    # it freed seats in; it runs in the same transaction as the promotions,
+    # so either both commit or neither does. Returns the promoted ids.
+    _begin(conn)
+    try:
+        promoted = [student_id for event_id in free_seats(conn) for student_id in _promote(conn, event_id)]
+        conn.commit()
+        return promoted
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def events(conn, student_id=None):
+    # Upcoming and past events with their seat counters and, for a student,
+    # 'registered' / 'waitlisted' / None
+    rows = conn.execute('''
+        SELECT e.id, e.name, e.date, e.time, e.venue, e.description, e.capacity, e.seats_taken, e.waitlist_count,
+               CASE WHEN se.id IS NOT NULL THEN 'registered' WHEN w.id IS NOT NULL THEN 'waitlisted' END AS status
+        FROM events e
+        LEFT JOIN student_events se ON se.event_id = e.id AND se.student_id = ?
+        LEFT JOIN event_waitlist w ON w.event_id = e.id AND w.student_id = ?
+        ORDER BY e.date, e.id
+    ''', (student_id, student_id)).fetchall()
+    return [dict(row) for row in rows]
+
+
+def check(conn):
+    # Events whose counters disagree with the rows, with more registrations
+    # than seats (only expected after the capacity was lowered), or with a
+    # free seat while students wait
+    return [dict(row) for row in conn.execute('''
+        SELECT id, capacity, seats_taken, waitlist_count, registered, waitlisted FROM (
+            SELECT e.id, e.capacity, e.seats_taken, e.waitlist_count,
+                   (SELECT COUNT(*) FROM student_events WHERE event_id = e.id) AS registered,
+                   (SELECT COUNT(*) FROM event_waitlist WHERE event_id = e.id) AS waitlisted
+            FROM events e
+        )
+        WHERE seats_taken != registered OR waitlist_count != waitlisted
+           OR (capacity IS NOT NULL AND (registered > capacity OR (registered < capacity AND waitlisted > 0)))
+    ''')]
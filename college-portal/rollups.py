@@ -0,0 +1,174 @@
+import sqlite3
+
+# Present/total attendance counters per (student, class, month). Triggers on
+# attendance (installed by migration 8) update them inside the same
+# transaction as the mark, so percentages never scan attendance history.
+
+DEFAULT_THRESHOLD = 75.0
+
+TRIGGERS = [
+    '''CREATE TRIGGER IF NOT EXISTS rollup_attendance_insert AFTER INSERT ON attendance
+       WHEN NEW.student_id IS NOT NULL BEGIN
+           INSERT INTO attendance_rollups (student_id, class_id, month, present, total)
+           VALUES (NEW.student_id, IFNULL(NEW.class_id, 0), substr(NEW.date, 1, 7), NEW.status = 'present', 1)
+           ON CONFLICT (student_id, class_id, month) DO UPDATE SET
+               present = present + excluded.present,
+               total = total + 1;
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS rollup_attendance_delete AFTER DELETE ON attendance BEGIN
+           UPDATE attendance_rollups
+           SET present = present - (OLD.status = 'present'), total = total - 1
+           WHERE student_id = OLD.student_id AND class_id = IFNULL(OLD.class_id, 0)
+             AND month = substr(OLD.date, 1, 7);
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS rollup_attendance_update AFTER UPDATE OF student_id, class_id, date, status ON attendance BEGIN
+           UPDATE attendance_rollups
+           SET present = present - (OLD.status = 'present'), total = total - 1
+           WHERE student_id = OLD.student_id AND class_id = IFNULL(OLD.class_id, 0)
+             AND month = substr(OLD.date, 1, 7);
+           INSERT INTO attendance_rollups (student_id, class_id, month, present, total)
+           VALUES (NEW.student_id, IFNULL(NEW.class_id, 0), substr(NEW.date, 1, 7), NEW.status = 'present', 1)
+           ON CONFLICT (student_id, class_id, month) DO UPDATE SET
+               present = present + excluded.present,
+               total = total + 1;
+       END''',
+]
+
+
+def install(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS attendance_rollups (
+            student_id INTEGER NOT NULL,
+            class_id INTEGER NOT NULL,
+            month TEXT NOT NULL,
+            present INTEGER NOT NULL DEFAULT 0,
+            total INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (student_id, class_id, month)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''CREATE INDEX IF NOT EXISTS idx_attendance_rollups_class
+                    ON attendance_rollups (class_id, student_id, present, total)''')
+    for trigger in TRIGGERS:
+        conn.execute(trigger)
+    rebuild(conn)
+
+
+def rebuild(conn):
+    conn.execute('DELETE FROM attendance_rollups')
+    conn.execute('''
+        INSERT INTO attendance_rollups (student_id, class_id, month, present, total)
+        SELECT student_id, IFNULL(class_id, 0), substr(date, 1, 7),
+               SUM(status = 'present'), COUNT(*)
+        FROM attendance
+        WHERE student_id IS NOT NULL
+        GROUP BY student_id, IFNULL(class_id, 0), substr(date, 1, 7)
+    ''')
+
+
+def _percentage(present, total):
+    return round(present * 100.0 / total, 2) if total else 0.0
+
+
+def student_percentage(conn, student_id):
+    row = conn.execute(
+        'SELECT SUM(present), SUM(total) FROM attendance_rollups WHERE student_id = ?',
+        (student_id,)
+    ).fetchone()
+    return _percentage(row[0] or 0, row[1] or 0)
+
+
+def student_summary(conn, student_id):
+    # Per-class and per-month breakdown for one student
+    by_class = conn.execute('''
+        SELECT r.class_id, c.name AS class_name, SUM(r.present) AS present, SUM(r.total) AS total
+        FROM attendance_rollups r LEFT JOIN classes c ON c.id = r.class_id
+        WHERE r.student_id = ?
+        GROUP BY r.class_id
+        ORDER BY c.name
+    ''', (student_id,)).fetchall()
+    by_month = conn.execute('''
+        SELECT month, SUM(present) AS present, SUM(total) AS total
+        FROM attendance_rollups WHERE student_id = ?
+        GROUP BY month ORDER BY month
+    ''', (student_id,)).fetchall()
+
+    present = sum(row['present'] for row in by_class)
+    total = sum(row['total'] for row in by_class)
+    return {
+        'percentage': _percentage(present, total),
+        'present': present,
+        'total': total,
+        'classes': [{'class_id': row['class_id'], 'class_name': row['class_name'],
+                     'present': row['present'], 'total': row['total'],
+                     'percentage': _percentage(row['present'], row['total'])} for row in by_class],
+        'months': [{'month': row['month'], 'present': row['present'], 'total': row['total'],
+                    'percentage': _percentage(row['present'], row['total'])} for row in by_month],
+    }
+
+
+def class_percentages(conn, class_id):
+    rows = conn.execute('''
+        SELECT r.student_id, u.rollno, u.name, SUM(r.present) AS present, SUM(r.total) AS total
+        FROM attendance_rollups r JOIN users u ON u.id = r.student_id
+        WHERE r.class_id = ?
+        GROUP BY r.student_id
+        ORDER BY u.rollno
+    ''', (class_id,)).fetchall()
+    return [_student_row(row) for row in rows]
+
+
+def section_percentages(conn, department, section):
+    rows = conn.execute('''
+        SELECT u.id AS student_id, u.rollno, u.name, SUM(r.present) AS present, SUM(r.total) AS total
+        FROM users u JOIN attendance_rollups r ON r.student_id = u.id
+        WHERE u.role = 'student' AND u.department = ? AND u.section = ?
+        GROUP BY u.id
+        ORDER BY u.rollno
+    ''', (department, section)).fetchall()
+    return [_student_row(row) for row in rows]
+
+
+def shortlist(conn, threshold=DEFAULT_THRESHOLD, class_id=None, department=None, section=None):
+    # Students whose attendance is below threshold percent, lowest first
+    where = ["u.role = 'student'"]
+    params = []
+    if class_id is not None:
+        where.append('r.class_id = ?')
+        params.append(class_id)
+    if department:
+        where.append('u.department = ?')
+        params.append(department)
+    if section:
+        where.append('u.section = ?')
+        params.append(section)
+
+    rows = conn.execute(f'''
+        SELECT u.id AS student_id, u.rollno, u.name, SUM(r.present) AS present, SUM(r.total) AS total
+        FROM attendance_rollups r JOIN users u ON u.id = r.student_id
+        WHERE {' AND '.join(where)}
+        GROUP BY u.id
+        HAVING SUM(r.total) > 0 AND SUM(r.present) * 100.0 / SUM(r.total) < ?
+        ORDER BY SUM(r.present) * 1.0 / SUM(r.total), u.rollno
+    ''', (*params, float(threshold))).fetchall()
+    return [_student_row(row) for row in rows]
+
+
+def _student_row(row):
+    return {'student_id': row['student_id'], 'rollno': row['rollno'], 'name': row['name'],
+            'present': row['present'], 'total': row['total'],
+            'percentage': _percentage(row['present'], row['total'])}
+
+
+if __name__ == '__main__':
+    import argparse
+    import os
+
+    parser = argparse.ArgumentParser(description='Rebuild attendance rollups from the attendance table')
+    parser.add_argument('database', nargs='?', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'college_portal.db'))
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.database)
+    rebuild(conn)
+    conn.commit()
+    conn.close()
+    print('Attendance rollups rebuilt.')
@@ -0,0 +1,211 @@
+import sqlite3
+import threading
+from collections import Counter
+
+# Routes permission requests to the faculty responsible for the student's
+# department and section. permission_routes holds one faculty per
+# (department, section), chosen among faculty of that department who teach
+# a class and spread by number of students. Triggers (installed by migration
+# 10) bump the 'routing_inputs' version whenever faculty or class
+# assignments change; the next lookup then rebuilds the table and reloads
+# the in-memory index.
+
+TRIGGERS = [
+    '''CREATE TRIGGER IF NOT EXISTS routing_faculty_insert AFTER INSERT ON users
+       WHEN NEW.role = 'faculty' BEGIN
+           UPDATE catalog_versions SET version = version + 1 WHERE name = 'routing_inputs';
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS routing_faculty_delete AFTER DELETE ON users
+       WHEN OLD.role = 'faculty' BEGIN
+           UPDATE catalog_versions SET version = version + 1 WHERE name = 'routing_inputs';
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS routing_faculty_update AFTER UPDATE OF role, department ON users
+       WHEN OLD.role = 'faculty' OR NEW.role = 'faculty' BEGIN
+           UPDATE catalog_versions SET version = version + 1 WHERE name = 'routing_inputs';
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS routing_classes_insert AFTER INSERT ON classes BEGIN
+           UPDATE catalog_versions SET version = version + 1 WHERE name = 'routing_inputs';
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS routing_classes_delete AFTER DELETE ON classes BEGIN
+           UPDATE catalog_versions SET version = version + 1 WHERE name = 'routing_inputs';
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS routing_classes_update AFTER UPDATE OF faculty_id ON classes BEGIN
+           UPDATE catalog_versions SET version = version + 1 WHERE name = 'routing_inputs';
+       END''',
+]
+
+
+def install(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS permission_routes (
+            department TEXT NOT NULL,
+            section TEXT NOT NULL,
+            faculty_id INTEGER NOT NULL,
+            PRIMARY KEY (department, section),
+            FOREIGN KEY (faculty_id) REFERENCES users (id)
+        ) WITHOUT ROWID
+    ''')
+    # 'routing_inputs' moves with faculty/classes; 'permission_routes' records
+    # which inputs version the table was last built from
+    conn.execute("INSERT OR IGNORE INTO catalog_versions (name, version) VALUES ('routing_inputs', 1)")
+    conn.execute("INSERT OR IGNORE INTO catalog_versions (name, version) VALUES ('permission_routes', 0)")
+    for trigger in TRIGGERS:
+        conn.execute(trigger)
+    rebuild(conn)
+
+
+def _version(conn, name):
+    row = conn.execute('SELECT version FROM catalog_versions WHERE name = ?', (name,)).fetchone()
+    return row[0] if row else None
+
+
+def _candidates(conn):
+    # Returns candidates(department) -> faculty ids, best first: faculty of
+    # the department who teach, then any of the department, then any teaching
+    # faculty, then anyone
+    faculty = conn.execute("SELECT id, IFNULL(department, '') FROM users WHERE role = 'faculty' ORDER BY id").fetchall()
+    teaching = {row[0] for row in conn.execute('SELECT DISTINCT faculty_id FROM classes WHERE faculty_id IS NOT NULL')}
+    by_department = {}
+    for faculty_id, department in faculty:
+        by_department.setdefault(department, []).append(faculty_id)
+    all_teaching = [faculty_id for faculty_id, _ in faculty if faculty_id in teaching]
+    everyone = [faculty_id for faculty_id, _ in faculty]
+
+    def candidates(department):
+        members = by_department.get(department, [])
+        return ([f for f in members if f in teaching] or members or all_teaching or everyone)
+    return candidates
+
+
+def rebuild(conn, reassign_pending=False):
+    # Recompute every route. Routes whose faculty is still a valid candidate
+    # are kept so existing queues stay put; the rest go to the least loaded
+    # candidate. The caller commits.
+    candidates = _candidates(conn)
+    existing = {(row[0], row[1]): row[2] for row in conn.execute(
+        'SELECT department, section, faculty_id FROM permission_routes')}
+    groups = conn.execute('''
+        SELECT IFNULL(department, ''), IFNULL(section, ''), COUNT(*) FROM users
+        WHERE role = 'student' GROUP BY 1, 2 ORDER BY 3 DESC, 1, 2
+    ''').fetchall()
+
+    routes = {}
+    load = Counter()
+    pending = []
+    for department, section, students in groups:
+        faculty_id = existing.get((department, section))
+        if faculty_id is not None and faculty_id in candidates(department):
+            routes[(department, section)] = faculty_id
+            load[faculty_id] += students
+        else:
+            pending.append((department, section, students))
+    for department, section, students in pending:
+        options = candidates(department)
+        if not options:
+            continue
+        faculty_id = min(options, key=lambda f: (load[f], f))
+        routes[(department, section)] = faculty_id
+        load[faculty_id] += students
+
+    conn.execute('DELETE FROM permission_routes')
+    conn.executemany('INSERT INTO permission_routes (department, section, faculty_id) VALUES (?, ?, ?)',
+                     [(department, section, faculty_id) for (department, section), faculty_id in routes.items()])
+    conn.execute('''UPDATE catalog_versions SET version = (SELECT version FROM catalog_versions WHERE name = 'routing_inputs')
+                    WHERE name = 'permission_routes' ''')
+
+    if reassign_pending:
+        # Move pending requests onto the faculty their student now routes to
+        conn.execute('''
+            UPDATE permissions SET faculty_id = (
+                SELECT r.faculty_id FROM users u JOIN permission_routes r
+                  ON r.department = IFNULL(u.department, '') AND r.section = IFNULL(u.section, '')
+                WHERE u.id = permissions.student_id)
+            WHERE status = 'pending' AND EXISTS (
+                SELECT 1 FROM users u JOIN permission_routes r
+                  ON r.department = IFNULL(u.department, '') AND r.section = IFNULL(u.section, '')
+                WHERE u.id = permissions.student_id)
+        ''')
+    return routes
+
+
+class Router:
+    def __init__(self):
+        self._routes = {}
+        self._version = None
+        self._lock = threading.Lock()
+        self.reloads = 0
+
+    def load(self, conn):
+        # Bring the in-memory index up to date, e.g. to warm a new process
+        self._refresh(conn)
+
+    def _refresh(self, conn):
+        inputs = _version(conn, 'routing_inputs')
+        if inputs == self._version:
+            return
+        with self._lock:
+            if inputs == self._version:
+                return
+            if _version(conn, 'permission_routes') != inputs:
+                rebuild(conn)
+            self._routes = {(row[0], row[1]): row[2] for row in conn.execute(
+                'SELECT department, section, faculty_id FROM permission_routes')}
+            self._version = inputs
+            self.reloads += 1
+
+    def faculty_for(self, conn, student_id):
+        # Responsible faculty id for a student, or None if there is no faculty
+        # at all. A department/section seen for the first time is routed to
+        # the candidate with the fewest routes and saved (the caller commits).
+        self._refresh(conn)
+        student = conn.execute('SELECT department, section FROM users WHERE id = ?', (student_id,)).fetchone()
+        if student is None:
+            return None
+        key = (student[0] or '', student[1] or '')
+        faculty_id = self._routes.get(key)
+        if faculty_id is not None:
+            return faculty_id
+
+        row = conn.execute('SELECT faculty_id FROM permission_routes WHERE department = ? AND section = ?', key).fetchone()
+        if row is None:
+            options = _candidates(conn)(key[0])
+            if not options:
+                return None
+            load = Counter(dict(conn.execute(
+                'SELECT faculty_id, COUNT(*) FROM permission_routes GROUP BY faculty_id').fetchall()))
+            faculty_id = min(options, key=lambda f: (load[f], f))
+            conn.execute('INSERT OR IGNORE INTO permission_routes (department, section, faculty_id) VALUES (?, ?, ?)',
+                         (*key, faculty_id))
+        else:
+            faculty_id = row[0]
+        with self._lock:
+            self._routes[key] = faculty_id
+        return faculty_id
+
+
+def get_router(app=None):
+    from flask import current_app
+
+    app = app or current_app._get_current_object()
+    router = app.extensions.get('permission_router')
+    if router is None:
+        router = app.extensions['permission_router'] = Router()
+    return router
+
+
+if __name__ == '__main__':
+    import argparse
+    import os
+
+    parser = argparse.ArgumentParser(description='Rebuild the permission routing table')
+    parser.add_argument('database', nargs='?', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'college_portal.db'))
+    parser.add_argument('--reassign-pending', action='store_true',
+                        help='also move pending requests to their new faculty')
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.database)
+    routes = rebuild(conn, reassign_pending=args.reassign_pending)
+    conn.commit()
+    conn.close()
+    for faculty_id, count in sorted(Counter(routes.values()).items()):
+        print(f'faculty {faculty_id}: {count} department/section routes')
@@ -0,0 +1,131 @@
+import re
+import sqlite3
+
+# SQLite FTS5 search over users, clubs/events and permission reasons. The
+# index tables use external content and are kept in sync by triggers
+# (installed by migration 7); rebuild()/optimize() are for bulk maintenance.
+
+MAX_PAGE_SIZE = 50
+DEFAULT_PAGE_SIZE = 20
+MAX_OFFSET = 1000
+
+INDEXES = {
+    'users_fts': ('users', ['name', 'rollno', 'email', 'department']),
+    'clubs_events_fts': ('clubs_events', ['name']),
+    'permissions_fts': ('permissions', ['reason']),
+}
+
+
+def _index_sql(fts, table, columns):
+    column_list = ', '.join(columns)
+    new_values = ', '.join(f'NEW.{column}' for column in columns)
+    old_values = ', '.join(f'OLD.{column}' for column in columns)
+    return [
+        f'''CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+                {column_list}, content='{table}', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2', prefix='2 3')''',
+        f'''CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table} BEGIN
+                INSERT INTO {fts} (rowid, {column_list}) VALUES (NEW.id, {new_values});
+            END''',
+        f'''CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table} BEGIN
+                INSERT INTO {fts} ({fts}, rowid, {column_list}) VALUES ('delete', OLD.id, {old_values});
+            END''',
+        f'''CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF {column_list} ON {table} BEGIN
+                INSERT INTO {fts} ({fts}, rowid, {column_list}) VALUES ('delete', OLD.id, {old_values});
+                INSERT INTO {fts} (rowid, {column_list}) VALUES (NEW.id, {new_values});
+            END''',
+    ]
+
+
+def install(conn):
+    for fts, (table, columns) in INDEXES.items():
+        for sql in _index_sql(fts, table, columns):
+            conn.execute(sql)
+    rebuild(conn)
+
+
+def rebuild(conn):
+    # Re-read every row from the content tables
+    for fts in INDEXES:
+        conn.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+
+
+def optimize(conn, tables=None):
+    # Merge index segments, e.g. after a bulk import added thousands of rows
+    for fts in tables or INDEXES:
+        conn.execute(f"INSERT INTO {fts} ({fts}) VALUES ('optimize')")
+
+
+def build_match(text):
+    # Turn free text into an FTS5 query of quoted prefix terms, so user input
+    # can never be parsed as FTS syntax
+    terms = re.findall(r'\w+', text or '', flags=re.UNICODE)
+    return ' '.join(f'"{term}"*' for term in terms[:8])
+
+
+USERS_SQL = '''
+    SELECT 'user' AS kind, u.id, u.name AS title,
+           u.role || IFNULL(', ' || u.rollno, '') || IFNULL(', ' || u.department, '') AS detail,
+           bm25(users_fts) AS rank
+    FROM users_fts JOIN users u ON u.id = users_fts.rowid
+    WHERE users_fts MATCH :match
+'''
+
+CLUBS_SQL = '''
+    SELECT ce.type AS kind, ce.id, ce.name AS title,
+           CASE WHEN ce.is_active THEN 'active' ELSE 'inactive' END AS detail,
+           bm25(clubs_events_fts) AS rank
+    FROM clubs_events_fts JOIN clubs_events ce ON ce.id = clubs_events_fts.rowid
+    WHERE clubs_events_fts MATCH :match
+'''
+
+PERMISSIONS_SQL = '''
+    SELECT 'permission' AS kind, p.id, p.reason AS title,
+           IFNULL(u.name, 'Unknown student') || ', ' || p.date || ', ' || p.status AS detail,
+           bm25(permissions_fts) AS rank
+    FROM permissions_fts JOIN permissions p ON p.id = permissions_fts.rowid
+    LEFT JOIN users u ON u.id = p.student_id
+    WHERE permissions_fts MATCH :match {scope}
+'''
+
+
+def search(conn, text, faculty_id=None, limit=DEFAULT_PAGE_SIZE, offset=0):
+    # Ranked hits across all indexes. Faculty (faculty_id set) only see
+    # permissions routed to them. Returns (hits, has_more).
+    match = build_match(text)
+    if not match:
+        return [], False
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    offset = max(0, min(int(offset), MAX_OFFSET))
+
+    scope = 'AND p.faculty_id = :faculty_id' if faculty_id is not None else ''
+    rows = conn.execute(
+        f'''{USERS_SQL} UNION ALL {CLUBS_SQL} UNION ALL {PERMISSIONS_SQL.format(scope=scope)}
+            ORDER BY rank LIMIT :limit OFFSET :offset''',
+        {'match': match, 'faculty_id': faculty_id, 'limit': limit + 1, 'offset': offset}
+    ).fetchall()
+
+    has_more = len(rows) > limit
+    hits = [{'kind': row['kind'], 'id': row['id'], 'title': row['title'],
+             'detail': row['detail'], 'score': round(-row['rank'], 4)}
+            for row in rows[:limit]]
+    return hits, has_more
+
+
+if __name__ == '__main__':
+    import argparse
+    import os
+
+    parser = argparse.ArgumentParser(description='Maintain the full-text search index')
+    parser.add_argument('command', choices=['rebuild', 'optimize'])
+    parser.add_argument('database', nargs='?', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'college_portal.db'))
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.database)
+    if args.command == 'rebuild':
+        rebuild(conn)
+    else:
+        optimize(conn)
+    conn.commit()
+    conn.close()
+    print(f'Search index {args.command} complete.')
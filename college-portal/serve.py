@@ -0,0 +1,232 @@
+import argparse
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+# Prefork server for the portal. The master migrates the schema once,
+# preloads the app and warms its caches, then forks workers that share the
+# listening socket (and, copy-on-write, the loaded code and caches). Each
+# worker is a threaded WSGI server.
+#
+#   SIGTERM / SIGINT  stop: workers finish in-flight requests, then exit
+#   SIGHUP            graceful reload: the master re-executes itself with
+#                     the same socket, loads the new code, starts new
+#                     workers and only then retires the old ones
+#
+# Where os.fork is unavailable (Windows) it serves from a single process.
+
+LISTEN_FD_ENV = 'PORTAL_LISTEN_FD'
+OLD_WORKERS_ENV = 'PORTAL_OLD_WORKERS'
+GRACEFUL_TIMEOUT = 30
+KEEPALIVE_TIMEOUT = 5
+
+
+def log(message):
+    print(f'[{os.getpid()}] {message}', file=sys.stderr, flush=True)
+
+
+def load(migrate=True, warm=True):
+    # Import, migrate and warm up in this process; returns (app, timings)
+    timings = {}
+    started = time.perf_counter()
+    from app import create_app, init_db, warmup
+
+    app = create_app()
+    timings['import_s'] = time.perf_counter() - started
+    if migrate:
+        started = time.perf_counter()
+        init_db()
+        timings['migrate_s'] = time.perf_counter() - started
+    if warm:
+        started = time.perf_counter()
+        warmup()
+        timings['warmup_s'] = time.perf_counter() - started
+    return app, timings
+
+
+def share_fragment_cache(app):
+    # The memory backend is per process, so an invalidation in one worker
+    # would leave the others serving stale fragments; share them via sqlite
+    if app.config['FRAGMENT_CACHE_BACKEND'] == 'memory':
+        app.config['FRAGMENT_CACHE_BACKEND'] = 'sqlite'
+        app.extensions.pop('fragment_cache', None)
+        log('fragment cache: using the sqlite backend shared by the workers')
+
+
+def listen(host, port, backlog):
+    fd = os.environ.pop(LISTEN_FD_ENV, None)
+    if fd is not None:
+        # Socket handed over by the master we replaced on reload
+        sock = socket.socket(fileno=int(fd))
+    else:
+        sock = socket.create_server((host, port), backlog=backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+class RequestHandler(WSGIRequestHandler):
+    # Close idle keep-alive connections so a draining worker can finish
+    timeout = KEEPALIVE_TIMEOUT
+
+
+def serve_worker(app, sock):
+    # Runs in the forked child and never returns. Pools with threads cannot
+    # cross a fork and sqlite connections must not be shared, so drop any the
+    # master might have created.
+    for name in ('password_hasher', 'job_runner', 'db_pool', 'notification_hub', 'fragment_cache'):
+        app.extensions.pop(name, None)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    host, port = sock.getsockname()[:2]
+    server = make_server(host, port, app, threaded=True, request_handler=RequestHandler, fd=sock.fileno())
+    # Join request threads on close so shutdown drains in-flight requests
+    server.daemon_threads = False
+    server.block_on_close = True
+
+    def stop(signum, frame):
+        # Open notification streams would otherwise hold the drain until the
+        # deadline; their clients reconnect to the other workers
+        hub = app.extensions.get('notification_hub')
+        if hub is not None:
+            hub.close()
+        threading.Thread(target=server.shutdown).start()
+        deadline = threading.Timer(GRACEFUL_TIMEOUT, os._exit, (1,))
+        deadline.daemon = True
+        deadline.start()
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        server.serve_forever()
+        server.server_close()
+    finally:
+        os._exit(0)
+
+
+class Master:
+    def __init__(self, app, sock, workers):
+        self.app = app
+        self.sock = sock
+        self.size = workers
+        self.workers = set()
+        self.retiring = {int(pid) for pid in os.environ.pop(OLD_WORKERS_ENV, '').split(',') if pid}
+        self.stopping = False
+        self.reloading = False
+
+    def spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            serve_worker(self.app, self.sock)
+        self.workers.add(pid)
+        return pid
+
+    def _signal(self, signum, frame):
+        if signum == signal.SIGHUP:
+            self.reloading = True
+        else:
+            self.stopping = True
+
+    def run(self):
+        for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+            signal.signal(signum, self._signal)
+        for _ in range(self.size):
+            self.spawn()
+        log(f'workers {sorted(self.workers)}')
+        # New workers are accepting; let the previous generation drain
+        self.terminate(self.retiring)
+
+        while not self.stopping:
+            if self.reloading:
+                self.reload()
+            self.reap()
+            time.sleep(0.2)
+        self.terminate(self.workers)
+        self.wait(self.workers | self.retiring, GRACEFUL_TIMEOUT)
+
+    def reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            self.retiring.discard(pid)
+            if pid in self.workers:
+                self.workers.discard(pid)
+                if not self.stopping:
+                    log(f'worker {pid} exited ({status}), starting a new one')
+                    self.spawn()
+
+    def terminate(self, pids):
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def wait(self, pids, timeout):
+        deadline = time.monotonic() + timeout
+        pids = set(pids)
+        while pids and time.monotonic() < deadline:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid:
+                pids.discard(pid)
+            else:
+                time.sleep(0.1)
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+
+    def reload(self):
+        # Same pid after exec, so the current workers stay our children and
+        # the new image can retire them once its own workers are up
+        log('reloading')
+        os.environ[LISTEN_FD_ENV] = str(self.sock.fileno())
+        os.environ[OLD_WORKERS_ENV] = ','.join(str(pid) for pid in self.workers | self.retiring)
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.execv(sys.executable, [sys.executable] + sys.argv)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--bind', default='127.0.0.1:8000', help='host:port (port 0 picks a free one)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--backlog', type=int, default=128)
+    parser.add_argument('--no-migrate', action='store_true', help='skip migrations (run elsewhere)')
+    parser.add_argument('--no-warmup', action='store_true')
+    parser.add_argument('--migrate-only', action='store_true', help='migrate the schema and exit')
+    args = parser.parse_args()
+
+    if args.migrate_only:
+        _, timings = load(migrate=True, warm=False)
+        log(f'schema is up to date ({timings["migrate_s"] * 1000:.0f} ms)')
+        return
+
+    host, _, port = args.bind.rpartition(':')
+    sock = listen(host or '127.0.0.1', int(port), args.backlog)
+    app, timings = load(migrate=not args.no_migrate, warm=not args.no_warmup)
+    log('started in ' + ', '.join(f'{key[:-2]} {value * 1000:.0f} ms' for key, value in timings.items()))
+    bound_host, bound_port = sock.getsockname()[:2]
+    print(f'Listening on http://{bound_host}:{bound_port}', flush=True)
+
+    if args.workers <= 1 or not hasattr(os, 'fork'):
+        server = make_server(bound_host, bound_port, app, threaded=True, request_handler=RequestHandler,
+                             fd=sock.fileno())
+        server.serve_forever()
+        return
+    share_fragment_cache(app)
+    Master(app, sock, args.workers).run()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,7 @@
 // Initialize when DOM is loaded
 document.addEventListener('DOMContentLoaded', function() {
     initializeAdminDashboard();
+    initializeUserLists();
     loadClubsEvents();
 });
 
@@ -122,6 +123,116 @@ function initializeAdminDashboard() {
     }
 }
 
+// Paginated student/faculty lists backed by /api/users
+const userLists = {
+    student: { tableId: 'students-table', buttonId: 'students-load-more', sectionId: 'students-section' },
+    faculty: { tableId: 'faculty-table', buttonId: 'faculty-load-more', sectionId: 'faculty-section' }
+};
+
+function initializeUserLists() {
+    const viewStudentsBtn = document.getElementById('view-students-btn');
+    const viewFacultyBtn = document.getElementById('view-faculty-btn');
+
+    if (viewStudentsBtn) {
+        viewStudentsBtn.addEventListener('click', function() {
+            document.getElementById('students-section').style.display = 'block';
+        });
+    }
+
+    if (viewFacultyBtn) {
+        viewFacultyBtn.addEventListener('click', function() {
+            document.getElementById('faculty-section').style.display = 'block';
+        });
+    }
+
+    document.querySelectorAll('.load-more-btn').forEach(button => {
+        button.addEventListener('click', function() {
+            loadUsers(this.getAttribute('data-role'), false);
+        });
+    });
+
+    document.querySelectorAll('.list-filters').forEach(filters => {
+        let timer = null;
+        filters.addEventListener('input', function() {
+            clearTimeout(timer);
+            timer = setTimeout(() => loadUsers(filters.getAttribute('data-role'), true), 300);
+        });
+    });
+}
+
+function hideSection(sectionId) {
+    document.getElementById(sectionId).style.display = 'none';
+}
+
+function loadUsers(role, reset) {
+    const list = userLists[role];
+    const button = document.getElementById(list.buttonId);
+    const params = new URLSearchParams({ role: role });
+
+    document.querySelectorAll(`.list-filters[data-role="${role}"] input`).forEach(input => {
+        if (input.value.trim()) {
+            params.set(input.name, input.value.trim());
+        }
+    });
+    if (!reset && button.getAttribute('data-cursor')) {
+        params.set('cursor', button.getAttribute('data-cursor'));
+    }
+
+    fetch(`/api/users?${params.toString()}`)
+    .then(response => response.json())
+    .then(data => {
+        if (!data.success) {
+            showNotification('Error: ' + data.message, 'error');
+            return;
+        }
+        const table = document.getElementById(list.tableId);
+        if (reset) {
+            table.innerHTML = '';
+        }
+        table.insertAdjacentHTML('beforeend', data.users.map(user => renderUserRow(role, user)).join(''));
+        button.setAttribute('data-cursor', data.next_cursor || '');
+        button.style.display = data.next_cursor ? '' : 'none';
+    })
+    .catch(error => {
+        showNotification('An error occurred while loading users.', 'error');
+    });
+}
+
+function renderUserRow(role, user) {
+    const actions = `
+        <td>
+            <button class="action-btn btn-edit" onclick="editUser(${user.id}, '${role}')">Edit</button>
+            <button class="action-btn btn-delete" onclick="deleteUser(${user.id}, '${role}')">Delete</button>
+        </td>`;
+    if (role === 'student') {
+        return `
+            <tr>
+                <td>${user.id}</td>
+                <td>${escapeHtml(user.rollno || 'N/A')}</td>
+                <td>${escapeHtml(user.name)}</td>
+                <td>${escapeHtml(user.email || 'N/A')}</td>
+                <td>${escapeHtml(user.section || 'N/A')}</td>
+                <td>${escapeHtml(user.department || 'N/A')}</td>
+                ${actions}
+            </tr>`;
+    }
+    return `
+        <tr>
+            <td>${user.id}</td>
+            <td>${escapeHtml(user.name)}</td>
+            <td>${escapeHtml(user.email || 'N/A')}</td>
+            <td>${escapeHtml(user.department || 'N/A')}</td>
+            <td>${escapeHtml(user.username)}</td>
+            ${actions}
+        </tr>`;
+}
+
+function escapeHtml(text) {
+    const div = document.createElement('div');
+    div.textContent = text;
+    return div.innerHTML;
+}
+
 function loadClubsEvents() {
     fetch('/api/get_clubs_events')
     .then(response => response.json())
@@ -375,11 +486,11 @@ function uploadStudents(e) {
         if (data.success) {
             document.getElementById('upload-students-modal').style.display = 'none';
             document.getElementById('upload-students-form').reset();
-            showNotification(data.message, 'success');
-            setTimeout(() => location.reload(), 2000);
+            showNotification(data.message, 'info');
+            pollImportJob(data.status_url);
         } else {
             showNotification('Error: ' + data.message, 'error');
-            }
+        }
     })
     .catch(error => {
         showLoading(false);
@@ -404,11 +515,11 @@ function uploadFaculty(e) {
         if (data.success) {
             document.getElementById('upload-faculty-modal').style.display = 'none';
             document.getElementById('upload-faculty-form').reset();
-            showNotification(data.message, 'success');
-            setTimeout(() => location.reload(), 2000);
+            showNotification(data.message, 'info');
+            pollImportJob(data.status_url);
         } else {
             showNotification('Error: ' + data.message, 'error');
-            }
+        }
     })
     .catch(error => {
         showLoading(false);
@@ -416,6 +527,47 @@ function uploadFaculty(e) {
     });
 }
 
+// Poll a background import job until it finishes
+function pollImportJob(statusUrl) {
+    fetch(statusUrl)
+    .then(response => response.json())
+    .then(data => {
+        if (!data.success) {
+            showNotification('Error: ' + data.message, 'error');
+            return;
+        }
+        const job = data.job;
+        if (job.status === 'queued' || job.status === 'running') {
+            let progress = `Importing ${job.filename}: ${job.rows_processed}`;
+            if (job.total_rows) {
+                progress += ` of ${job.total_rows}`;
+            }
+            progress += ' rows';
+            if (job.eta_seconds !== null) {
+                progress += ` (about ${Math.ceil(job.eta_seconds)}s left)`;
+            }
+            showNotification(progress, 'info');
+            setTimeout(() => pollImportJob(statusUrl), 1000);
+        } else if (job.status === 'done') {
+            showNotification(job.message, 'success');
+            offerErrorReport(job.report_url);
+            setTimeout(() => location.reload(), 2000);
+        } else {
+            showNotification('Error: ' + job.message, 'error');
+        }
+    })
+    .catch(error => {
+        showNotification('Lost track of the import job, please refresh the page.', 'error');
+    });
+}
+
+// Let the admin download the per-row error report of an import
+function offerErrorReport(reportUrl) {
+    if (reportUrl && confirm('Some rows could not be imported. Download the error report?')) {
+        window.location.href = reportUrl;
+    }
+}
+
 // Add faculty
 function addFaculty(e) {
     e.preventDefault();
@@ -446,7 +598,7 @@ function addFaculty(e) {
             setTimeout(() => location.reload(), 2000);
         } else {
             showNotification('Error: ' + data.message, 'error');
-            }
+        }
     })
     .catch(error => {
         showLoading(false);
@@ -544,4 +696,4 @@ function showNotification(message, type = 'info') {
             }
         }, 500);
     }, 5000);
-}
\ No newline at end of file
+}
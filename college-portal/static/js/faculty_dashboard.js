@@ -0,0 +1,363 @@
+// faculty_dashboard.js
+document.addEventListener('DOMContentLoaded', function() {
+    initializeFacultyDashboard();
+});
+
+function initializeFacultyDashboard() {
+    // Modal functionality
+    const modals = document.querySelectorAll('.modal');
+    const closeButtons = document.querySelectorAll('.close-modal');
+    
+    // Close modals
+    closeButtons.forEach(button => {
+        button.addEventListener('click', function() {
+            modals.forEach(modal => {
+                modal.style.display = 'none';
+            });
+        });
+    });
+    
+    // Close modal when clicking outside
+    window.addEventListener('click', function(e) {
+        modals.forEach(modal => {
+            if (e.target === modal) {
+                modal.style.display = 'none';
+            }
+        });
+    });
+
+    // Save attendance functionality
+    const saveAttendanceBtn = document.getElementById('save-attendance-btn');
+    if (saveAttendanceBtn) {
+        saveAttendanceBtn.addEventListener('click', saveAttendance);
+    }
+
+    // Permission approval/rejection (delegated, rows are also added by Load More)
+    const permissionsTable = document.getElementById('permissions-table');
+    if (permissionsTable) {
+        permissionsTable.addEventListener('click', function(e) {
+            const button = e.target.closest('.btn-approve, .btn-reject');
+            if (button) {
+                const status = button.classList.contains('btn-approve') ? 'approved' : 'rejected';
+                updatePermissionStatus(button.getAttribute('data-id'), status);
+            }
+        });
+    }
+
+    // New requests routed to this faculty, from the notification stream
+    if (notificationStream) {
+        notificationStream.addEventListener('permission_request', function(e) {
+            const permission = JSON.parse(e.data);
+            setStat('pending_permissions', permission.pending_permissions);
+            showNotification(`New permission request from ${permission.student_name} for ${permission.date}`, 'info');
+            // The queue is oldest first: append only when the last page is loaded
+            const filter = document.getElementById('permission-status-filter');
+            const more = document.getElementById('permissions-load-more');
+            if (permissionsTable && (!filter || ['', 'pending'].includes(filter.value))
+                    && !(more && more.getAttribute('data-cursor'))) {
+                permissionsTable.insertAdjacentHTML('beforeend', renderPermissionRow({...permission, status: 'pending'}));
+            }
+        });
+    }
+
+    const loadMoreButton = document.getElementById('permissions-load-more');
+    if (loadMoreButton) {
+        loadMoreButton.addEventListener('click', function() {
+            loadPermissions(false);
+        });
+    }
+
+    const statusFilter = document.getElementById('permission-status-filter');
+    if (statusFilter) {
+        statusFilter.addEventListener('change', function() {
+            loadPermissions(true);
+        });
+    }
+
+    // Batch approval of selected rows or of everything pending on a date
+    const selectAll = document.getElementById('select-all-permissions');
+    if (selectAll) {
+        selectAll.addEventListener('change', function() {
+            document.querySelectorAll('.permission-select').forEach(checkbox => {
+                checkbox.checked = selectAll.checked;
+            });
+        });
+    }
+
+    const approveSelectedBtn = document.getElementById('approve-selected-btn');
+    if (approveSelectedBtn) {
+        approveSelectedBtn.addEventListener('click', function() {
+            updateSelectedPermissions('approved');
+        });
+    }
+
+    const rejectSelectedBtn = document.getElementById('reject-selected-btn');
+    if (rejectSelectedBtn) {
+        rejectSelectedBtn.addEventListener('click', function() {
+            updateSelectedPermissions('rejected');
+        });
+    }
+
+    const approveDateBtn = document.getElementById('approve-date-btn');
+    if (approveDateBtn) {
+        approveDateBtn.addEventListener('click', function() {
+            const date = document.getElementById('batch-date').value;
+            if (!date) {
+                showNotification('Please choose a date first', 'error');
+                return;
+            }
+            if (confirm(`Approve every pending request for ${date}?`)) {
+                batchUpdatePermissions({ filter: { status: 'pending', date: date }, status: 'approved' });
+            }
+        });
+    }
+}
+
+function updateSelectedPermissions(status) {
+    const selected = Array.from(document.querySelectorAll('.permission-select:checked'));
+    if (selected.length === 0) {
+        showNotification('Please select at least one request', 'error');
+        return;
+    }
+    batchUpdatePermissions({
+        updates: selected.map(checkbox => ({ id: Number(checkbox.value), status: status }))
+    });
+}
+
+function batchUpdatePermissions(payload) {
+    showLoading(true);
+
+    fetch('/api/permissions/batch', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify(payload)
+    })
+    .then(response => response.json())
+    .then(data => {
+        showLoading(false);
+        if (data.success) {
+            const skipped = Object.values(data.results).filter(result => result !== 'updated' && result !== 'unchanged').length;
+            const message = skipped ? `${data.message}, ${skipped} skipped` : data.message;
+            showNotification(message, skipped ? 'info' : 'success');
+            setTimeout(() => {
+                location.reload();
+            }, 1000);
+        } else {
+            showNotification('Error: ' + data.message, 'error');
+        }
+    })
+    .catch(error => {
+        showLoading(false);
+        console.error('Error:', error);
+        showNotification('An error occurred while updating permissions.', 'error');
+    });
+}
+
+function loadPermissions(reset) {
+    const button = document.getElementById('permissions-load-more');
+    const params = new URLSearchParams();
+    const status = document.getElementById('permission-status-filter').value;
+
+    if (status) {
+        params.set('status', status);
+    }
+    if (!reset && button.getAttribute('data-cursor')) {
+        params.set('cursor', button.getAttribute('data-cursor'));
+    }
+
+    fetch(`/api/permissions/queue?${params.toString()}`)
+    .then(response => response.json())
+    .then(data => {
+        if (!data.success) {
+            showNotification('Error: ' + data.message, 'error');
+            return;
+        }
+        const table = document.getElementById('permissions-table');
+        if (reset) {
+            table.innerHTML = '';
+        }
+        table.insertAdjacentHTML('beforeend', data.permissions.map(renderPermissionRow).join(''));
+        button.setAttribute('data-cursor', data.next_cursor || '');
+        button.style.display = data.next_cursor ? '' : 'none';
+    })
+    .catch(error => {
+        showNotification('An error occurred while loading permissions.', 'error');
+    });
+}
+
+function renderPermissionRow(permission) {
+    const actions = permission.status === 'pending'
+        ? `<button class="action-btn btn-approve" data-id="${permission.id}">Approve</button>
+           <button class="action-btn btn-reject" data-id="${permission.id}">Reject</button>`
+        : '<span class="action-completed">Processed</span>';
+    const status = escapeHtml(permission.status);
+    const proof = permission.proof_filename
+        ? ` <a href="/api/proofs/${permission.id}" target="_blank">(proof)</a>`
+        : '';
+    const select = permission.status === 'pending'
+        ? `<input type="checkbox" class="permission-select" value="${permission.id}">`
+        : '';
+    return `
+        <tr>
+            <td>${select}</td>
+            <td>${escapeHtml(permission.student_name)}</td>
+            <td>${escapeHtml(permission.rollno || '')}</td>
+            <td>${escapeHtml(permission.date)}</td>
+            <td>${escapeHtml(permission.reason)}${proof}</td>
+            <td class="status-${status}">${status.charAt(0).toUpperCase() + status.slice(1)}</td>
+            <td>${actions}</td>
+        </tr>`;
+}
+
+function escapeHtml(text) {
+    const div = document.createElement('div');
+    div.textContent = text;
+    return div.innerHTML;
+}
+
+function saveAttendance() {
+    showLoading(true, 'save-attendance-btn');
+    
+    const attendanceData = {};
+    const attendanceSession = document.getElementById('attendance-session').dataset;
+    const radioGroups = document.querySelectorAll('#attendance-table input[type="radio"]:checked');
+    
+    if (radioGroups.length === 0) {
+        showNotification('Please mark attendance for at least one student', 'error');
+        showLoading(false, 'save-attendance-btn');
+        return;
+    }
+    
+    radioGroups.forEach(radio => {
+        const studentId = radio.name.replace('attendance_', '');
+        attendanceData[studentId] = radio.value;
+    });
+    
+    fetch('/api/mark_attendance', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({
+            class_id: Number(attendanceSession.classId),
+            date: attendanceSession.date,
+            period: Number(attendanceSession.period),
+            attendance: attendanceData
+        })
+    })
+    .then(response => response.json())
+    .then(data => {
+        showLoading(false, 'save-attendance-btn');
+        if (data.success) {
+            showNotification('Attendance saved successfully!', 'success');
+        } else {
+            showNotification('Error: ' + data.message, 'error');
+        }
+    })
+    .catch(error => {
+        showLoading(false, 'save-attendance-btn');
+        console.error('Error:', error);
+        showNotification('An error occurred while saving attendance.', 'error');
+    });
+}
+
+function updatePermissionStatus(permissionId, status) {
+    showLoading(true);
+    
+    fetch('/api/update_permission_status', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({
+            permission_id: permissionId,
+            status: status
+        })
+    })
+    .then(response => response.json())
+    .then(data => {
+        showLoading(false);
+        if (data.success) {
+            showNotification(`Permission ${status} successfully!`, 'success');
+            // Reload after 1 second to show updated status
+            setTimeout(() => {
+                location.reload();
+            }, 1000);
+        } else {
+            showNotification('Error: ' + data.message, 'error');
+        }
+    })
+    .catch(error => {
+        showLoading(false);
+        console.error('Error:', error);
+        showNotification('An error occurred while updating permission status.', 'error');
+    });
+}
+
+function showLoading(show, buttonId = null) {
+    let buttons;
+    if (buttonId) {
+        buttons = [document.getElementById(buttonId)];
+    } else {
+        buttons = document.querySelectorAll('button');
+    }
+    
+    buttons.forEach(button => {
+        if (button) {
+            if (show) {
+                button.disabled = true;
+                const originalText = button.textContent;
+                button.setAttribute('data-original-text', originalText);
+                button.innerHTML = 'Processing...';
+                button.classList.add('loading');
+            } else {
+                button.disabled = false;
+                const originalText = button.getAttribute('data-original-text') || 'Submit';
+                button.innerHTML = originalText;
+                button.classList.remove('loading');
+            }
+        }
+    });
+}
+
+function showNotification(message, type = 'info') {
+    // Remove any existing notifications
+    const existingNotifications = document.querySelectorAll('.custom-notification');
+    existingNotifications.forEach(notification => notification.remove());
+
+    const notification = document.createElement('div');
+    notification.className = `custom-notification flash-message ${type}`;
+    notification.textContent = message;
+    notification.style.position = 'fixed';
+    notification.style.top = '80px';
+    notification.style.right = '20px';
+    notification.style.zIndex = '1000';
+    notification.style.maxWidth = '400px';
+    notification.style.padding = '16px 20px';
+    notification.style.borderRadius = '10px';
+    notification.style.color = 'white';
+    notification.style.boxShadow = '0 10px 30px rgba(0, 0, 0, 0.08)';
+    notification.style.fontSize = '14px';
+    
+    if (type === 'success') {
+        notification.style.background = '#06d6a0';
+    } else if (type === 'error') {
+        notification.style.background = '#ef476f';
+    } else {
+        notification.style.background = '#4361ee';
+    }
+    
+    document.body.appendChild(notification);
+    
+    setTimeout(() => {
+        notification.style.opacity = '0';
+        notification.style.transition = 'opacity 0.5s ease';
+        setTimeout(() => {
+            if (notification.parentNode) {
+                notification.remove();
+            }
+        }, 500);
+    }, 5000);
+}
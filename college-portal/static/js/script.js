@@ -7,21 +7,11 @@ function initializeApp() {
     // Modal functionality
     const modals = document.querySelectorAll('.modal');
     const closeButtons = document.querySelectorAll('.close-modal');
-    const addUserBtn = document.getElementById('add-user-btn');
     const applyPermissionBtn = document.getElementById('apply-permission-btn');
-    const uploadStudentsBtn = document.getElementById('upload-students-btn');
-    const uploadFacultyBtn = document.getElementById('upload-faculty-btn');
-    const addFacultyBtn = document.getElementById('add-faculty-btn');
-    const addClubEventBtn = document.getElementById('add-club-event-btn');
     const changePasswordBtn = document.getElementById('change-password-btn');
     
-    // Open modals
-    if (addUserBtn) {
-        addUserBtn.addEventListener('click', function() {
-            document.getElementById('add-user-modal').style.display = 'flex';
-        });
-    }
-    
+    // Open modals (the admin and faculty dashboards bind their own in
+    // admin_dashboard.js / faculty_dashboard.js)
     if (applyPermissionBtn) {
         applyPermissionBtn.addEventListener('click', function() {
             document.getElementById('apply-permission-modal').style.display = 'flex';
@@ -31,30 +21,6 @@ function initializeApp() {
         });
     }
 
-    if (uploadStudentsBtn) {
-        uploadStudentsBtn.addEventListener('click', function() {
-            document.getElementById('upload-students-modal').style.display = 'flex';
-        });
-    }
-
-    if (uploadFacultyBtn) {
-        uploadFacultyBtn.addEventListener('click', function() {
-            document.getElementById('upload-faculty-modal').style.display = 'flex';
-        });
-    }
-
-    if (addFacultyBtn) {
-        addFacultyBtn.addEventListener('click', function() {
-            document.getElementById('add-faculty-modal').style.display = 'flex';
-        });
-    }
-
-    if (addClubEventBtn) {
-        addClubEventBtn.addEventListener('click', function() {
-            document.getElementById('add-club-event-modal').style.display = 'flex';
-        });
-    }
-
     if (changePasswordBtn) {
         changePasswordBtn.addEventListener('click', function() {
             document.getElementById('change-password-modal').style.display = 'flex';
@@ -90,33 +56,6 @@ function initializeApp() {
         }, 5000);
     });
     
-    // Handle permission status updates
-    const approveButtons = document.querySelectorAll('.btn-approve');
-    const rejectButtons = document.querySelectorAll('.btn-reject');
-    
-    approveButtons.forEach(button => {
-        button.addEventListener('click', function() {
-            const permissionId = this.getAttribute('data-id');
-            updatePermissionStatus(permissionId, 'approved');
-        });
-    });
-    
-    rejectButtons.forEach(button => {
-        button.addEventListener('click', function() {
-            const permissionId = this.getAttribute('data-id');
-            updatePermissionStatus(permissionId, 'rejected');
-        });
-    });
-    
-    // Add user form submission
-    const addUserForm = document.getElementById('add-user-form');
-    if (addUserForm) {
-        addUserForm.addEventListener('submit', function(e) {
-            e.preventDefault();
-            addUser();
-        });
-    }
-    
     // Apply permission form submission
     const applyPermissionForm = document.getElementById('apply-permission-form');
     if (applyPermissionForm) {
@@ -126,30 +65,6 @@ function initializeApp() {
         });
     }
 
-    // Upload students form submission
-    const uploadStudentsForm = document.getElementById('upload-students-form');
-    if (uploadStudentsForm) {
-        uploadStudentsForm.addEventListener('submit', uploadStudents);
-    }
-
-    // Upload faculty form submission
-    const uploadFacultyForm = document.getElementById('upload-faculty-form');
-    if (uploadFacultyForm) {
-        uploadFacultyForm.addEventListener('submit', uploadFaculty);
-    }
-
-    // Add faculty form submission
-    const addFacultyForm = document.getElementById('add-faculty-form');
-    if (addFacultyForm) {
-        addFacultyForm.addEventListener('submit', addFaculty);
-    }
-
-    // Add club/event form submission
-    const addClubEventForm = document.getElementById('add-club-event-form');
-    if (addClubEventForm) {
-        addClubEventForm.addEventListener('submit', addClubEvent);
-    }
-
     // Change password form submission
     const changePasswordForm = document.getElementById('change-password-form');
     if (changePasswordForm) {
@@ -161,254 +76,140 @@ function initializeApp() {
     
     // Add real-time updates simulation
     simulateRealTimeUpdates();
+    
+    // Live permission and attendance updates
+    connectNotifications();
 }
 
-// Update permission status
-function updatePermissionStatus(permissionId, status) {
-    showLoading(true);
-    
-    fetch('/api/update_permission_status', {
-        method: 'POST',
-        headers: {
-            'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({
-            permission_id: permissionId,
-            status: status
-        })
-    })
-    .then(response => response.json())
-    .then(data => {
-        showLoading(false);
-        if (data.success) {
-            showNotification(`Permission ${status} successfully!`, 'success');
-            // Reload after 1 second to show updated status
-            setTimeout(() => {
-                location.reload();
-            }, 1000);
-        } else {
-            showNotification('Error: ' + data.message, 'error');
-        }
-    })
-    .catch(error => {
-        showLoading(false);
-        console.error('Error:', error);
-        showNotification('An error occurred while updating permission status.', 'error');
-    });
+// Server-sent notifications. Dashboards render #notification-stream with
+// the id they are up to date with; the deltas are applied in place instead
+// of reloading. EventSource reconnects by itself and resumes from the last
+// event id, so nothing is missed across server restarts.
+let notificationStream = null;
+
+function connectNotifications() {
+    const element = document.getElementById('notification-stream');
+    if (!element || !window.EventSource) {
+        return;
+    }
+    notificationStream = new EventSource(element.getAttribute('data-url'));
+    notificationStream.addEventListener('permission', e => applyPermissionDelta(JSON.parse(e.data)));
+    notificationStream.addEventListener('attendance', e => applyAttendanceDelta(JSON.parse(e.data)));
+    // More was missed than the server replays
+    notificationStream.addEventListener('reset', () => location.reload());
 }
 
-// Add new user
-function addUser() {
-    showLoading(true);
-    
-    const form = document.getElementById('add-user-form');
-    const formData = new FormData(form);
-    const data = {
-        username: formData.get('username'),
-        password: formData.get('password'),
-        name: formData.get('name'),
-        email: formData.get('email'),
-        class: formData.get('class')
-    };
-    
-    fetch('/api/add_user', {
-        method: 'POST',
-        headers: {
-            'Content-Type': 'application/json',
-        },
-        body: JSON.stringify(data)
-    })
-    .then(response => response.json())
-    .then(data => {
-        showLoading(false);
-        if (data.success) {
-            document.getElementById('add-user-modal').style.display = 'none';
-            form.reset();
-            showNotification('Student added successfully!', 'success');
-            // Reload after 1 second to show new user
-            setTimeout(() => {
-                location.reload();
-            }, 1000);
-        } else {
-            showNotification('Error: ' + data.message, 'error');
-        }
-    })
-    .catch(error => {
-        showLoading(false);
-        console.error('Error:', error);
-        showNotification('An error occurred while adding student.', 'error');
-    });
+function notificationsConnected() {
+    return notificationStream !== null && notificationStream.readyState === EventSource.OPEN;
 }
 
-// Apply for permission
-function applyPermission() {
-    showLoading(true);
-    
-    const form = document.getElementById('apply-permission-form');
-    const formData = new FormData(form);
-    const data = {
-        date: formData.get('date'),
-        reason: formData.get('reason'),
-        proof: formData.get('proof')
-    };
-    
-    fetch('/api/add_permission', {
-        method: 'POST',
-        headers: {
-            'Content-Type': 'application/json',
-        },
-        body: JSON.stringify(data)
-    })
-    .then(response => response.json())
-    .then(data => {
-        showLoading(false);
-        if (data.success) {
-            document.getElementById('apply-permission-modal').style.display = 'none';
-            form.reset();
-            showNotification('Permission request submitted successfully!', 'success');
-            // Reload after 1 second to show new permission
-            setTimeout(() => {
-                location.reload();
-            }, 1000);
-        } else {
-            showNotification('Error: ' + data.message, 'error');
-        }
-    })
-    .catch(error => {
-        showLoading(false);
-        console.error('Error:', error);
-        showNotification('An error occurred while submitting permission request.', 'error');
+function setStat(name, value) {
+    document.querySelectorAll(`[data-stat="${name}"]`).forEach(element => {
+        element.textContent = value;
     });
 }
 
-// Upload students from Excel
-function uploadStudents(e) {
-    e.preventDefault();
-    showLoading(true);
-    
-    const formData = new FormData(document.getElementById('upload-students-form'));
-    
-    fetch('/api/upload_students', {
-        method: 'POST',
-        body: formData
-    })
-    .then(response => response.json())
-    .then(data => {
-        showLoading(false);
-        if (data.success) {
-            document.getElementById('upload-students-modal').style.display = 'none';
-            document.getElementById('upload-students-form').reset();
-            showNotification(data.message, 'success');
-            setTimeout(() => location.reload(), 2000);
-        } else {
-            showNotification('Error: ' + data.message, 'error');
-        }
-    })
-    .catch(error => {
-        showLoading(false);
-        showNotification('An error occurred while uploading students.', 'error');
-    });
+function titleCase(text) {
+    return text.charAt(0).toUpperCase() + text.slice(1);
 }
 
-// Upload faculty from Excel
-function uploadFaculty(e) {
-    e.preventDefault();
-    showLoading(true);
-    
-    const formData = new FormData(document.getElementById('upload-faculty-form'));
-    
-    fetch('/api/upload_faculty', {
-        method: 'POST',
-        body: formData
-    })
-    .then(response => response.json())
-    .then(data => {
-        showLoading(false);
-        if (data.success) {
-            document.getElementById('upload-faculty-modal').style.display = 'none';
-            document.getElementById('upload-faculty-form').reset();
-            showNotification(data.message, 'success');
-            setTimeout(() => location.reload(), 2000);
-        } else {
-            showNotification('Error: ' + data.message, 'error');
+function tableCell(text, className) {
+    const cell = document.createElement('td');
+    cell.textContent = text;
+    if (className) {
+        cell.className = className;
+    }
+    return cell;
+}
+
+function applyPermissionDelta(permission) {
+    setStat('pending_permissions', permission.pending_permissions);
+    const table = document.getElementById('student-permissions');
+    if (!table) {
+        return;
+    }
+    let row = table.querySelector(`tr[data-permission-id="${permission.id}"]`);
+    if (!row) {
+        const empty = table.querySelector('.empty-row');
+        if (empty) {
+            empty.remove();
         }
-    })
-    .catch(error => {
-        showLoading(false);
-        showNotification('An error occurred while uploading faculty.', 'error');
-    });
+        row = document.createElement('tr');
+        row.setAttribute('data-permission-id', permission.id);
+        row.append(tableCell(permission.date), tableCell(permission.reason), tableCell(''),
+                   tableCell(permission.faculty_name || 'Pending Assignment'));
+        row.children[2].setAttribute('data-field', 'status');
+        table.append(row);
+    } else if (permission.status !== 'pending') {
+        showNotification(`Your permission request for ${permission.date} was ${permission.status}.`,
+                         permission.status === 'approved' ? 'success' : 'error');
+    }
+    const status = row.querySelector('[data-field="status"]');
+    status.className = `status-${permission.status}`;
+    status.textContent = titleCase(permission.status);
 }
 
-// Add faculty
-function addFaculty(e) {
-    e.preventDefault();
-    showLoading(true);
-    
-    const form = document.getElementById('add-faculty-form');
-    const formData = new FormData(form);
-    const data = {
-        username: formData.get('username'),
-        password: formData.get('password'),
-        name: formData.get('name'),
-        email: formData.get('email'),
-        department: formData.get('department')
-    };
-    
-    fetch('/api/add_faculty', {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify(data)
-    })
-    .then(response => response.json())
-    .then(data => {
-        showLoading(false);
-        if (data.success) {
-            document.getElementById('add-faculty-modal').style.display = 'none';
-            form.reset();
-            showNotification(data.message, 'success');
-            setTimeout(() => location.reload(), 2000);
-        } else {
-            showNotification('Error: ' + data.message, 'error');
+function applyAttendanceDelta(mark) {
+    const table = document.getElementById('student-attendance');
+    if (!table) {
+        return;
+    }
+    const key = `${mark.date}:${mark.class_id}:${mark.period}`;
+    const existing = Array.from(table.querySelectorAll('tr[data-key]')).find(row => row.getAttribute('data-key') === key);
+    const row = document.createElement('tr');
+    row.setAttribute('data-key', key);
+    const status = document.createElement('span');
+    status.className = `status-${mark.status}`;
+    status.textContent = titleCase(mark.status);
+    const statusCell = tableCell('', `status-${mark.status}`);
+    statusCell.append(status);
+    row.append(tableCell(mark.date), tableCell(mark.subject || 'General'), statusCell,
+               tableCell(mark.marked_by || 'System'));
+    if (existing) {
+        existing.replaceWith(row);
+    } else {
+        const empty = table.querySelector('.empty-row');
+        if (empty) {
+            empty.remove();
         }
-    })
-    .catch(error => {
-        showLoading(false);
-        showNotification('An error occurred while adding faculty.', 'error');
-    });
+        table.prepend(row);
+    }
+    showNotification(`Attendance for ${mark.subject || 'class'} on ${mark.date}: ${mark.status}`, 'info');
 }
 
-// Add club/event
-function addClubEvent(e) {
-    e.preventDefault();
+// Apply for permission
+function applyPermission() {
     showLoading(true);
     
-    const form = document.getElementById('add-club-event-form');
+    const form = document.getElementById('apply-permission-form');
     const formData = new FormData(form);
-    const data = {
-        name: formData.get('name'),
-        type: formData.get('type')
-    };
     
-    fetch('/api/add_club_event', {
+    // Sent as multipart so an attached proof file is uploaded with the request
+    fetch('/api/add_permission', {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify(data)
+        body: formData
     })
     .then(response => response.json())
     .then(data => {
         showLoading(false);
         if (data.success) {
-            document.getElementById('add-club-event-modal').style.display = 'none';
+            document.getElementById('apply-permission-modal').style.display = 'none';
             form.reset();
-            showNotification(data.message, 'success');
-            loadClubsEvents();
+            showNotification('Permission request submitted successfully!', 'success');
+            // The new row arrives over the notification stream; reload only without one
+            if (!notificationsConnected()) {
+                setTimeout(() => {
+                    location.reload();
+                }, 1000);
+            }
         } else {
             showNotification('Error: ' + data.message, 'error');
         }
     })
     .catch(error => {
         showLoading(false);
-        showNotification('An error occurred while adding club/event.', 'error');
+        console.error('Error:', error);
+        showNotification('An error occurred while submitting permission request.', 'error');
     });
 }
 
@@ -453,44 +254,6 @@ function changePassword(e) {
     });
 }
 
-// Load clubs and events
-function loadClubsEvents() {
-    fetch('/api/get_clubs_events')
-    .then(response => response.json())
-    .then(data => {
-        const table = document.getElementById('clubs-events-table');
-        if (table) {
-            table.innerHTML = '';
-            data.clubs.forEach(club => {
-                table.innerHTML += `
-                    <tr>
-                        <td>${club.name}</td>
-                        <td>Club</td>
-                        <td>Active</td>
-                        <td>
-                            <button class="action-btn btn-edit">Edit</button>
-                            <button class="action-btn btn-delete">Delete</button>
-                        </td>
-                    </tr>
-                `;
-            });
-            data.events.forEach(event => {
-                table.innerHTML += `
-                    <tr>
-                        <td>${event.name}</td>
-                        <td>Event</td>
-                        <td>Active</td>
-                        <td>
-                            <button class="action-btn btn-edit">Edit</button>
-                            <button class="action-btn btn-delete">Delete</button>
-                        </td>
-                    </tr>
-                `;
-            });
-        }
-    });
-}
-
 // Show loading state
 function showLoading(show) {
     const buttons = document.querySelectorAll('button[type="submit"]');
@@ -0,0 +1,169 @@
+import sqlite3
+
+# Dashboard counters kept in the stats table. SQLite triggers (installed by
+# migration 5) adjust them on every write, so every writer - routes, import
+# jobs, scripts - keeps them current and dashboards read them by primary key.
+
+TRIGGERS = [
+    '''CREATE TRIGGER IF NOT EXISTS stats_users_insert AFTER INSERT ON users BEGIN
+           INSERT INTO stats (key, value) VALUES ('users:' || NEW.role, 1)
+           ON CONFLICT (key) DO UPDATE SET value = value + 1;
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS stats_users_delete AFTER DELETE ON users BEGIN
+           UPDATE stats SET value = value - 1 WHERE key = 'users:' || OLD.role;
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS stats_users_role AFTER UPDATE OF role ON users
+       WHEN OLD.role IS NOT NEW.role BEGIN
+           UPDATE stats SET value = value - 1 WHERE key = 'users:' || OLD.role;
+           INSERT INTO stats (key, value) VALUES ('users:' || NEW.role, 1)
+           ON CONFLICT (key) DO UPDATE SET value = value + 1;
+       END''',
+
+    '''CREATE TRIGGER IF NOT EXISTS stats_permissions_insert AFTER INSERT ON permissions
+       WHEN NEW.status = 'pending' BEGIN
+           INSERT INTO stats (key, value) VALUES ('permissions:pending', 1)
+           ON CONFLICT (key) DO UPDATE SET value = value + 1;
+           INSERT INTO stats (key, value) VALUES ('permissions:pending:faculty:' || IFNULL(NEW.faculty_id, ''), 1)
+           ON CONFLICT (key) DO UPDATE SET value = value + 1;
+           INSERT INTO stats (key, value) VALUES ('permissions:pending:student:' || IFNULL(NEW.student_id, ''), 1)
+           ON CONFLICT (key) DO UPDATE SET value = value + 1;
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS stats_permissions_delete AFTER DELETE ON permissions
+       WHEN OLD.status = 'pending' BEGIN
+           UPDATE stats SET value = value - 1 WHERE key IN (
+               'permissions:pending',
+               'permissions:pending:faculty:' || IFNULL(OLD.faculty_id, ''),
+               'permissions:pending:student:' || IFNULL(OLD.student_id, ''));
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS stats_permissions_update_old AFTER UPDATE OF status, faculty_id, student_id ON permissions
+       WHEN OLD.status = 'pending' BEGIN
+           UPDATE stats SET value = value - 1 WHERE key IN (
+               'permissions:pending',
+               'permissions:pending:faculty:' || IFNULL(OLD.faculty_id, ''),
+               'permissions:pending:student:' || IFNULL(OLD.student_id, ''));
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS stats_permissions_update_new AFTER UPDATE OF status, faculty_id, student_id ON permissions
+       WHEN NEW.status = 'pending' BEGIN
+           INSERT INTO stats (key, value) VALUES ('permissions:pending', 1)
+           ON CONFLICT (key) DO UPDATE SET value = value + 1;
+           INSERT INTO stats (key, value) VALUES ('permissions:pending:faculty:' || IFNULL(NEW.faculty_id, ''), 1)
+           ON CONFLICT (key) DO UPDATE SET value = value + 1;
+           INSERT INTO stats (key, value) VALUES ('permissions:pending:student:' || IFNULL(NEW.student_id, ''), 1)
+           ON CONFLICT (key) DO UPDATE SET value = value + 1;
+       END''',
+
+    '''CREATE TRIGGER IF NOT EXISTS stats_events_insert AFTER INSERT ON events BEGIN
+           INSERT INTO stats (key, value) VALUES ('events', 1)
+           ON CONFLICT (key) DO UPDATE SET value = value + 1;
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS stats_events_delete AFTER DELETE ON events BEGIN
+           UPDATE stats SET value = value - 1 WHERE key = 'events';
+       END''',
+
+    '''CREATE TRIGGER IF NOT EXISTS stats_student_events_insert AFTER INSERT ON student_events BEGIN
+           INSERT INTO stats (key, value) VALUES ('student_events:student:' || IFNULL(NEW.student_id, ''), 1)
+           ON CONFLICT (key) DO UPDATE SET value = value + 1;
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS stats_student_events_delete AFTER DELETE ON student_events BEGIN
+           UPDATE stats SET value = value - 1 WHERE key = 'student_events:student:' || IFNULL(OLD.student_id, '');
+       END''',
+]
+
+# Recomputes every counter from the base tables
+RECOMPUTE_SQL = '''
+    SELECT 'users:' || role, COUNT(*) FROM users GROUP BY role
+    UNION ALL
+    SELECT 'permissions:pending', COUNT(*) FROM permissions WHERE status = 'pending'
+    UNION ALL
+    SELECT 'permissions:pending:faculty:' || IFNULL(faculty_id, ''), COUNT(*) FROM permissions
+    WHERE status = 'pending' GROUP BY faculty_id
+    UNION ALL
+    SELECT 'permissions:pending:student:' || IFNULL(student_id, ''), COUNT(*) FROM permissions
+    WHERE status = 'pending' GROUP BY student_id
+    UNION ALL
+    SELECT 'events', COUNT(*) FROM events
+    UNION ALL
+    SELECT 'student_events:student:' || IFNULL(student_id, ''), COUNT(*) FROM student_events GROUP BY student_id
+'''
+
+
+def install(conn):
+    conn.execute('CREATE TABLE IF NOT EXISTS stats (key TEXT PRIMARY KEY, value INTEGER NOT NULL DEFAULT 0) WITHOUT ROWID')
+    for trigger in TRIGGERS:
+        conn.execute(trigger)
+    rebuild(conn)
+
+
+def get(conn, *keys):
+    placeholders = ', '.join('?' * len(keys))
+    values = dict(conn.execute(f'SELECT key, value FROM stats WHERE key IN ({placeholders})', keys).fetchall())
+    return {key: values.get(key, 0) for key in keys}
+
+
+def admin_counts(conn):
+    values = get(conn, 'users:student', 'users:faculty', 'permissions:pending', 'events')
+    return {
+        'students_count': values['users:student'],
+        'faculty_count': values['users:faculty'],
+        'pending_permissions': values['permissions:pending'],
+        'events_count': values['events'],
+    }
+
+
+def faculty_counts(conn, faculty_id):
+    values = get(conn, 'users:student', f'permissions:pending:faculty:{faculty_id}')
+    return {
+        'students_count': values['users:student'],
+        'pending_permissions': values[f'permissions:pending:faculty:{faculty_id}'],
+    }
+
+
+def student_counts(conn, student_id):
+    values = get(conn, f'permissions:pending:student:{student_id}', f'student_events:student:{student_id}')
+    return {
+        'pending_permissions': values[f'permissions:pending:student:{student_id}'],
+        'events_count': values[f'student_events:student:{student_id}'],
+    }
+
+
+def compute(conn):
+    return {key: value for key, value in conn.execute(RECOMPUTE_SQL).fetchall()}
+
+
+def check(conn):
+    # Returns {key: (stored, actual)} for every counter that has drifted
+    actual = compute(conn)
+    stored = {key: value for key, value in conn.execute('SELECT key, value FROM stats').fetchall()}
+    drift = {}
+    for key in set(actual) | set(stored):
+        if stored.get(key, 0) != actual.get(key, 0):
+            drift[key] = (stored.get(key, 0), actual.get(key, 0))
+    return drift
+
+
+def rebuild(conn):
+    conn.execute('DELETE FROM stats')
+    conn.executemany('INSERT INTO stats (key, value) VALUES (?, ?)', compute(conn).items())
+
+
+if __name__ == '__main__':
+    import argparse
+    import os
+
+    parser = argparse.ArgumentParser(description='Check dashboard counters against the base tables')
+    parser.add_argument('database', nargs='?', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'college_portal.db'))
+    parser.add_argument('--fix', action='store_true', help='rebuild the counters if they drifted')
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.database)
+    drift = check(conn)
+    for key, (stored, actual) in sorted(drift.items()):
+        print(f'{key}: stored {stored}, actual {actual}')
+    if not drift:
+        print('All counters are consistent.')
+    elif args.fix:
+        rebuild(conn)
+        conn.commit()
+        print(f'Rebuilt counters ({len(drift)} were off).')
+    conn.close()
+    raise SystemExit(1 if drift and not args.fix else 0)
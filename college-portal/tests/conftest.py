@@ -0,0 +1,31 @@
+# Run from college-portal/: python -m pytest -q
+import pytest
+
+from benchmarks.common import fresh_app, raw_connection
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = fresh_app(str(tmp_path))
+    yield app
+    hub = app.extensions.pop('notification_hub', None)
+    if hub is not None:
+        hub.close()
+    runner = app.extensions.pop('job_runner', None)
+    if runner is not None:
+        runner.shutdown()
+    pool = app.extensions.pop('db_pool', None)
+    if pool is not None:
+        pool.close_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def conn(app):
+    conn = raw_connection()
+    yield conn
+    conn.close()
@@ -0,0 +1,41 @@
+from benchmarks.common import login
+
+
+def test_mark_attendance_requires_class_id(client, conn):
+    login(client, 2, 'faculty')
+    data = client.post('/api/mark_attendance', json={'date': '2024-01-08', 'period': 1,
+                                                      'attendance': {'4': 'present'}}).get_json()
+    assert not data['success'] and data['message'] == 'Class not found'
+    assert conn.execute("SELECT COUNT(*) FROM attendance WHERE date = '2024-01-08'").fetchone()[0] == 0
+
+
+def test_mark_attendance_rejects_another_facultys_class(client, conn):
+    login(client, 2, 'faculty')
+    data = client.post('/api/mark_attendance', json={'class_id': 2, 'date': '2024-01-08', 'period': 1,
+                                                      'attendance': {'5': 'present'}}).get_json()
+    assert not data['success']
+    assert conn.execute("SELECT COUNT(*) FROM attendance WHERE date = '2024-01-08'").fetchone()[0] == 0
+
+
+def test_mark_attendance_for_a_session(client, conn):
+    login(client, 2, 'faculty')
+    # Student 4 and 5 are enrolled in Mathematics, the admin (1) is not
+    data = client.post('/api/mark_attendance', json={'class_id': 1, 'date': '2024-01-08', 'period': 2,
+                                                      'attendance': {'4': 'present', '5': 'absent', '1': 'present'}}).get_json()
+    assert data['success']
+    assert (data['inserted'], data['skipped']) == (2, 1)
+    rows = conn.execute('SELECT student_id, status FROM attendance WHERE class_id = 1 AND date = ? AND period = 2',
+                        ('2024-01-08',)).fetchall()
+    assert sorted(map(tuple, rows)) == [(4, 'present'), (5, 'absent')]
+    assert conn.execute("SELECT COUNT(*) FROM attendance_sessions WHERE class_id = 1 AND date = '2024-01-08'").fetchone()[0] == 1
+
+    again = client.post('/api/mark_attendance', json={'class_id': 1, 'date': '2024-01-08', 'period': 2,
+                                                       'attendance': {'4': 'present', '5': 'present'}}).get_json()
+    assert (again['unchanged'], again['updated']) == (1, 1)
+
+
+def test_faculty_dashboard_exposes_the_session_to_save_attendance(client):
+    login(client, 2, 'faculty')
+    page = client.get('/faculty/dashboard?class_id=1&date=2024-01-08&period=3').get_data(as_text=True)
+    assert 'data-class-id="1" data-date="2024-01-08" data-period="3"' in page
+    assert client.get('/static/js/faculty_dashboard.js').status_code == 200
@@ -0,0 +1,30 @@
+import cache
+import serve
+
+
+def test_sqlite_backend_invalidates_across_instances(tmp_path):
+    path = str(tmp_path / 'fragments.db')
+    # Two workers' caches over the same file
+    first = cache.FragmentCache(cache.SQLiteBackend(path, 100), 300)
+    second = cache.FragmentCache(cache.SQLiteBackend(path, 100), 300)
+    first.fragment('profile:4', ['user:4'], lambda: 'old')
+    assert second.fragment('profile:4', ['user:4'], lambda: 'new') == 'old'
+
+    second.invalidate('user:4')
+
+    assert first.fragment('profile:4', ['user:4'], lambda: 'new') == 'new'
+
+
+def test_prefork_switches_memory_cache_to_sqlite(app, tmp_path):
+    app.config['FRAGMENT_CACHE_DATABASE'] = str(tmp_path / 'fragments.db')
+    assert isinstance(cache.get_cache(app).backend, cache.MemoryBackend)
+
+    serve.share_fragment_cache(app)
+
+    assert isinstance(cache.get_cache(app).backend, cache.SQLiteBackend)
+
+
+def test_prefork_keeps_a_disabled_cache(app):
+    app.config['FRAGMENT_CACHE_BACKEND'] = 'none'
+    serve.share_fragment_cache(app)
+    assert cache.get_cache(app).backend is None
@@ -0,0 +1,18 @@
+from benchmarks.common import login
+
+
+def change(client, method, body):
+    return client.open('/api/classes/2/enrollment', method=method, json=body).get_json()
+
+
+def test_changed_counts_enrollment_rows_only(client, conn):
+    # Enrollment triggers also write catalog_versions; those rows are not counted
+    login(client, 1, 'admin')
+
+    assert change(client, 'POST', {'student_ids': [4]})['changed'] == 1
+    assert change(client, 'POST', {'student_ids': [4, 5]})['changed'] == 0
+    assert change(client, 'DELETE', {'student_ids': [4]})['changed'] == 1
+    assert change(client, 'DELETE', {'student_ids': [4]})['changed'] == 0
+    # Student 4 is the only one in Computer Science / A
+    assert change(client, 'POST', {'department': 'Computer Science', 'section': 'A'})['changed'] == 1
+    assert conn.execute('SELECT COUNT(*) FROM enrollments WHERE class_id = 2').fetchone()[0] == 2
@@ -0,0 +1,59 @@
+import io
+import sqlite3
+
+import importer
+
+HEADER = 'RollNo,Name,Email Id,Section,Dept,Password\r\n'
+
+
+def sheet(count, start=0):
+    body = ''.join(f'R{i:05d},Student {i},s{i}@college.edu,A,Computer Science,pw{i}\r\n'
+                   for i in range(start, start + count))
+    return io.BytesIO((HEADER + body).encode())
+
+
+def test_chunks_are_hashed_outside_the_write_lock(app, conn):
+    other = sqlite3.connect(app.config['DATABASE'], timeout=0)
+    writes = []
+
+    def hash_passwords(values):
+        # Another writer must get in while every chunk is being hashed
+        other.execute("UPDATE classes SET schedule = schedule WHERE id = 1")
+        other.commit()
+        writes.append(len(values))
+        return ['hashed-' + value for value in values]
+
+    def checkpoint(processed, result):
+        conn.commit()
+
+    result = importer.import_users(conn, importer.iter_rows(sheet(25), 'students.csv'), importer.STUDENTS,
+                                   chunk_size=10, hash_passwords=hash_passwords, checkpoint=checkpoint)
+    other.close()
+
+    assert writes == [10, 10, 5]
+    assert result['success_count'] == 25
+    assert conn.execute("SELECT password FROM users WHERE username = 'R00003'").fetchone()[0] == 'hashed-pw3'
+
+
+def test_resume_skips_rows_already_committed(conn):
+    first = importer.import_users(conn, importer.iter_rows(sheet(10), 'students.csv'), importer.STUDENTS)
+    conn.commit()
+    resume = {key: first[key] for key in ('rows_processed', 'success_count', 'error_count')}
+
+    result = importer.import_users(conn, importer.iter_rows(sheet(15), 'students.csv'), importer.STUDENTS,
+                                   resume=resume)
+
+    assert result['success_count'] == 15 and result['errors'] == []
+    assert conn.execute("SELECT COUNT(*) FROM users WHERE username LIKE 'R%'").fetchone()[0] == 15
+
+
+def test_rows_with_empty_required_cells_are_reported(conn, tmp_path):
+    body = HEADER + 'R1,Ann,a@college.edu,A,Computer Science,pw\r\nR2,Bob,,A,Computer Science,pw\r\n'
+    result = importer.import_users(conn, importer.iter_rows(io.BytesIO(body.encode()), 'students.csv'),
+                                   importer.STUDENTS)
+
+    assert result['success_count'] == 1
+    assert result['errors'] == [(3, 'R2', 'Empty value for email; fill in every required column '
+                                          'and upload the row again')]
+    report = importer.write_error_report(result['errors'], str(tmp_path))
+    assert 'Empty value for email' in (tmp_path / report).read_text()
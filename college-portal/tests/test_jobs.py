@@ -0,0 +1,71 @@
+import subprocess
+import sys
+import time
+
+import importer
+import jobs
+
+HEADER = 'RollNo,Name,Email Id,Section,Dept,Password\r\n'
+
+
+def write_sheet(path, count):
+    with open(path, 'w', newline='') as sheet:
+        sheet.write(HEADER + ''.join(f'J{i:04d},Student {i},j{i}@college.edu,A,Computer Science,pw{i}\r\n'
+                                     for i in range(count)))
+
+
+def dead_pid():
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+
+def add_job(conn, path, pid, **counts):
+    conn.execute('''INSERT INTO jobs (id, kind, status, path, filename, created_by, worker_pid,
+                                      rows_processed, success_count, error_count)
+                    VALUES ('orphan', 'students', 'running', ?, 'students.csv', 1, ?, ?, ?, ?)''',
+                 (path, pid, counts.get('rows_processed', 0), counts.get('success_count', 0),
+                  counts.get('error_count', 0)))
+    conn.commit()
+
+
+def wait_done(runner, job_id):
+    for _ in range(200):
+        job = runner.status(job_id)
+        if job['status'] not in ('queued', 'running'):
+            return job
+        time.sleep(0.05)
+    raise AssertionError('job did not finish')
+
+
+def test_orphaned_job_resumes_after_its_last_chunk(app, conn, tmp_path):
+    app.config['PASSWORD_SCRYPT_N'] = 16
+    path = str(tmp_path / 'students.csv')
+    write_sheet(path, 30)
+    # The dead worker had committed the first 10 rows and their checkpoint
+    with open(path, 'rb') as sheet:
+        rows = list(importer.iter_rows(sheet, path))
+    importer.import_users(conn, rows[:11], importer.STUDENTS)
+    add_job(conn, path, dead_pid(), rows_processed=10, success_count=10)
+
+    runner = jobs.get_runner(app)
+    runner.recover()
+    job = wait_done(runner, 'orphan')
+
+    assert job['status'] == 'done'
+    assert (job['rows_processed'], job['success_count'], job['error_count']) == (30, 30, 0)
+    assert conn.execute("SELECT COUNT(*) FROM users WHERE username LIKE 'J%'").fetchone()[0] == 30
+
+
+def test_job_of_a_live_worker_is_left_alone(app, conn, tmp_path):
+    path = str(tmp_path / 'students.csv')
+    write_sheet(path, 3)
+    worker = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(30)'])
+    try:
+        add_job(conn, path, worker.pid)
+        jobs.get_runner(app).recover()
+        row = conn.execute("SELECT status, worker_pid FROM jobs WHERE id = 'orphan'").fetchone()
+        assert tuple(row) == ('running', worker.pid)
+    finally:
+        worker.kill()
+        worker.wait()
@@ -0,0 +1,32 @@
+import pytest
+
+
+@pytest.fixture
+def limited(app):
+    app.config.update(PASSWORD_SCRYPT_N=16, LOGIN_USER_BURST=3, LOGIN_USER_RATE=1e-6, LOGIN_IP_BURST=1000)
+    return app
+
+
+def attempt(client, username, password='wrong'):
+    response = client.post('/login', data={'username': username, 'password': password, 'role': 'student'})
+    if response.status_code == 429:
+        return 'throttled'
+    return 'dashboard' if response.headers['Location'].endswith('/student/dashboard') else 'refused'
+
+
+def test_username_variants_share_the_throttle(limited, client):
+    for _ in range(3):
+        assert attempt(client, 'student1') == 'refused'
+    assert attempt(client, 'student1') == 'throttled'
+
+    for variant in ('student1 ', ' student1', 'student1  ', 'STUDENT1', ' Student1\t'):
+        assert attempt(client, variant) == 'throttled'
+        assert attempt(client, variant, 'student123') == 'throttled'
+
+
+def test_successful_login_resets_every_variant(limited, client):
+    for _ in range(2):
+        attempt(client, ' Student1')
+    assert attempt(client, 'student1 ', 'student123') == 'dashboard'
+    for _ in range(3):
+        assert attempt(client, 'STUDENT1') == 'refused'
@@ -0,0 +1,15 @@
+from benchmarks.common import fresh_app, login
+
+
+def test_metrics_require_an_admin_session(tmp_path):
+    app = fresh_app(str(tmp_path), INSTRUMENTATION_ENABLED=True)
+    client = app.test_client()
+    client.get('/')
+    assert client.get('/metrics').status_code == 401
+    login(client, 4, 'student')
+    assert client.get('/metrics').status_code == 401
+
+    login(client, 1, 'admin')
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert b'# TYPE' in response.data
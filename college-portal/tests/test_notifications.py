@@ -0,0 +1,82 @@
+import re
+import threading
+import time
+
+import pytest
+
+import notifications
+import stats
+from benchmarks.common import login
+
+
+def test_row_committed_while_dispatcher_starts_is_delivered(app, conn):
+    hub = notifications.get_hub(app)
+    # Hold the dispatcher thread until a row has been committed after the
+    # first stream subscribed
+    started = threading.Event()
+    dispatch = hub._dispatch
+
+    def delayed(*args):
+        started.wait(5)
+        dispatch(*args)
+
+    hub._dispatch = delayed
+    subscriber = hub.subscribe(4)
+    notifications.publish(conn, 4, 'permission', {'id': 1})
+    conn.commit()
+    started.set()
+    hub.wake()
+
+    event_id, kind, data = subscriber.events.get(timeout=5)
+    assert kind == 'permission' and data == '{"id":1}'
+    hub.close()
+
+
+def test_stream_replays_then_skips_duplicates(app, conn):
+    hub = notifications.get_hub(app)
+    subscriber = hub.subscribe(4)
+    notifications.publish_many(conn, [(4, 'permission', {'n': n}) for n in range(3)])
+    conn.commit()
+    backlog = [tuple(row) for row in notifications.replay(conn, 4, 0, 10)]
+    # The dispatcher also delivers the same rows live
+    hub.wake()
+    deadline = time.monotonic() + 5
+    while subscriber.events.qsize() < len(backlog) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    subscriber.events.put(notifications._CLOSED)
+
+    body = ''.join(hub.stream(subscriber, backlog))
+    assert [line for line in body.splitlines() if line.startswith('id: ')] == [f'id: {row[0]}' for row in backlog]
+    hub.close()
+
+
+def test_stream_requires_login(client):
+    assert client.get('/api/notifications/stream').status_code == 401
+
+
+def since(page):
+    return int(re.search(r'/api/notifications/stream\?since=(\d+)', page).group(1))
+
+
+@pytest.mark.parametrize('user_id, role, path, counts', [
+    (4, 'student', '/student/dashboard', 'student_counts'),
+    (2, 'faculty', '/faculty/dashboard', 'faculty_counts'),
+])
+def test_dashboard_stream_starts_before_the_page_was_read(client, conn, monkeypatch, user_id, role, path, counts):
+    # A notification committed while the page is being built must come
+    # after the page's starting id, so the stream delivers it
+    published = []
+    original = getattr(stats, counts)
+
+    def counts_then_publish(*args, **kwargs):
+        result = original(*args, **kwargs)
+        notifications.publish(conn, user_id, 'permission', {'id': 1})
+        conn.commit()
+        published.append(notifications.latest_id(conn, user_id))
+        return result
+
+    monkeypatch.setattr(stats, counts, counts_then_publish)
+    login(client, user_id, role)
+    page = client.get(path).get_data(as_text=True)
+
+    assert published and since(page) < published[0]
@@ -0,0 +1,100 @@
+from benchmarks.common import login
+
+
+def add_permission(conn, student_id, faculty_id, status='pending', date='2030-01-01'):
+    permission_id = conn.execute('INSERT INTO permissions (student_id, faculty_id, date, reason, status) VALUES (?, ?, ?, ?, ?)',
+                                 (student_id, faculty_id, date, 'test', status)).lastrowid
+    conn.commit()
+    return permission_id
+
+
+
+def test_only_the_requested_faculty_can_decide(client, conn):
+    # Permission 1 was made to faculty 2
+    login(client, 3, 'faculty')
+    response = client.post('/api/update_permission_status', json={'permission_id': 1, 'status': 'approved'})
+    assert response.status_code == 404 and not response.get_json()['success']
+    assert conn.execute('SELECT status FROM permissions WHERE id = 1').fetchone()[0] == 'pending'
+
+    login(client, 2, 'faculty')
+    response = client.post('/api/update_permission_status', json={'permission_id': 1, 'status': 'approved'})
+    assert response.get_json()['success']
+    assert conn.execute('SELECT status FROM permissions WHERE id = 1').fetchone()[0] == 'approved'
+
+def test_batch_reports_a_result_per_id(client, conn):
+    mine = add_permission(conn, 4, 2)
+    decided = add_permission(conn, 5, 2, status='approved')
+    other = add_permission(conn, 5, 3)
+    login(client, 2, 'faculty')
+
+    response = client.post('/api/permissions/batch', json={'updates': [
+        {'id': mine, 'status': 'approved'},
+        {'id': decided, 'status': 'approved'},
+        {'id': other, 'status': 'approved'},
+        {'id': 99999, 'status': 'approved'},
+        {'id': 1, 'status': 'maybe'},
+    ]})
+
+    data = response.get_json()
+    assert data['success'] and data['updated'] == 1
+    assert data['results'] == {str(mine): 'updated', str(decided): 'unchanged', str(other): 'forbidden',
+                               '99999': 'not_found', '1': 'invalid_status'}
+    statuses = dict(conn.execute('SELECT id, status FROM permissions').fetchall())
+    assert statuses[mine] == 'approved'
+    assert statuses[other] == 'pending'
+    assert statuses[1] == 'pending'
+
+
+def test_batch_by_filter_only_touches_matching_rows(client, conn):
+    on_date = [add_permission(conn, 4, 2, date='2030-02-01') for _ in range(3)]
+    other_date = add_permission(conn, 4, 2, date='2030-02-02')
+    login(client, 2, 'faculty')
+
+    data = client.post('/api/permissions/batch', json={'filter': {'status': 'pending', 'date': '2030-02-01'},
+                                                       'status': 'rejected'}).get_json()
+
+    assert data['updated'] == 3
+    assert sorted(int(permission_id) for permission_id in data['results']) == on_date
+    assert conn.execute('SELECT status FROM permissions WHERE id = ?', (other_date,)).fetchone()[0] == 'pending'
+
+
+def test_batch_requires_faculty(client):
+    login(client, 4, 'student')
+    data = client.post('/api/permissions/batch', json={'updates': [{'id': 1, 'status': 'approved'}]}).get_json()
+    assert not data['success']
+
+
+def walk_queue(client, **params):
+    pages, cursor = [], None
+    while True:
+        query = dict(params, **({'cursor': cursor} if cursor else {}))
+        data = client.get('/api/permissions/queue', query_string=query).get_json()
+        pages.append([permission['id'] for permission in data['permissions']])
+        cursor = data['next_cursor']
+        if not cursor:
+            return pages
+
+
+def test_queue_pages_end_exactly_on_a_full_page(client, conn):
+    # Permission 1 (seed) plus 5 more: two full pages of 3, no empty third
+    added = [add_permission(conn, 4, 2) for _ in range(5)]
+    login(client, 2, 'faculty')
+
+    assert walk_queue(client, limit=3) == [[1] + added[:2], added[2:]]
+
+
+def test_queue_pages_with_a_status_filter_skip_nothing(client, conn):
+    ids = [add_permission(conn, 4, 2, status='approved' if n % 2 else 'pending') for n in range(7)]
+    add_permission(conn, 5, 3)
+    login(client, 2, 'faculty')
+
+    pending = [1] + [permission_id for n, permission_id in enumerate(ids) if not n % 2]
+    pages = walk_queue(client, status='pending', limit=2)
+    assert [permission_id for page in pages for permission_id in page] == pending
+    assert all(len(page) == 2 for page in pages[:-1])
+
+
+def test_queue_rejects_bad_cursor_and_status(client):
+    login(client, 2, 'faculty')
+    assert client.get('/api/permissions/queue?cursor=abc').status_code == 400
+    assert client.get('/api/permissions/queue?status=maybe').status_code == 400
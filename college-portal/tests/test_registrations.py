@@ -0,0 +1,137 @@
+import sqlite3
+
+import pytest
+
+import registrations
+from benchmarks.common import login, seed_students
+
+
+@pytest.fixture
+def event(conn):
+    event_id = conn.execute("INSERT INTO events (name, date, capacity) VALUES ('Hackathon', '2030-01-01', 2)").lastrowid
+    conn.commit()
+    return event_id
+
+
+@pytest.fixture
+def students(conn):
+    return seed_students(6)
+
+
+def waitlist(conn, event_id):
+    return [row[0] for row in conn.execute('SELECT student_id FROM event_waitlist WHERE event_id = ? ORDER BY id',
+                                           (event_id,))]
+
+
+def seated(conn, event_id):
+    return {row[0] for row in conn.execute('SELECT student_id FROM student_events WHERE event_id = ?', (event_id,))}
+
+
+def test_seats_then_waitlist_in_arrival_order(conn, event, students):
+    results = [registrations.register(conn, event, student) for student in students[:5]]
+
+    assert [result['status'] for result in results] == ['registered'] * 2 + ['waitlisted'] * 3
+    assert [result['position'] for result in results[2:]] == [1, 2, 3]
+    assert seated(conn, event) == set(students[:2])
+    assert waitlist(conn, event) == students[2:5]
+    assert registrations.check(conn) == []
+
+
+def test_registering_twice_changes_nothing(conn, event, students):
+    for student in students[:4]:
+        registrations.register(conn, event, student)
+
+    assert registrations.register(conn, event, students[0]) == {'status': 'already_registered'}
+    assert registrations.register(conn, event, students[3]) == {'status': 'already_waitlisted', 'position': 2}
+    assert waitlist(conn, event) == students[2:4]
+    assert registrations.check(conn) == []
+
+
+def test_freed_seats_go_to_the_head_of_the_waitlist(conn, event, students):
+    for student in students[:6]:
+        registrations.register(conn, event, student)
+
+    # Leaving the waitlist moves everyone behind up a place
+    assert registrations.cancel(conn, event, students[3])['status'] == 'left_waitlist'
+    assert registrations.register(conn, event, students[3])['position'] == 4
+
+    assert registrations.cancel(conn, event, students[0]) == {'status': 'cancelled', 'promoted': [students[2]]}
+    assert registrations.cancel(conn, event, students[1]) == {'status': 'cancelled', 'promoted': [students[4]]}
+    assert seated(conn, event) == {students[2], students[4]}
+    assert waitlist(conn, event) == [students[5], students[3]]
+    assert registrations.cancel(conn, event, students[0])['status'] == 'not_registered'
+    assert registrations.check(conn) == []
+
+
+def test_capacity_changes(conn, event, students):
+    for student in students[:5]:
+        registrations.register(conn, event, student)
+
+    assert registrations.set_capacity(conn, event, 4) == students[2:4]
+    assert waitlist(conn, event) == [students[4]]
+    # Lowering the capacity keeps the seats already taken
+    assert registrations.set_capacity(conn, event, 1) == []
+    assert seated(conn, event) == set(students[:4])
+    assert registrations.register(conn, event, students[5])['position'] == 2
+    # Unlimited seats everyone
+    assert registrations.set_capacity(conn, event, None) == [students[4], students[5]]
+    assert registrations.check(conn) == []
+
+
+def test_register_route(client, event, students):
+    login(client, students[0], 'student')
+    assert client.post(f'/api/events/{event}/register').get_json()['status'] == 'registered'
+    assert client.post('/api/events/99999/register').status_code == 404
+    login(client, 2, 'faculty')
+    assert not client.post(f'/api/events/{event}/register').get_json()['success']
+
+
+def hold_write_lock(app):
+    other = sqlite3.connect(app.config['DATABASE'])
+    other.execute('BEGIN IMMEDIATE')
+    return other
+
+
+def test_deleting_a_student_promotes_in_the_same_transaction(app, client, conn, event, students):
+    for student in students[:3]:
+        registrations.register(conn, event, student)
+    login(client, 1, 'admin')
+
+    app.config['SQLITE_BUSY_TIMEOUT'] = 50
+    app.extensions.pop('db_pool', None)
+    other = hold_write_lock(app)
+    try:
+        response = client.delete(f'/api/delete_user/{students[0]}')
+    finally:
+        other.rollback()
+        other.close()
+    # Busy: neither the delete nor a promotion happened
+    assert response.status_code == 503
+    assert seated(conn, event) == set(students[:2])
+
+    assert client.delete(f'/api/delete_user/{students[0]}').get_json()['success']
+    assert seated(conn, event) == {students[1], students[2]}
+    assert waitlist(conn, event) == []
+    assert registrations.check(conn) == []
+
+
+def test_event_update_and_capacity_commit_together(app, client, conn, event, students):
+    for student in students[:3]:
+        registrations.register(conn, event, student)
+    login(client, 1, 'admin')
+    body = {'name': 'Renamed', 'date': '2030-01-01', 'capacity': 3}
+
+    app.config['SQLITE_BUSY_TIMEOUT'] = 50
+    app.extensions.pop('db_pool', None)
+    other = hold_write_lock(app)
+    try:
+        response = client.put(f'/api/update_event/{event}', json=body)
+    finally:
+        other.rollback()
+        other.close()
+    assert response.status_code == 503
+    assert tuple(conn.execute('SELECT name, capacity FROM events WHERE id = ?', (event,)).fetchone()) == ('Hackathon', 2)
+
+    assert client.put(f'/api/update_event/{event}', json=body).get_json()['promoted'] == 1
+    assert tuple(conn.execute('SELECT name, capacity FROM events WHERE id = ?', (event,)).fetchone()) == ('Renamed', 3)
+    assert registrations.check(conn) == []
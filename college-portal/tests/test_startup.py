@@ -0,0 +1,37 @@
+import os
+
+import app as portal
+import cache
+import database
+
+
+def test_warmup_commits_the_routing_rebuild(app, conn):
+    conn.execute("UPDATE catalog_versions SET version = version + 1 WHERE name = 'routing_inputs'")
+    conn.commit()
+    app.extensions.pop('permission_router', None)
+
+    portal.warmup()
+
+    versions = dict(conn.execute("SELECT name, version FROM catalog_versions "
+                                 "WHERE name IN ('routing_inputs', 'permission_routes')").fetchall())
+    assert versions['permission_routes'] == versions['routing_inputs']
+    # Nothing left holding the write lock
+    conn.execute('BEGIN IMMEDIATE')
+    conn.rollback()
+
+
+def test_default_paths_do_not_depend_on_the_working_directory():
+    here = os.path.dirname(os.path.abspath(portal.__file__))
+    assert database.DEFAULT_CONFIG['DATABASE'] == os.path.join(here, 'college_portal.db')
+    assert cache.DEFAULT_CONFIG['FRAGMENT_CACHE_DATABASE'] == os.path.join(here, 'fragment_cache.db')
+
+
+def test_create_app_resolves_relative_paths_against_the_app(monkeypatch):
+    saved = dict(portal.app.config)
+    monkeypatch.setenv('PORTAL_FRAGMENT_CACHE_DATABASE', 'cache/fragments.db')
+    try:
+        configured = portal.create_app()
+        assert configured.config['FRAGMENT_CACHE_DATABASE'] == os.path.join(portal.app.root_path, 'cache', 'fragments.db')
+    finally:
+        portal.app.config.clear()
+        portal.app.config.update(saved)
@@ -0,0 +1,45 @@
+from datetime import datetime
+
+import pytest
+
+import timetable
+
+MON, TUE, WED, THU, FRI, SAT, SUN = range(7)
+NINE_TO_TEN = (9 * 60, 10 * 60)
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('Mon, Wed 9:00-10:00', [(MON, *NINE_TO_TEN), (WED, *NINE_TO_TEN)]),
+    ('Mon-Fri 9-10', [(day, *NINE_TO_TEN) for day in range(MON, SAT)]),
+    ('Tue/Thu 2-3pm', [(TUE, 840, 900), (THU, 840, 900)]),
+    ('MWF 9-10', [(MON, *NINE_TO_TEN), (WED, *NINE_TO_TEN), (FRI, *NINE_TO_TEN)]),
+    ('M W F 9-10', [(MON, *NINE_TO_TEN), (WED, *NINE_TO_TEN), (FRI, *NINE_TO_TEN)]),
+    ('TTh 14:00-15:30', [(TUE, 840, 930), (THU, 840, 930)]),
+    ('TR 11-12', [(TUE, 660, 720), (THU, 660, 720)]),
+    ('MTWThF 8-9', [(day, 480, 540) for day in range(MON, SAT)]),
+    ('M-F 9-10', [(day, *NINE_TO_TEN) for day in range(MON, SAT)]),
+    ('SaSu 10-12', [(SAT, 600, 720), (SUN, 600, 720)]),
+    ('MWF 9-10; TTh 2-3pm', [(MON, *NINE_TO_TEN), (TUE, 840, 900), (WED, *NINE_TO_TEN),
+                             (THU, 840, 900), (FRI, *NINE_TO_TEN)]),
+    # Letters are only read as days when no day name is present
+    ('Mon 9-10 Room W', [(MON, *NINE_TO_TEN)]),
+    ('Mon 9-10; 11-12', [(MON, *NINE_TO_TEN), (MON, 660, 720)]),
+    ('11-1pm Fri', [(FRI, 660, 780)]),
+    ('Lab 9-10', []),
+    ('TBA', []),
+    ('', []),
+    (None, []),
+])
+def test_parse_schedule(text, expected):
+    assert timetable.parse_schedule(text) == expected
+
+
+def test_compact_schedule_reaches_the_timetable(conn):
+    conn.execute("UPDATE classes SET schedule = 'MWF 9-10' WHERE id = 1")
+    conn.commit()
+
+    compiled = timetable.load(conn)
+    # 2030-01-02 is a Wednesday
+    now = compiled.now(compiled.scope(faculty_id=2), datetime(2030, 1, 2, 9, 30))
+    assert [slot['day'] for slot in now['current']] == ['Wed']
+    assert [day['day'] for day in compiled.week(compiled.scope(faculty_id=2)) if day['slots']] == ['Mon', 'Wed', 'Fri']
@@ -0,0 +1,51 @@
+from benchmarks.common import login
+
+
+def walk_users(client, **params):
+    pages, cursor = [], None
+    while True:
+        query = dict(params, **({'cursor': cursor} if cursor else {}))
+        data = client.get('/api/users', query_string=query).get_json()
+        pages.append([user['id'] for user in data['users']])
+        cursor = data['next_cursor']
+        if not cursor:
+            return pages
+
+
+def add_user(conn, username, role, name, rollno=None, department='Computer Science'):
+    user_id = conn.execute('INSERT INTO users (username, password, role, name, rollno, department) VALUES (?, ?, ?, ?, ?, ?)',
+                           (username, 'x', role, name, rollno, department)).lastrowid
+    conn.commit()
+    return user_id
+
+
+def test_ties_on_the_sort_key_split_across_pages(client, conn):
+    # Faculty sort by name; id breaks the tie between the three Smiths
+    smiths = [add_user(conn, f'smith{n}', 'faculty', 'A. Smith') for n in range(3)]
+    login(client, 1, 'admin')
+
+    pages = walk_users(client, role='faculty', limit=2)
+
+    ids = [user_id for page in pages for user_id in page]
+    assert ids[:3] == smiths
+    assert len(ids) == len(set(ids)) == conn.execute("SELECT COUNT(*) FROM users WHERE role = 'faculty'").fetchone()[0]
+
+
+def test_students_without_roll_number_page_first(client, conn):
+    missing = [add_user(conn, f'new{n}', 'student', f'New {n}') for n in range(3)]
+    login(client, 1, 'admin')
+
+    pages = walk_users(client, role='student', limit=2)
+
+    assert pages == [missing[:2], [missing[2], 4], [5]]
+
+
+def test_last_page_full_has_no_cursor(client, conn):
+    login(client, 1, 'admin')
+    assert walk_users(client, role='student', limit=2) == [[4, 5]]
+    assert walk_users(client, role='student', department='Electronics', limit=1) == [[5]]
+
+
+def test_bad_cursor_is_rejected(client):
+    login(client, 1, 'admin')
+    assert client.get('/api/users?cursor=not-a-cursor').status_code == 400
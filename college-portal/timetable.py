@@ -0,0 +1,307 @@
+import bisect
+import re
+import threading
+from collections import namedtuple
+from datetime import datetime
+
+# Weekly timetable compiled from the free-text classes.schedule column
+# ('Mon, Wed 9:00-10:00', 'Tue/Thu 2-3pm; Fri 10:30-11:30', 'MWF 9-10', ...). Each
+# schedule is parsed into slots, and every weekday gets an interval index
+# over all classes plus one per faculty and per department/section, so "what
+# is on now" and "this week" are lookups rather than scans. Triggers
+# (installed by migration 14) bump the 'timetable' version when classes,
+# enrollments or student sections change; readers reload on the next lookup.
+
+DAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+
+_DAY_NAMES = {
+    'mon': 0, 'monday': 0, 'tue': 1, 'tues': 1, 'tuesday': 1, 'wed': 2, 'weds': 2, 'wednesday': 2,
+    'thu': 3, 'thur': 3, 'thurs': 3, 'thursday': 3, 'fri': 4, 'friday': 4,
+    'sat': 5, 'saturday': 5, 'sun': 6, 'sunday': 6,
+}
+_TIME_RANGE = re.compile(r'\b(\d{1,2})(?:[:.](\d{2}))?\s*(?:([ap])\.?m\b\.?)?\s*(?:-|–|—|\bto\b)\s*'
+                         r'(\d{1,2})(?:[:.](\d{2}))?\s*(?:([ap])\.?m\b\.?)?', re.IGNORECASE)
+_DAY_TOKENS = re.compile(r'[a-z]+|-|–', re.IGNORECASE)
+# Single-letter abbreviations run together: 'MWF', 'TTh', 'TR', 'M-F'
+_LETTER_NAMES = {'m': 0, 't': 1, 'tu': 1, 'w': 2, 'r': 3, 'th': 3, 'f': 4, 's': 5, 'sa': 5, 'su': 6, 'u': 6}
+_LETTER = re.compile(r'th|tu|sa|su|[mtwrfsu]', re.IGNORECASE)
+_LETTER_WORD = re.compile(r'(?:th|tu|sa|su|[mtwrfsu])+', re.IGNORECASE)
+
+TRIGGERS = [
+    '''CREATE TRIGGER IF NOT EXISTS timetable_classes_insert AFTER INSERT ON classes BEGIN
+           UPDATE catalog_versions SET version = version + 1 WHERE name = 'timetable';
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS timetable_classes_delete AFTER DELETE ON classes BEGIN
+           UPDATE catalog_versions SET version = version + 1 WHERE name = 'timetable';
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS timetable_classes_update AFTER UPDATE OF name, faculty_id, schedule, room ON classes BEGIN
+           UPDATE catalog_versions SET version = version + 1 WHERE name = 'timetable';
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS timetable_enrollments_insert AFTER INSERT ON enrollments BEGIN
+           UPDATE catalog_versions SET version = version + 1 WHERE name = 'timetable';
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS timetable_enrollments_delete AFTER DELETE ON enrollments BEGIN
+           UPDATE catalog_versions SET version = version + 1 WHERE name = 'timetable';
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS timetable_student_section AFTER UPDATE OF department, section ON users
+       WHEN NEW.role = 'student' BEGIN
+           UPDATE catalog_versions SET version = version + 1 WHERE name = 'timetable';
+       END''',
+]
+
+
+def install(conn):
+    conn.execute("INSERT OR IGNORE INTO catalog_versions (name, version) VALUES ('timetable', 1)")
+    for trigger in TRIGGERS:
+        conn.execute(trigger)
+
+
+def current_version(conn):
+    row = conn.execute("SELECT version FROM catalog_versions WHERE name = 'timetable'").fetchone()
+    return row[0] if row else None
+
+
+def _minutes(hour, minute, suffix):
+    hour, minute = int(hour), int(minute or 0)
+    if suffix:
+        hour = hour % 12 + (12 if suffix.lower() == 'p' else 0)
+    return hour * 60 + minute
+
+
+def _parse_days(text):
+    days = []
+    tokens = _DAY_TOKENS.findall(text)
+    names = _DAY_NAMES
+    if not any(token.lower() in _DAY_NAMES for token in tokens):
+        # Only without any day names, so 'Mon 9-10 Room W' stays Monday
+        tokens = [letter for token in tokens
+                  for letter in (_LETTER.findall(token) if _LETTER_WORD.fullmatch(token) else [token])]
+        names = _LETTER_NAMES
+    for index, token in enumerate(tokens):
+        day = names.get(token.lower())
+        if day is None:
+            continue
+        # 'Mon-Fri' / 'Mon to Fri'
+        if index >= 2 and tokens[index - 1].lower() in ('-', '–', 'to') and days:
+            start = days[-1]
+            days.extend(range(start + 1, day + 1) if day > start else ())
+        elif day not in days:
+            days.append(day)
+    return days
+
+
+def parse_schedule(text):
+    # List of (weekday, start minute, end minute). Parts are separated by ';'
+    # and a part without days reuses the previous part's. Times are 24-hour
+    # unless marked am/pm; unmarked hours 1-6 are taken as afternoon.
+    slots = []
+    days = []
+    for part in re.split(r'[;\n]', text or ''):
+        ranges = list(_TIME_RANGE.finditer(part))
+        if not ranges:
+            continue
+        days = _parse_days(_TIME_RANGE.sub(' ', part)) or days
+        for match in ranges:
+            start_hour, start_minute, start_suffix, end_hour, end_minute, end_suffix = match.groups()
+            if end_suffix and not start_suffix:
+                # '2-3pm', but '11-1pm' starts in the morning
+                start_suffix = end_suffix if int(start_hour) % 12 <= int(end_hour) % 12 else 'a'
+            if not start_suffix and not end_suffix:
+                start_suffix = 'p' if 1 <= int(start_hour) <= 6 else None
+                end_suffix = 'p' if 1 <= int(end_hour) <= 6 or (start_suffix and int(end_hour) < 12) else None
+            start = _minutes(start_hour, start_minute, start_suffix)
+            end = _minutes(end_hour, end_minute, end_suffix)
+            if not 0 <= start < end <= 24 * 60:
+                continue
+            slots.extend((day, start, end) for day in days)
+    return sorted(set(slots))
+
+
+Slot = namedtuple('Slot', 'class_id day start end period')
+
+
+def _clock(minutes):
+    return f'{minutes // 60:02d}:{minutes % 60:02d}'
+
+
+class DayIndex:
+    # Slots of one weekday sorted by start, plus the set of slots running in
+    # each interval between consecutive start/end times
+    def __init__(self, slots):
+        self.slots = sorted(slots, key=lambda slot: (slot.start, slot.end, slot.class_id))
+        self.starts = [slot.start for slot in self.slots]
+        self.bounds = sorted({slot.start for slot in self.slots} | {slot.end for slot in self.slots})
+        self.running = []
+        running = []
+        starting = 0
+        for bound in self.bounds[:-1]:
+            running = [slot for slot in running if slot.end > bound]
+            while starting < len(self.slots) and self.slots[starting].start == bound:
+                running.append(self.slots[starting])
+                starting += 1
+            self.running.append(tuple(running))
+
+    def at(self, minute):
+        index = bisect.bisect_right(self.bounds, minute) - 1
+        if 0 <= index < len(self.running):
+            return self.running[index]
+        return ()
+
+    def next_after(self, minute):
+        # Slots with the earliest start strictly after minute
+        index = bisect.bisect_right(self.starts, minute)
+        if index == len(self.slots):
+            return ()
+        first = self.starts[index]
+        return tuple(self.slots[index:bisect.bisect_right(self.starts, first)])
+
+    def last_before(self, minute):
+        # The slot that most recently ended at or before minute
+        ended = [slot for slot in self.slots[:bisect.bisect_right(self.starts, minute)] if slot.end <= minute]
+        return max(ended, key=lambda slot: slot.end) if ended else None
+
+
+_EMPTY_DAY = DayIndex([])
+
+
+class Timetable:
+    def __init__(self, version, classes, sections):
+        # classes: rows of (id, name, faculty_id, schedule, room);
+        # sections: (class_id, department, section) for enrolled students
+        self.version = version
+        self.classes = {}
+        self.unscheduled = []
+        slots_by_day = [[] for _ in DAYS]
+        self.slots_by_class = {}
+        for class_id, name, faculty_id, schedule, room in classes:
+            self.classes[class_id] = {'class_id': class_id, 'name': name, 'faculty_id': faculty_id,
+                                      'schedule': schedule, 'room': room}
+            parsed = parse_schedule(schedule)
+            if not parsed:
+                self.unscheduled.append(class_id)
+            slots = []
+            for day, start, end in parsed:
+                # A class meeting twice in a day has periods 1 and 2
+                period = 1 + sum(1 for other in slots if other.day == day)
+                slots.append(Slot(class_id, day, start, end, period))
+            self.slots_by_class[class_id] = slots
+            for slot in slots:
+                slots_by_day[slot.day].append(slot)
+        self.days = [DayIndex(slots) for slots in slots_by_day]
+
+        by_faculty = {}
+        for class_id, info in self.classes.items():
+            by_faculty.setdefault(info['faculty_id'], []).append(class_id)
+        by_section = {}
+        for class_id, department, section in sections:
+            if class_id in self.classes:
+                by_section.setdefault((department or '', section or ''), []).append(class_id)
+        self.faculty = {key: self._index(ids) for key, ids in by_faculty.items()}
+        self.sections = {key: self._index(ids) for key, ids in by_section.items()}
+        self._described = {}
+        self._cached = {}
+        self._lock = threading.Lock()
+
+    def _index(self, class_ids):
+        slots_by_day = [[] for _ in DAYS]
+        for class_id in class_ids:
+            for slot in self.slots_by_class.get(class_id, ()):
+                slots_by_day[slot.day].append(slot)
+        return [DayIndex(slots) if slots else _EMPTY_DAY for slots in slots_by_day]
+
+    def scope(self, faculty_id=None, section=None, class_ids=None):
+        # Per-day indexes for one faculty, one (department, section), an
+        # explicit set of classes (a student's enrollment) or everything
+        if faculty_id is not None:
+            return self.faculty.get(faculty_id) or [_EMPTY_DAY] * len(DAYS)
+        if section is not None:
+            return self.sections.get(section) or [_EMPTY_DAY] * len(DAYS)
+        if class_ids is not None:
+            return self._index(class_ids)
+        return self.days
+
+    def describe(self, slot):
+        description = self._described.get(slot)
+        if description is None:
+            info = self.classes[slot.class_id]
+            description = self._described[slot] = {**info, 'day': DAYS[slot.day], 'start': _clock(slot.start),
+                                                   'end': _clock(slot.end), 'period': slot.period}
+        return description
+
+    def now(self, days, when):
+        minute = when.hour * 60 + when.minute
+        today = days[when.weekday()]
+        return {
+            'current': [self.describe(slot) for slot in today.at(minute)],
+            'next': [self.describe(slot) for slot in today.next_after(minute)],
+        }
+
+    def week(self, days):
+        return [{'day': DAYS[index], 'slots': [self.describe(slot) for slot in day.slots]}
+                for index, day in enumerate(days)]
+
+    def cached(self, key, build):
+        # Memoize build() for this snapshot, e.g. a serialized response; the
+        # snapshot never changes, a new version gets a new Timetable
+        value = self._cached.get(key)
+        if value is None:
+            value = build()
+            with self._lock:
+                self._cached[key] = value
+        return value
+
+    def current_session(self, faculty_id, when):
+        # The faculty's slot to take attendance for at this moment: the one
+        # running, else the next one today, else the last one today
+        minute = when.hour * 60 + when.minute
+        today = self.scope(faculty_id=faculty_id)[when.weekday()]
+        running = today.at(minute)
+        if running:
+            return running[0]
+        upcoming = today.next_after(minute)
+        if upcoming:
+            return upcoming[0]
+        return today.last_before(minute)
+
+
+def load(conn, version=None):
+    classes = conn.execute('SELECT id, name, faculty_id, schedule, room FROM classes ORDER BY id').fetchall()
+    sections = conn.execute('''
+        SELECT DISTINCT e.class_id, u.department, u.section
+        FROM enrollments e JOIN users u ON u.id = e.student_id
+    ''').fetchall()
+    return Timetable(version, [tuple(row) for row in classes], [tuple(row) for row in sections])
+
+
+class TimetableCache:
+    def __init__(self):
+        self._timetable = None
+        self._lock = threading.Lock()
+        self.reloads = 0
+
+    def get(self, conn):
+        version = current_version(conn)
+        timetable = self._timetable
+        if timetable is not None and version is not None and timetable.version == version:
+            return timetable
+        with self._lock:
+            timetable = self._timetable
+            if timetable is None or version is None or timetable.version != version:
+                timetable = self._timetable = load(conn, version)
+                self.reloads += 1
+        return timetable
+
+
+def parse_when(value=None):
+    # datetime from an ISO string (for testing and planning), else now
+    return datetime.fromisoformat(value) if value else datetime.now()
+
+
+def get_timetable(app=None):
+    from flask import current_app
+
+    app = app or current_app._get_current_object()
+    timetable = app.extensions.get('timetable')
+    if timetable is None:
+        timetable = app.extensions['timetable'] = TimetableCache()
+    return timetable
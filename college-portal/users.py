@@ -0,0 +1,80 @@
+import base64
+import json
+
+# Keyset-paginated user listing for the admin dashboard. Only the columns the
+# tables show are selected - never the password column.
+
+LIST_COLUMNS = 'id, username, name, email, rollno, section, department, class'
+MAX_PAGE_SIZE = 200
+DEFAULT_PAGE_SIZE = 50
+
+# Sort expression per role (matching the migration 6 indexes); id breaks
+# ties so the cursor is always unique
+SORT_KEYS = {
+    'student': "IFNULL(rollno, '')",
+    'faculty': 'name',
+}
+
+FILTER_COLUMNS = ('department', 'section', 'class')
+
+
+def encode_cursor(row):
+    key = [row['sort_key'], row['id']]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(key, list) or len(key) != 2:
+        raise ValueError('Invalid cursor')
+    return key
+
+
+def _escape_like(text):
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def list_users(conn, role, filters=None, search=None, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    # Returns (rows, next_cursor). filters may contain department, section
+    # and class; search is a prefix matched against name, roll number and
+    # username.
+    if role not in SORT_KEYS:
+        raise ValueError(f'Unknown role: {role}')
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    sort_key = SORT_KEYS[role]
+
+    where = ['role = ?']
+    params = [role]
+    for column in FILTER_COLUMNS:
+        value = (filters or {}).get(column)
+        if value:
+            where.append(f'{column} = ?')
+            params.append(value)
+
+    if search:
+        prefix = _escape_like(search.strip()) + '%'
+        where.append("(name LIKE ? ESCAPE '\\' OR rollno LIKE ? ESCAPE '\\' OR username LIKE ? ESCAPE '\\')")
+        params.extend([prefix, prefix, prefix])
+
+    if cursor:
+        # Spelled out (not a row value) so SQLite can seek the index range
+        after_key, after_id = decode_cursor(cursor)
+        where.append(f'{sort_key} >= ? AND ({sort_key} > ? OR id > ?)')
+        params.extend([after_key, after_key, after_id])
+
+    rows = conn.execute(f'''
+        SELECT {LIST_COLUMNS}, {sort_key} AS sort_key
+        FROM users
+        WHERE {' AND '.join(where)}
+        ORDER BY {sort_key}, id
+        LIMIT ?
+    ''', (*params, limit + 1)).fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1])
+    return rows, next_cursor
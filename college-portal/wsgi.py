@@ -0,0 +1,14 @@
+# WSGI entry point for production servers, configured from PORTAL_SETTINGS
+# and PORTAL_* environment variables (see create_app in app.py):
+#
+#   python serve.py --workers 4            # bundled prefork server
+#   gunicorn --preload -w 4 wsgi:app       # or any WSGI server
+#
+# Importing this module never migrates the schema; run
+# `python serve.py --migrate-only` once per deploy when using another server.
+# With more than one worker process also set
+# PORTAL_FRAGMENT_CACHE_BACKEND=sqlite (serve.py does this itself), or
+# cache invalidations only reach the worker that made them.
+from app import create_app
+
+app = application = create_app()